@@ -0,0 +1,269 @@
+"""
+Load benchmark for the HTTP API.
+
+Seeds a fresh SQLite database at ``--scale`` (see app.db.seed), then drives
+the real application with a mixed workload of virtual users (browse,
+login, checkout, order history) either in-process through httpx's ASGI
+transport, against a local uvicorn server, or both. Reports throughput and
+p50/p95/p99 latency per endpoint and writes everything as JSON; pass a
+previous result as ``--baseline`` to fail on p95 regressions.
+
+The application reads its settings at import time, so this module sets
+SRX_DATABASE_URL (and friends) before importing anything from ``app``.
+
+Usage:
+    python -m app.benchmarks.load --scale 1000 --duration 20 --concurrency 32 --mode both --output bench.json
+    python -m app.benchmarks.load --mode asgi --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+# Relative weight of each scenario in the mix
+SCENARIOS = {"browse": 60, "history": 15, "checkout": 15, "login": 10}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.latencies[label].append(time.perf_counter() - started)
+        if response is None or response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for label, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else ordered * 99
+            endpoints[label] = {
+                "count": len(ordered),
+                "errors": self.errors[label],
+                "throughput_rps": round(len(ordered) / elapsed, 2),
+                "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+                "p50_ms": round(cuts[49] * 1000, 3),
+                "p95_ms": round(cuts[94] * 1000, 3),
+                "p99_ms": round(cuts[98] * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+        total = sum(endpoint["count"] for endpoint in endpoints.values())
+        return {
+            "duration_s": round(elapsed, 3),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+            "endpoints": endpoints,
+        }
+
+
+async def _browse(client, recorder, rng, data):
+    params = {"limit": 20}
+    if rng.random() < 0.5:
+        params["category_id"] = rng.choice(data["category_ids"])
+    if rng.random() < 0.3:
+        params["sort"] = rng.choice(["price", "-price", "newest"])
+    await recorder.request(client, "GET /categories", "GET", "/categories")
+    await recorder.request(client, "GET /products", "GET", "/products", params=params)
+    for _ in range(rng.randint(1, 3)):
+        await recorder.request(client, "GET /products/{product_id}", "GET", f"/products/{rng.choice(data['product_ids'])}")
+
+
+async def _login(client, recorder, rng, data):
+    _, email, _ = rng.choice(data["users"])
+    await recorder.request(client, "POST /login", "POST", "/login", json={"email": email, "password": data["password"]})
+
+
+async def _checkout(client, recorder, rng, data):
+    user_id, _, address_id = rng.choice(data["users"])
+    items = [{"product_id": rng.choice(data["product_ids"]), "quantity": rng.randint(1, 2)} for _ in range(rng.randint(1, 4))]
+    await recorder.request(client, "POST /orders/checkout", "POST", "/orders/checkout", json={
+        "user_id": user_id, "address_id": address_id, "payment_status": "COD", "items": items,
+    })
+
+
+async def _history(client, recorder, rng, data):
+    user_id, _, _ = rng.choice(data["users"])
+    response = await recorder.request(client, "GET /orders/user/{user_id}", "GET", f"/orders/user/{user_id}", params={"limit": 20})
+    cursor = response.headers.get("x-next-cursor") if response is not None else None
+    if cursor:
+        await recorder.request(
+            client, "GET /orders/user/{user_id}", "GET", f"/orders/user/{user_id}", params={"limit": 20, "cursor": cursor},
+        )
+
+
+SCENARIO_FUNCS = {"browse": _browse, "login": _login, "checkout": _checkout, "history": _history}
+
+
+async def run_workload(client: httpx.AsyncClient, data: dict, duration: float, concurrency: int, seed: int = 0) -> dict:
+    """Run ``concurrency`` virtual users for ``duration`` seconds and report per-endpoint latency."""
+    recorder = Recorder()
+    names = list(SCENARIOS)
+    weights = [SCENARIOS[name] for name in names]
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(index: int):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            await SCENARIO_FUNCS[rng.choices(names, weights)[0]](client, recorder, rng, data)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(index) for index in range(concurrency)))
+    return recorder.report(time.perf_counter() - started)
+
+
+async def _run_asgi(data: dict, args) -> dict:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await run_workload(client, data, args.duration, args.concurrency, args.seed)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _run_uvicorn(data: dict, args) -> dict:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError("uvicorn did not become ready")
+            return await run_workload(client, data, args.duration, args.concurrency, args.seed)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Endpoints whose p95 grew by more than ``tolerance`` (0.2 = 20%) versus ``baseline``."""
+    found = []
+    for mode, run in result["runs"].items():
+        for label, stats in run["endpoints"].items():
+            before = baseline.get("runs", {}).get(mode, {}).get("endpoints", {}).get(label)
+            if before and before["p95_ms"] and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                found.append(f"{mode} {label}: p95 {before['p95_ms']} ms -> {stats['p95_ms']} ms")
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=int, default=1000, help="seed scale (users and products; orders are 5x)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=20, help="seconds per mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--mode", choices=("asgi", "uvicorn", "both"), default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--hash-rounds", type=int, default=12, help="bcrypt cost for seeded users and the app")
+    parser.add_argument("--database", help="SQLite file to seed (default: a temporary file)")
+    parser.add_argument("--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="previous JSON result; exit 1 on p95 regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="srx-bench-")
+    path = args.database or os.path.join(workdir, "bench.db")
+    os.environ["SRX_DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+    os.environ.pop("SRX_ASYNC_DATABASE_URL", None)
+    os.environ["SRX_PASSWORD_HASH_ROUNDS"] = str(args.hash_rounds)
+    # /login signs tokens; a throwaway key is fine for a local benchmark
+    os.environ.setdefault("SRX_Backend_Secret_Key", "srx-benchmark-only-secret-key-not-for-production")
+    # Every virtual user shares one IP and the point is to measure capacity, so
+    # admission control stays off unless explicitly configured
+    os.environ.setdefault("SRX_RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("SRX_SHED_MAX_IN_FLIGHT", "0")
+    os.environ.setdefault("SRX_SHED_POOL_WAIT_MS", "0")
+
+    # Imported only now so the application picks up the settings above
+    from app.db import seed as seeding
+    from app.db.session import engine
+
+    started = time.perf_counter()
+    plan = seeding.SeedPlan.for_scale(args.scale, seed=args.seed)
+    data = seeding.seed(engine, plan)
+    data["password"] = seeding.SEED_PASSWORD
+    seed_seconds = time.perf_counter() - started
+    print(f"seeded {plan} in {seed_seconds:.1f}s", file=sys.stderr)
+
+    runs = {}
+    modes = ("asgi", "uvicorn") if args.mode == "both" else (args.mode,)
+    for mode in modes:
+        runner = _run_asgi if mode == "asgi" else _run_uvicorn
+        runs[mode] = asyncio.run(runner(data, args))
+        print(f"{mode}: {runs[mode]['throughput_rps']} req/s, {runs[mode]['errors']} errors", file=sys.stderr)
+
+    result = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale, "seed": args.seed, "seed_seconds": round(seed_seconds, 2),
+            "duration": args.duration, "concurrency": args.concurrency, "workers": args.workers,
+            "hash_rounds": args.hash_rounds, "scenarios": SCENARIOS,
+        },
+        "runs": runs,
+    }
+    body = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(body + "\n")
+    else:
+        print(body)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            found = regressions(result, json.load(baseline), args.tolerance)
+        for line in found:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
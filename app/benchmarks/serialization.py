@@ -0,0 +1,128 @@
+"""
+Measure response encode cost for the list endpoints.
+
+Builds ``--rows`` detached ORM rows per model (products carry a
+``--metadata-kb`` product_metadata blob) and times three ways of turning a
+page into JSON bytes:
+
+- ``stdlib``: validate against the read model, jsonable_encoder, json.dumps
+  (the classic FastAPI response path)
+- ``pydantic``: validate, then Pydantic's own JSON dump (FastAPI's current
+  response_model path)
+- ``fast``: attribute projection + orjson (app.core.serialization, SRX_FAST_JSON)
+
+Usage:
+    python -m app.benchmarks.serialization --rows 100 --metadata-kb 8 --repeat 200
+    python -m app.benchmarks.serialization --json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.serialization import dumps, project_many
+from app.db.models import Order, OrderStatus, PaymentStatus, Product, User, UserRole
+from app.schemas import OrderRead, ProductRead, UserRead
+
+
+def _metadata(kb: int) -> dict:
+    return {
+        "brand": "SRX",
+        "tags": [f"tag-{i}" for i in range(16)],
+        "specs": {f"spec_{i}": "x" * 48 for i in range(max(kb * 1024 // 64, 1))},
+    }
+
+
+def sample_rows(rows: int, metadata_kb: int) -> dict:
+    now = datetime.utcnow()
+    metadata = _metadata(metadata_kb)
+    products = [
+        Product(
+            product_id=str(uuid.uuid4()), sku=f"SKU-{i}", name=f"Product {i}", description="A product " * 8,
+            price=Decimal("19.99"), category_id=str(uuid.uuid4()), product_metadata=metadata, count=i, created_at=now,
+        )
+        for i in range(rows)
+    ]
+    orders = [
+        Order(
+            order_id=str(uuid.uuid4()), user_id=str(uuid.uuid4()), product_id=str(uuid.uuid4()),
+            payment_status=PaymentStatus.COD, address_id=str(uuid.uuid4()), quantity=2,
+            unit_price=Decimal("19.99"), status=OrderStatus.pending, created_at=now, updated_at=now,
+        )
+        for i in range(rows)
+    ]
+    users = [
+        User(user_id=str(uuid.uuid4()), full_name=f"User {i}", email=f"user{i}@example.com", roles_permissions=UserRole.user)
+        for i in range(rows)
+    ]
+    return {"products": (ProductRead, products), "orders": (OrderRead, orders), "users": (UserRead, users)}
+
+
+def encoders(model) -> dict[str, Callable[[list], bytes]]:
+    adapter = TypeAdapter(List[model])
+
+    def stdlib(rows):
+        validated = adapter.validate_python(rows, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated), separators=(",", ":")).encode()
+
+    def pydantic(rows):
+        return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+    def fast(rows):
+        return dumps(project_many(rows, model))
+
+    return {"stdlib": stdlib, "pydantic": pydantic, "fast": fast}
+
+
+def measure(encode: Callable[[list], bytes], rows: list, repeat: int) -> dict:
+    encode(rows)  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode(rows)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "bytes": len(body),
+    }
+
+
+def run(rows: int = 100, metadata_kb: int = 8, repeat: int = 200) -> dict:
+    results = {}
+    for name, (model, objs) in sample_rows(rows, metadata_kb).items():
+        results[name] = {label: measure(encode, objs, repeat) for label, encode in encoders(model).items()}
+        baseline = results[name]["stdlib"]["median_ms"]
+        for stats in results[name].values():
+            stats["speedup"] = round(baseline / stats["median_ms"], 2) if stats["median_ms"] else None
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100, help="rows per page")
+    parser.add_argument("--metadata-kb", type=int, default=8, help="approximate product_metadata size")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+    results = run(args.rows, args.metadata_kb, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'endpoint':<10} {'encoder':<10} {'median ms':>10} {'min ms':>10} {'bytes':>10} {'speedup':>8}")
+    for name, encoders_ in results.items():
+        for label, stats in encoders_.items():
+            print(f"{name:<10} {label:<10} {stats['median_ms']:>10} {stats['min_ms']:>10} {stats['bytes']:>10} {stats['speedup']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
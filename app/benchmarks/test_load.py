@@ -0,0 +1,41 @@
+import asyncio
+
+import httpx
+
+from app.benchmarks.load import regressions, run_workload
+from app.core.hashing import bcrypt_hash
+from app.db import seed as seeding
+from app.db.session import create_db_engine
+from app.main import app
+
+# app/benchmarks/test_load.py
+
+
+def test_workload_exercises_every_scenario_without_errors(client, db_path, monkeypatch):
+    monkeypatch.setattr("app.core.hashing.password_hasher.rounds", 4)
+    monkeypatch.setattr("app.core.security.SECRET_KEY", "test-secret-key-with-enough-bytes-for-hs256")
+    monkeypatch.setattr("app.core.admission.controller.enabled", False)
+    engine = create_db_engine(f"sqlite:///{db_path}")
+    data = seeding.seed(engine, seeding.SeedPlan.for_scale(20), password_hash=bcrypt_hash(seeding.SEED_PASSWORD, 4))
+    data["password"] = seeding.SEED_PASSWORD
+    engine.dispose()
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+            return await run_workload(http, data, duration=1.0, concurrency=4)
+
+    report = asyncio.run(run())
+    assert report["errors"] == 0
+    assert set(report["endpoints"]) == {
+        "GET /categories", "GET /products", "GET /products/{product_id}", "POST /login",
+        "POST /orders/checkout", "GET /orders/user/{user_id}",
+    }
+    for stats in report["endpoints"].values():
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+
+    result = {"runs": {"asgi": report}}
+    slower = {"runs": {"asgi": {"endpoints": {
+        label: {**stats, "p95_ms": stats["p95_ms"] * 2} for label, stats in report["endpoints"].items()
+    }}}}
+    assert regressions(result, result, tolerance=0.2) == []
+    assert len(regressions(slower, result, tolerance=0.2)) == len(report["endpoints"])
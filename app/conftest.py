@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import admission
+from app.crud import crud_products
+from app.db import profiler
+from app.db.models import Base
+from app.db.session import create_async_db_engine, create_db_engine, get_session, pool_wait
+from app.main import app
+
+# app/conftest.py: shared database fixtures for the colocated test modules
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    crud_products.invalidate_product_cache()
+    crud_products.invalidate_category_catalog()
+    # Rate limit buckets and pool wait samples are process-wide
+    admission.controller.reset()
+    pool_wait.reset()
+    yield
+    crud_products.invalidate_product_cache()
+    crud_products.invalidate_category_catalog()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "srx_test.db"
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    engine = create_db_engine(f"sqlite:///{db_path}")
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def async_engine(db_path):
+    engine = create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+    yield engine
+    engine.sync_engine.dispose()
+
+
+@pytest.fixture
+def client(async_engine, monkeypatch):
+    # Tests drive the outbox worker explicitly (OutboxWorker.run_once), never in the background
+    monkeypatch.setattr("app.main.OUTBOX_ENABLED", False)
+    session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+
+
+@pytest.fixture
+def max_queries(async_engine):
+    """
+    Fail if the block runs more SQL statements than allowed on the client's engine:
+
+        with max_queries(2):
+            client.post("/register", json=...)
+    """
+    @contextmanager
+    def check(limit: int):
+        with profiler.capture(async_engine.sync_engine, label=f"max_queries({limit})") as profile:
+            yield profile
+        assert profile.statements <= limit, (
+            f"{profile.statements} statements executed, expected at most {limit}:\n"
+            + "\n".join(f"{count}x {' '.join(sql.split())}" for sql, count in profile.counts.items())
+        )
+    return check
@@ -0,0 +1,207 @@
+"""
+Admission control: per-client rate limits and load shedding.
+
+Rate limits are token buckets per route group (SRX_RATE_LIMITS, matched by
+longest path prefix). A request carrying a bearer token spends from that
+token's bucket, and from a larger bucket for its IP (RATE_LIMIT_IP_FACTOR
+times the group's budget) so one address cannot mint tokens to get around
+the limit; anonymous requests spend from their IP's bucket. An empty bucket
+answers 429 with Retry-After set to when the next token is due.
+
+Load shedding protects the database instead of individual clients: while
+more than SRX_SHED_MAX_IN_FLIGHT requests are being served, or while the
+average wait for a pooled connection (app.db.session.pool_wait) is above
+SRX_SHED_POOL_WAIT_MS, new requests get a 503 before they touch the pool,
+rather than queueing behind it until they time out.
+
+Both are per worker process. Rejections are counted on /metrics as
+srx_admission_rejected_total{reason, group}.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import orjson
+
+from app.core import metrics
+from app.core.config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_IP_FACTOR, RATE_LIMIT_MAX_CLIENTS, RATE_LIMIT_TRUSTED_PROXIES, RATE_LIMITS,
+    SHED_MAX_IN_FLIGHT, SHED_POOL_WAIT_MS,
+)
+from app.db.session import PoolWaitMonitor, pool_wait
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by (group, client), ``rate`` tokens per second up to
+    ``burst``. Only the least recently used ``max_clients`` buckets are kept;
+    an evicted client simply starts again with a full bucket.
+    """
+
+    def __init__(self, max_clients: int = RATE_LIMIT_MAX_CLIENTS, clock: Callable[[], float] = time.monotonic):
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: OrderedDict[tuple, tuple[float, float]] = OrderedDict()
+
+    def acquire(self, key: tuple, rate: float, burst: float) -> float:
+        """Take one token; returns 0 on success, else the seconds until one is available."""
+        now = self._clock()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate if rate > 0 else math.inf
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key: tuple) -> None:
+        """Give back a token taken for a request that was rejected by another bucket."""
+        if key in self._buckets:
+            tokens, updated = self._buckets[key]
+            self._buckets[key] = (tokens + 1, updated)
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        limits: dict[str, tuple[float, float]] = RATE_LIMITS,
+        enabled: bool = RATE_LIMIT_ENABLED,
+        ip_factor: float = RATE_LIMIT_IP_FACTOR,
+        trusted_proxies: int = RATE_LIMIT_TRUSTED_PROXIES,
+        max_in_flight: int = SHED_MAX_IN_FLIGHT,
+        max_pool_wait_ms: float = SHED_POOL_WAIT_MS,
+        monitor: PoolWaitMonitor = pool_wait,
+        limiter: Optional[TokenBucketLimiter] = None,
+    ):
+        self.limits = limits
+        self.enabled = enabled
+        self.ip_factor = ip_factor
+        self.trusted_proxies = trusted_proxies
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait_ms = max_pool_wait_ms
+        self.monitor = monitor
+        self.limiter = limiter or TokenBucketLimiter()
+        self.in_flight = 0
+
+    def group(self, path: str) -> Optional[str]:
+        """Longest configured prefix that ``path`` falls under, on a path-segment boundary."""
+        best = None
+        for prefix in self.limits:
+            if (path == prefix or path.startswith(prefix.rstrip("/") + "/")) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return best
+
+    def shed_reason(self) -> Optional[str]:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_pool_wait_ms and self.monitor.average() * 1000 > self.max_pool_wait_ms:
+            return "pool_wait"
+        return None
+
+    def rate_limit(self, group: str, token: Optional[str], ip: str) -> float:
+        """Seconds the client must wait before ``group`` admits it again (0 to admit now)."""
+        rate, burst = self.limits[group]
+        if token is None:
+            return self.limiter.acquire((group, "ip", ip), rate, burst)
+        token_key = (group, "token", token)
+        wait = self.limiter.acquire(token_key, rate, burst)
+        if wait:
+            return wait
+        wait = self.limiter.acquire((group, "ip", ip), rate * self.ip_factor, burst * self.ip_factor)
+        if wait:
+            self.limiter.refund(token_key)
+        return wait
+
+    def reset(self) -> None:
+        self.limiter.reset()
+        self.in_flight = 0
+
+
+controller = AdmissionController()
+
+
+def _client_ip(scope, trusted_proxies: int) -> str:
+    """
+    The peer address, or behind ``trusted_proxies`` proxies the X-Forwarded-For
+    entry the outermost of them appended. Entries further left come from the
+    client and cannot be trusted, or rotating them would reset the IP budget.
+    """
+    if trusted_proxies:
+        forwarded = [
+            address.strip()
+            for name, value in scope["headers"] if name == b"x-forwarded-for"
+            for address in value.decode("latin-1").split(",")
+        ]
+        if len(forwarded) >= trusted_proxies:
+            return forwarded[-trusted_proxies]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and credentials.strip():
+                return credentials.strip()
+    return None
+
+
+class AdmissionMiddleware:
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController = controller,
+        registry: metrics.MetricsRegistry = metrics.registry,
+        exclude: tuple[str, ...] = ("/health", "/metrics"),
+    ):
+        self.app = app
+        self.controller = controller
+        self.registry = registry
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller
+        group = controller.group(scope["path"])
+        reason = controller.shed_reason()
+        if reason is not None:
+            await self._reject(send, 503, "Server is busy, try again shortly", 1, reason, group)
+            return
+        if controller.enabled and group is not None:
+            wait = controller.rate_limit(group, _bearer_token(scope), _client_ip(scope, controller.trusted_proxies))
+            if wait:
+                await self._reject(send, 429, "Too many requests", wait, "rate_limit", group)
+                return
+        controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
+
+    async def _reject(self, send, status: int, detail: str, retry_after: float, reason: str, group: Optional[str]) -> None:
+        self.registry.inc_counter(
+            "srx_admission_rejected_total", "Requests turned away by admission control, by reason and route group.",
+            reason=reason, group=group or "other",
+        )
+        body = orjson.dumps({"detail": detail})
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(min(retry_after, 86400)))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
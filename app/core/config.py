@@ -0,0 +1,139 @@
+from dotenv import load_dotenv
+import os
+load_dotenv()
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _async_url(url: str) -> str:
+    """Map a sync database URL onto the matching async driver."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+
+DATABASE_URL = os.getenv("SRX_DATABASE_URL", "sqlite:///./srx_local.db")
+ASYNC_DATABASE_URL = os.getenv("SRX_ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+# When enabled, routers run CRUD on an AsyncSession (aiosqlite/asyncpg) instead
+# of handing a blocking Session to Starlette's threadpool.
+USE_ASYNC_DB = _env_flag("SRX_USE_ASYNC_DB", True)
+
+# Connection pool (per engine, per worker process): a worker can hold up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so size it against the
+# threadpool / concurrency of one worker, times the number of workers.
+DB_POOL_SIZE = int(os.getenv("SRX_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("SRX_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("SRX_DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = _env_flag("SRX_DB_POOL_PRE_PING", True)
+DB_POOL_RECYCLE = int(os.getenv("SRX_DB_POOL_RECYCLE", "1800"))
+# Server-side statement timeout in milliseconds (Postgres); 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("SRX_DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_ECHO = _env_flag("SRX_DB_ECHO", False)
+
+# Pragmas applied to every SQLite connection
+SQLITE_JOURNAL_MODE = os.getenv("SRX_SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SRX_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SRX_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SRX_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB (SQLite convention): -65536 is a 64 MiB page cache
+SQLITE_CACHE_SIZE = int(os.getenv("SRX_SQLITE_CACHE_SIZE", "-65536"))
+
+# SQL profiler (app.db.profiler): slow-query log threshold (0 disables),
+# repeats of one statement per request that count as a possible N+1, and
+# X-DB-* debug response headers
+SQL_SLOW_QUERY_MS = float(os.getenv("SRX_SQL_SLOW_QUERY_MS", "200"))
+SQL_EXPLAIN_SLOW_QUERIES = _env_flag("SRX_SQL_EXPLAIN_SLOW_QUERIES", True)
+SQL_REPEAT_THRESHOLD = int(os.getenv("SRX_SQL_REPEAT_THRESHOLD", "5"))
+SQL_PROFILE_HEADERS = _env_flag("SRX_SQL_PROFILE_HEADERS", False)
+
+# Project hot list endpoints straight from ORM rows and encode with orjson,
+# skipping response_model validation (see app.core.serialization)
+FAST_JSON = _env_flag("SRX_FAST_JSON", False)
+
+# Request metrics at /metrics (per worker)
+METRICS_ENABLED = _env_flag("SRX_METRICS_ENABLED", True)
+METRICS_BUCKETS = tuple(float(bound) for bound in os.getenv(
+    "SRX_METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10",
+).split(","))
+
+# Idempotency-Key support on POST /orders, /orders/checkout and /register:
+# how long a stored response is replayed, how long a retry waits for the
+# first attempt to finish, and after how long an unfinished claim is
+# treated as abandoned (its worker crashed) and may be taken over
+IDEMPOTENCY_TTL = float(os.getenv("SRX_IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("SRX_IDEMPOTENCY_WAIT_TIMEOUT", "10"))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("SRX_IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+
+# Transactional outbox (app.crud.crud_outbox) drained by a background task
+# in each app worker: events claimed per batch, idle poll interval, lease
+# after which a claimed but unfinished event is retried elsewhere, and
+# exponential retry backoff until an event is parked as failed
+OUTBOX_ENABLED = _env_flag("SRX_OUTBOX_ENABLED", True)
+# Topics written to the outbox, the same in every process. Opt-in: list only
+# topics some deployment has handlers for, or their events are never drained.
+OUTBOX_TOPICS = [topic.strip() for topic in os.getenv("SRX_OUTBOX_TOPICS", "").split(",") if topic.strip()]
+OUTBOX_BATCH_SIZE = int(os.getenv("SRX_OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("SRX_OUTBOX_POLL_INTERVAL", "1"))
+OUTBOX_LEASE = float(os.getenv("SRX_OUTBOX_LEASE", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("SRX_OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("SRX_OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("SRX_OUTBOX_BACKOFF_MAX", "600"))
+# Seconds between refreshes of the queue-depth gauges (one aggregate query)
+OUTBOX_STATS_INTERVAL = float(os.getenv("SRX_OUTBOX_STATS_INTERVAL", "15"))
+
+# Admission control (app.core.admission). Token-bucket rate limits per
+# route group as "prefix=rate:burst" (rate in requests per second), applied
+# per bearer token, or per client IP for anonymous requests; one IP may
+# spend RATE_LIMIT_IP_FACTOR times a group's budget across all its tokens.
+RATE_LIMIT_ENABLED = _env_flag("SRX_RATE_LIMIT_ENABLED", True)
+RATE_LIMITS = {
+    prefix.strip(): (float(limit.split(":")[0]), float(limit.split(":")[1]))
+    for prefix, limit in (
+        rule.split("=") for rule in os.getenv(
+            "SRX_RATE_LIMITS", "/login=0.2:10,/orders=5:20,/products=50:200",
+        ).split(",") if rule.strip()
+    )
+}
+RATE_LIMIT_IP_FACTOR = float(os.getenv("SRX_RATE_LIMIT_IP_FACTOR", "5"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("SRX_RATE_LIMIT_MAX_CLIENTS", "100000"))
+# Reverse proxies in front of the app that append to X-Forwarded-For; the
+# client IP is the entry the outermost one added, this many from the right
+# (0: ignore the header, which clients can set to anything)
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("SRX_RATE_LIMIT_TRUSTED_PROXIES", "0"))
+# Load shedding per worker: reject with 503 while this many requests are in
+# flight, or while the average wait for a pooled DB connection over the
+# last SHED_WINDOW seconds exceeds SHED_POOL_WAIT_MS (0 disables either)
+SHED_MAX_IN_FLIGHT = int(os.getenv("SRX_SHED_MAX_IN_FLIGHT", "256"))
+SHED_POOL_WAIT_MS = float(os.getenv("SRX_SHED_POOL_WAIT_MS", "250"))
+SHED_WINDOW = float(os.getenv("SRX_SHED_WINDOW", "5"))
+
+# In-process read caches (per worker)
+PRODUCT_CACHE_SIZE = int(os.getenv("SRX_PRODUCT_CACHE_SIZE", "10000"))
+PRODUCT_LIST_CACHE_SIZE = int(os.getenv("SRX_PRODUCT_LIST_CACHE_SIZE", "512"))
+PRODUCT_CACHE_TTL = float(os.getenv("SRX_PRODUCT_CACHE_TTL", "30"))
+# Serialized /categories payload; writes on this worker rebuild it immediately
+CATEGORY_CACHE_TTL = float(os.getenv("SRX_CATEGORY_CACHE_TTL", "300"))
+
+# Verified JWT claims cache (per worker)
+TOKEN_CACHE_SIZE = int(os.getenv("SRX_TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_MAX_TTL = float(os.getenv("SRX_TOKEN_CACHE_MAX_TTL", "1800"))
+
+# Password hashing (bcrypt) worker pool
+PASSWORD_HASH_ROUNDS = int(os.getenv("SRX_PASSWORD_HASH_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("SRX_PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv("SRX_PASSWORD_HASH_MAX_CONCURRENCY", "64"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("SRX_PASSWORD_HASH_QUEUE_TIMEOUT", "10"))
+PASSWORD_HASH_EXECUTOR = os.getenv("SRX_PASSWORD_HASH_EXECUTOR", "process")  # process | thread
+
+# product_metadata keys included in the full-text product index
+SEARCH_METADATA_KEYS = [key.strip() for key in os.getenv("SRX_SEARCH_METADATA_KEYS", "brand,tags,author,color").split(",") if key.strip()]
+# SQLite: matches ranked per search (0: all). A term found in most products
+# is ranked among the first this many hits instead of every one of them.
+SEARCH_MAX_CANDIDATES = int(os.getenv("SRX_SEARCH_MAX_CANDIDATES", "1000"))
@@ -0,0 +1,135 @@
+"""
+Password hashing service.
+
+bcrypt is deliberately slow, so hashes are computed in a bounded worker
+pool instead of on the event loop or in Starlette's request threadpool.
+A semaphore caps how many hashes may be queued or running at once; callers
+beyond that wait (up to a timeout) rather than starving other endpoints.
+
+Legacy unsalted SHA-256 hashes are still accepted and flagged for rehash.
+"""
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+from fastapi import HTTPException
+
+from app.core.config import (
+    PASSWORD_HASH_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_CONCURRENCY,
+    PASSWORD_HASH_QUEUE_TIMEOUT,
+    PASSWORD_HASH_EXECUTOR,
+)
+
+_LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+# bcrypt only looks at the first 72 bytes; newer releases raise instead of truncating
+_BCRYPT_MAX_BYTES = 72
+
+
+def _secret(password: str) -> bytes:
+    return password.encode()[:_BCRYPT_MAX_BYTES]
+
+
+def bcrypt_hash(password: str, rounds: int = PASSWORD_HASH_ROUNDS) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds=rounds)).decode()
+
+
+def bcrypt_verify(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(_secret(password), hashed.encode())
+    except ValueError:
+        return False
+
+
+def is_legacy_hash(hashed: str) -> bool:
+    return bool(_LEGACY_SHA256.match(hashed))
+
+
+def legacy_verify(password: str, hashed: str) -> bool:
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed)
+
+
+def needs_rehash(hashed: str, rounds: int = PASSWORD_HASH_ROUNDS) -> bool:
+    """True for legacy SHA-256 hashes and bcrypt hashes at a different cost."""
+    if is_legacy_hash(hashed):
+        return True
+    parts = hashed.split("$")
+    return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != rounds
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        rounds: int = PASSWORD_HASH_ROUNDS,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_concurrency: int = PASSWORD_HASH_MAX_CONCURRENCY,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT,
+        executor: str = PASSWORD_HASH_EXECUTOR,
+    ):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "thread":
+                # bcrypt releases the GIL, so threads also scale across cores
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            else:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _run(self, func, *args):
+        semaphore = self._get_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(bcrypt_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        """
+        Check a password and return ``(valid, new_hash)``; ``new_hash`` is set
+        when the stored hash is legacy or uses another cost and should be replaced.
+        """
+        if is_legacy_hash(hashed):
+            valid = legacy_verify(password, hashed)
+        else:
+            valid = await self._run(bcrypt_verify, password, hashed)
+        if valid and needs_rehash(hashed, self.rounds):
+            return True, await self.hash(password)
+        return valid, None
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
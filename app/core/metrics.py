@@ -0,0 +1,162 @@
+"""
+Per-worker request metrics in Prometheus text format.
+
+MetricsMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task
+overhead). All aggregation happens on the event loop thread after each
+response, so the counters need no locks; database time comes from the
+request's RequestProfile (app.db.profiler). Every worker process keeps its own registry
+and labels its series with ``worker`` (the pid), so scrape each worker, or
+sum across them in PromQL.
+"""
+import os
+import time
+from bisect import bisect_left
+
+from app.core.config import METRICS_BUCKETS
+from app.db.profiler import RequestProfile, request_profile
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: tuple[float, ...] = METRICS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.worker = str(os.getpid())
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.db_time: dict[tuple[str, str], Histogram] = {}
+        self.db_statements: dict[tuple[str, str], int] = {}
+        self.in_flight = 0
+        # Series reported by other components: name -> (type, help, {labels: value})
+        self.extra: dict[str, tuple[str, str, dict[tuple, float]]] = {}
+
+    def record(self, method: str, route: str, status: int, duration: float, stats: RequestProfile) -> None:
+        key = (method, route)
+        self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = Histogram(self.buckets)
+            self.db_time[key] = Histogram(self.buckets)
+        latency.observe(duration)
+        self.db_time[key].observe(stats.db_time)
+        self.db_statements[key] = self.db_statements.get(key, 0) + stats.statements
+
+    def _series(self, name: str, kind: str, help_text: str) -> dict[tuple, float]:
+        if name not in self.extra:
+            self.extra[name] = (kind, help_text, {})
+        return self.extra[name][2]
+
+    def set_gauge(self, name: str, help_text: str, value: float, **labels) -> None:
+        self._series(name, "gauge", help_text)[tuple(sorted(labels.items()))] = value
+
+    def inc_counter(self, name: str, help_text: str, amount: float = 1, **labels) -> None:
+        series = self._series(name, "counter", help_text)
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def _histogram(self, name: str, help_text: str, series: dict) -> list[str]:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (method, route), histogram in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(method=method, route=route, worker=self.worker, le=repr(bound))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, worker=self.worker, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(method=method, route=route, worker=self.worker)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(method=method, route=route, worker=self.worker)} {histogram.count}")
+        return lines
+
+    def render(self) -> bytes:
+        lines = [
+            "# HELP srx_http_requests_total Requests handled, by route and status code.",
+            "# TYPE srx_http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"srx_http_requests_total{_labels(method=method, route=route, status=status, worker=self.worker)} {count}")
+        lines += [
+            "# HELP srx_http_requests_in_flight Requests currently being handled.",
+            "# TYPE srx_http_requests_in_flight gauge",
+            f"srx_http_requests_in_flight{_labels(worker=self.worker)} {self.in_flight}",
+        ]
+        lines += self._histogram(
+            "srx_http_request_duration_seconds", "Time from request start to the end of the response body.", self.latency,
+        )
+        lines += self._histogram(
+            "srx_db_time_seconds", "Time spent executing SQL statements per request.", self.db_time,
+        )
+        lines += [
+            "# HELP srx_db_statements_total SQL statements executed, by route.",
+            "# TYPE srx_db_statements_total counter",
+        ]
+        for (method, route), count in sorted(self.db_statements.items()):
+            lines.append(f"srx_db_statements_total{_labels(method=method, route=route, worker=self.worker)} {count}")
+        for name, (kind, help_text, series) in sorted(self.extra.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_labels(**dict(labels), worker=self.worker)} {value}")
+        return ("\n".join(lines) + "\n").encode()
+
+    def reset(self) -> None:
+        self.requests.clear()
+        self.latency.clear()
+        self.db_time.clear()
+        self.db_statements.clear()
+        self.extra.clear()
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: MetricsRegistry = registry, exclude: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.registry = registry
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.in_flight += 1
+        with request_profile(f"{scope['method']} {scope['path']}") as profile:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self.registry.in_flight -= 1
+                route = scope.get("route")
+                # Templated path keeps label cardinality bounded
+                route_label = getattr(route, "path", None) or "unmatched"
+                self.registry.record(scope["method"], route_label, status, time.perf_counter() - started, profile)
+
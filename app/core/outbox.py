@@ -0,0 +1,149 @@
+"""
+Background worker that drains the transactional outbox (app.crud.crud_outbox).
+
+One asyncio task per app worker, started and stopped by the lifespan in
+app.main. Each round claims a batch of due events, runs their handlers
+concurrently and deletes the ones that succeeded; a failed event is retried
+with exponential backoff (plus jitter) and parked as failed after
+SRX_OUTBOX_MAX_ATTEMPTS. A worker only claims topics that have handlers
+registered in its own process. Several workers can drain one outbox: a claim
+hides events for SRX_OUTBOX_LEASE seconds, after which an event whose
+worker died is picked up again.
+
+Queue depth is published on /metrics as srx_outbox_pending,
+srx_outbox_oldest_age_seconds and srx_outbox_failed, refreshed at most every
+SRX_OUTBOX_STATS_INTERVAL seconds rather than on every poll.
+"""
+import asyncio
+import inspect
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core import metrics
+from app.core.config import (
+    OUTBOX_BACKOFF_BASE, OUTBOX_BACKOFF_MAX, OUTBOX_BATCH_SIZE, OUTBOX_LEASE, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL_INTERVAL,
+    OUTBOX_STATS_INTERVAL,
+)
+from app.crud import crud_outbox
+from app.db.session import get_session
+
+logger = logging.getLogger("srx.outbox")
+
+
+def backoff_delay(attempts: int, base: float = OUTBOX_BACKOFF_BASE, cap: float = OUTBOX_BACKOFF_MAX) -> float:
+    """Seconds before attempt ``attempts + 1``: base * 2^(attempts - 1), capped, with up to 50% jitter off."""
+    delay = min(base * 2 ** (attempts - 1), cap)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        session_scope: Callable[[], AsyncContextManager] = asynccontextmanager(get_session),
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        lease: float = OUTBOX_LEASE,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        registry: metrics.MetricsRegistry = metrics.registry,
+        stats_interval: float = OUTBOX_STATS_INTERVAL,
+    ):
+        self.session_scope = session_scope
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.registry = registry
+        self.stats_interval = stats_interval
+        self._next_stats = 0.0
+        self.stats = {"pending": 0, "failed": 0, "oldest_age_seconds": 0.0}
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, session_scope: Optional[Callable[[], AsyncContextManager]] = None) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        if session_scope is not None:
+            self.session_scope = session_scope
+        self._stopping = asyncio.Event()  # bound to the loop the task runs on
+        self._task = asyncio.get_running_loop().create_task(self.run(), name="outbox-worker")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let the current batch finish (up to ``timeout``), then end the task."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            pass  # wait_for cancelled it; unfinished events come back after their lease
+        self._task = None
+
+    async def run(self) -> None:
+        failures = 0
+        while not self._stopping.is_set():
+            try:
+                handled = await self.run_once()
+                failures = 0
+            except Exception:
+                # Database unavailable and the like: keep the task alive and back off
+                failures += 1
+                logger.exception("outbox worker round failed")
+                handled = 0
+            if handled < self.batch_size:
+                delay = self.poll_interval if not failures else min(self.poll_interval * 2 ** failures, OUTBOX_BACKOFF_MAX)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_once(self) -> int:
+        """Claim and process one batch; returns the number of events handled."""
+        async with self.session_scope() as db:
+            topics = [topic for topic, handlers in crud_outbox.HANDLERS.items() if handlers]
+            events = await crud_outbox.claim_events_async(db, self.batch_size, self.lease, topics) if topics else []
+            errors = await asyncio.gather(*(self._deliver(event) for event in events))
+            await crud_outbox.complete_events_async(db, [event.id for event, error in zip(events, errors) if error is None])
+            for event, error in zip(events, errors):
+                if error is None:
+                    self.registry.inc_counter("srx_outbox_events_total", "Outbox events handled, by topic and result.", topic=event.topic, result="delivered")
+                    continue
+                parked = event.attempts >= self.max_attempts
+                delay = None if parked else backoff_delay(event.attempts)
+                await crud_outbox.retry_event_async(db, event.id, error, delay)
+                self.registry.inc_counter(
+                    "srx_outbox_events_total", "Outbox events handled, by topic and result.",
+                    topic=event.topic, result="failed" if parked else "retried",
+                )
+                logger.warning(
+                    "outbox event %s (%s) attempt %s failed: %s; %s", event.id, event.topic, event.attempts, error,
+                    "giving up" if parked else f"retrying in {delay:.1f}s",
+                )
+            if time.monotonic() >= self._next_stats:
+                await self._publish_stats(db)
+        return len(events)
+
+    async def _deliver(self, event) -> Optional[str]:
+        try:
+            for handler in crud_outbox.HANDLERS.get(event.topic, ()):
+                if inspect.iscoroutinefunction(handler):
+                    await handler(event)
+                else:
+                    await run_in_threadpool(handler, event)
+        except Exception as exc:
+            return f"{type(exc).__name__}: {exc}"
+        return None
+
+    async def _publish_stats(self, db) -> None:
+        self._next_stats = time.monotonic() + self.stats_interval
+        self.stats = await crud_outbox.outbox_stats_async(db)
+        self.registry.set_gauge("srx_outbox_pending", "Outbox events waiting for delivery.", self.stats["pending"])
+        self.registry.set_gauge("srx_outbox_oldest_age_seconds", "Age of the oldest undelivered outbox event.", self.stats["oldest_age_seconds"])
+        self.registry.set_gauge("srx_outbox_failed", "Outbox events parked after exhausting their attempts.", self.stats["failed"])
+
+
+worker = OutboxWorker()
@@ -1,8 +1,14 @@
 import hashlib
+import time
 from typing import Optional
 import jwt
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.core.cache import TTLCache
+from app.core.hashing import bcrypt_hash, bcrypt_verify, is_legacy_hash, legacy_verify
+from app.core.config import TOKEN_CACHE_SIZE, TOKEN_CACHE_MAX_TTL
 import os
 load_dotenv()
 
@@ -11,12 +17,14 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 def hash_password(password: str) -> str:
-    """Hash a password using SHA-256."""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password with bcrypt. Blocking; request handlers use password_hasher."""
+    return bcrypt_hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password against a hashed value."""
-    return hash_password(password) == hashed
+    """Verify a password against a bcrypt or legacy SHA-256 hash."""
+    if is_legacy_hash(hashed):
+        return legacy_verify(password, hashed)
+    return bcrypt_verify(password, hashed)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -48,4 +56,41 @@ def token_expired(token: str) -> bool:
     except jwt.InvalidTokenError:
         return True  # Invalid token
     except Exception as e:
-        raise ValueError(f"An error occurred while checking token expiration: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"An error occurred while checking token expiration: {str(e)}")
+
+# Verified claims keyed by token hash; an entry never outlives the token's exp
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_MAX_TTL)
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def verify_access_token(token: str) -> dict:
+    """
+    Verify a token's signature at most once per lifetime on this worker.
+    Raises ValueError like decode_access_token for expired or invalid tokens.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+    claims = decode_access_token(token)
+    remaining = claims.get("exp", 0) - time.time()
+    if remaining > 0:
+        token_cache.set(key, claims, ttl=min(remaining, TOKEN_CACHE_MAX_TTL))
+    return claims
+
+async def get_token_claims(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+    """
+    FastAPI dependency: verified claims from an ``Authorization: Bearer`` header.
+    """
+    unauthorized = {"WWW-Authenticate": "Bearer"}
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers=unauthorized)
+    try:
+        claims = verify_access_token(credentials.credentials)
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers=unauthorized)
+    if not claims.get("user_id"):
+        raise HTTPException(status_code=401, detail="Invalid access token", headers=unauthorized)
+    return claims
+
+async def get_current_user_id(claims: dict = Depends(get_token_claims)) -> str:
+    return claims["user_id"]
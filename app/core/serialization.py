@@ -0,0 +1,80 @@
+"""
+Fast JSON path for hot read endpoints.
+
+With SRX_FAST_JSON on, list endpoints skip response_model validation:
+rows are projected straight from ORM attributes into dicts for the trusted
+read models below and encoded with orjson. The wire format matches the
+Pydantic output (Decimal as a string, enums by value, ISO datetimes).
+"""
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.core.config import FAST_JSON
+from app.schemas import OrderRead, ProductRead, UserRead
+
+# Read models whose ORM source is trusted to already satisfy the schema
+TRUSTED_MODELS = (ProductRead, OrderRead, UserRead)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _fields(model: type[BaseModel]) -> tuple[str, ...]:
+    if model not in TRUSTED_MODELS:
+        raise ValueError(f"{model.__name__} is not a trusted read model")
+    return tuple(model.model_fields)
+
+
+def project(obj: Any, model: type[BaseModel]) -> dict:
+    """Copy ``model``'s fields off an ORM row (or cached snapshot) without validation."""
+    return {field: getattr(obj, field, None) for field in _fields(model)}
+
+
+def project_many(objs: Iterable[Any], model: type[BaseModel]) -> list[dict]:
+    fields = _fields(model)
+    return [{field: getattr(obj, field, None) for field in fields} for obj in objs]
+
+
+def fast_response(content: Any, model: type[BaseModel], response: Optional[Response] = None, enabled: Optional[bool] = None):
+    """
+    Return ``content`` unchanged (FastAPI validates it against the route's
+    response_model) unless the fast path is enabled, in which case it is
+    projected and encoded here. Headers already set on ``response`` are kept.
+    """
+    if not (FAST_JSON if enabled is None else enabled):
+        return content
+    if content is None or isinstance(content, Response):
+        return content
+    if isinstance(content, (list, tuple)):
+        body = project_many(content, model)
+    else:
+        body = project(content, model)
+    fast = FastJSONResponse(body)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name.lower() not in ("content-length", "content-type"):
+                fast.headers[name] = value
+        if response.status_code:
+            fast.status_code = response.status_code
+    return fast
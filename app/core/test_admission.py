@@ -0,0 +1,110 @@
+import pytest
+
+from app.core import admission
+from app.core.admission import TokenBucketLimiter
+from app.db.session import PoolWaitMonitor
+
+# app/core/test_admission.py
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.controller, "limiter", TokenBucketLimiter(clock=clock))
+    monkeypatch.setattr(admission.controller, "limits", {"/login": (0.5, 2), "/products": (10, 20), "/products/search": (1, 1)})
+    monkeypatch.setattr(admission.controller, "enabled", True)
+    return clock
+
+
+def test_bucket_refills_at_its_rate_up_to_the_burst():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(clock=clock)
+    assert [limiter.acquire("k", rate=2, burst=3) for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("k", rate=2, burst=3) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter.acquire("k", rate=2, burst=3) == 0
+    clock.now += 60
+    assert [limiter.acquire("k", rate=2, burst=3) for _ in range(4)][-1] > 0
+
+
+def test_least_recently_used_clients_are_evicted():
+    limiter = TokenBucketLimiter(max_clients=2, clock=FakeClock())
+    for key in ("a", "b", "a", "c"):
+        limiter.acquire(key, rate=1, burst=5)
+    assert list(limiter._buckets) == ["a", "c"]
+
+
+def test_routes_are_grouped_by_longest_prefix():
+    controller = admission.AdmissionController(limits={"/products": (1, 1), "/products/search": (1, 1)})
+    assert controller.group("/products/42") == "/products"
+    assert controller.group("/products/search") == "/products/search"
+    assert controller.group("/productsfeed") is None
+    assert controller.group("/orders") is None
+
+
+def test_login_is_throttled_with_retry_after(client, limits):
+    for _ in range(2):
+        assert client.post("/login", json={"email": "a@example.com", "password": "x"}).status_code != 429
+    response = client.post("/login", json={"email": "a@example.com", "password": "x"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/products").status_code == 200  # other groups have their own budget
+    assert client.get("/health").status_code == 200
+
+    limits.now += 2
+    assert client.post("/login", json={"email": "a@example.com", "password": "x"}).status_code != 429
+    assert b'srx_admission_rejected_total{group="/login",reason="rate_limit",' in client.get("/metrics").content
+
+
+def test_tokens_have_their_own_buckets_within_an_ip_budget(client, limits, monkeypatch):
+    monkeypatch.setattr(admission.controller, "ip_factor", 2)
+    statuses = {
+        token: [client.get("/products/search", params={"q": "x"}, headers={"Authorization": f"Bearer {token}"}).status_code for _ in range(2)]
+        for token in ("t1", "t2", "t3")
+    }
+    # One request per token, until the IP's allowance of two is used up
+    assert [codes[0] == 429 for codes in statuses.values()] == [False, False, True]
+    assert all(codes[1] == 429 for codes in statuses.values())
+
+
+def test_saturated_worker_sheds_load(client, monkeypatch):
+    monkeypatch.setattr(admission.controller, "max_in_flight", 1)
+    monkeypatch.setattr(admission.controller, "in_flight", 1)
+    response = client.get("/products")
+    assert (response.status_code, response.headers["Retry-After"]) == (503, "1")
+    assert client.get("/health").status_code == 200
+
+
+def test_slow_pool_checkouts_shed_load(client, monkeypatch):
+    clock = FakeClock()
+    monitor = PoolWaitMonitor(window=5, clock=clock)
+    monkeypatch.setattr(admission.controller, "monitor", monitor)
+    monkeypatch.setattr(admission.controller, "max_pool_wait_ms", 100)
+    with monitor.checkout():
+        clock.now += 0.3
+    assert client.get("/products").status_code == 503
+
+    clock.now += 10  # the slow sample ages out of the window
+    assert monitor.average() == 0
+    assert client.get("/products").status_code == 200
+
+
+def test_spoofed_forwarded_for_does_not_reset_the_ip_budget(client, limits, monkeypatch):
+    monkeypatch.setattr(admission.controller, "trusted_proxies", 1)
+    login = {"email": "a@example.com", "password": "x"}
+    statuses = [
+        # The proxy appends the real peer (203.0.113.9) after whatever the client sent
+        client.post("/login", json=login, headers={"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.9"}).status_code
+        for i in range(3)
+    ]
+    assert statuses[-1] == 429
+    other = client.post("/login", json=login, headers={"X-Forwarded-For": "10.0.0.1, 198.51.100.7"})
+    assert other.status_code != 429
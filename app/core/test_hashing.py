@@ -0,0 +1,52 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from app.core import hashing, security
+from app.db.models import User
+
+# app/core/test_hashing.py
+
+
+@pytest.fixture
+def hasher():
+    pool = hashing.PasswordHasher(rounds=4, workers=2, max_concurrency=2, executor="thread")
+    yield pool
+    pool.shutdown()
+
+
+def test_hash_and_verify_in_pool(hasher):
+    async def run():
+        hashed = await hasher.hash("s3cret-pass")
+        return hashed, await hasher.verify("s3cret-pass", hashed), await hasher.verify("wrong", hashed)
+
+    hashed, good, bad = asyncio.run(run())
+    assert hashed.startswith("$2b$04$")
+    assert good == (True, None)
+    assert bad == (False, None)
+
+
+def test_legacy_hash_is_upgraded(hasher):
+    legacy = hashlib.sha256(b"s3cret-pass").hexdigest()
+    valid, new_hash = asyncio.run(hasher.verify("s3cret-pass", legacy))
+    assert valid and new_hash.startswith("$2b$04$")
+    assert security.verify_password("s3cret-pass", new_hash)
+    assert asyncio.run(hasher.verify("wrong", legacy)) == (False, None)
+
+
+def test_login_rehashes_legacy_password(client, db, hasher, monkeypatch):
+    monkeypatch.setattr(security, "SECRET_KEY", "test-secret-key-with-enough-bytes-for-hs256")
+    monkeypatch.setattr("app.endpoints.users.password_hasher", hasher)
+    db.add(User(
+        full_name="Legacy User", email="legacy@example.com", roles_permissions="user",
+        hashed_password=hashlib.sha256(b"Password123").hexdigest(),
+    ))
+    db.commit()
+
+    response = client.post("/login", json={"email": "legacy@example.com", "password": "Password123"})
+    assert response.status_code == 200
+    db.expire_all()
+    stored = db.query(User).filter(User.email == "legacy@example.com").one().hashed_password
+    assert stored.startswith("$2b$04$")
+    assert client.post("/login", json={"email": "legacy@example.com", "password": "Password123"}).status_code == 200
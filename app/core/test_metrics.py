@@ -0,0 +1,49 @@
+import pytest
+
+from app.core.metrics import MetricsRegistry, registry
+from app.db.profiler import RequestProfile
+
+# app/core/test_metrics.py
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    stats = RequestProfile()
+    stats.db_time, stats.statements = 0.05, 2
+    for duration in (0.05, 0.5, 5.0):
+        metrics.record("GET", "/products", 200, duration, stats)
+    body = metrics.render().decode()
+    worker = metrics.worker
+    assert f'srx_http_request_duration_seconds_bucket{{method="GET",route="/products",worker="{worker}",le="0.1"}} 1' in body
+    assert f'srx_http_request_duration_seconds_bucket{{method="GET",route="/products",worker="{worker}",le="1.0"}} 2' in body
+    assert f'srx_http_request_duration_seconds_bucket{{method="GET",route="/products",worker="{worker}",le="+Inf"}} 3' in body
+    assert f'srx_db_statements_total{{method="GET",route="/products",worker="{worker}"}} 6' in body
+
+
+def test_metrics_endpoint_reports_routes_statuses_and_db_time(client):
+    client.post("/categories", params={"category_name": "Books"})
+    client.get("/products/missing")
+    client.get("/products/also-missing")
+    client.get("/no-such-route")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+
+    def value(prefix):
+        return [float(line.rsplit(" ", 1)[1]) for line in lines if line.startswith(prefix)]
+
+    assert value('srx_http_requests_total{method="GET",route="/products/{product_id}",status="404"') == [2]
+    assert value('srx_http_requests_total{method="GET",route="unmatched",status="404"') == [1]
+    assert value('srx_db_statements_total{method="POST",route="/categories"')[0] >= 2
+    assert value('srx_db_time_seconds_sum{method="POST",route="/categories"')[0] > 0
+    assert value("srx_http_requests_in_flight") == [0]
+    assert not any('route="/metrics"' in line for line in lines)
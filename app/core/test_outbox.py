@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.metrics import MetricsRegistry
+from app.core.outbox import OutboxWorker, backoff_delay
+from app.crud import crud_orders, crud_outbox, crud_products
+from app.db.models import OutboxEvent
+from app.schemas import OrderCreate, ProductCreate
+
+# app/core/test_outbox.py
+
+
+@pytest.fixture(autouse=True)
+def enabled_topics(monkeypatch):
+    # SRX_OUTBOX_TOPICS is opt-in and empty by default
+    monkeypatch.setattr(crud_outbox, "OUTBOX_TOPICS", ["order.created"])
+
+
+@pytest.fixture
+def delivered(monkeypatch):
+    events = []
+    monkeypatch.setitem(crud_outbox.HANDLERS, "order.created", [events.append])
+    return events
+
+
+@pytest.fixture
+def make_worker(async_engine):
+    session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    def make(**options):
+        return OutboxWorker(session_scope=session_factory, registry=MetricsRegistry(), **options)
+    return make
+
+
+def _place_order(db, count=10, quantity=1):
+    category = crud_products.create_category(db, category_name="Books")
+    product = crud_products.create_product(db, ProductCreate(
+        name="Novel", price="12.50", category_id=category.category_id, count=count,
+    ))
+    return crud_orders.create_order(db, OrderCreate(
+        user_id="u1", product_id=product.product_id, payment_status="pending",
+        address_id="a1", quantity=quantity, status="pending",
+    ))
+
+
+def test_events_are_written_with_the_order_only(db, delivered):
+    order = _place_order(db)
+    event = db.query(OutboxEvent).one()
+    assert (event.topic, event.payload["order_id"], event.payload["unit_price"]) == ("order.created", order.order_id, "12.50")
+    with pytest.raises(HTTPException):
+        _place_order(db, count=0)
+    assert db.query(OutboxEvent).count() == 1
+
+
+def test_events_are_written_even_without_a_local_handler(db, make_worker):
+    # Handlers may live in a separate worker deployment
+    _place_order(db)
+    assert db.query(OutboxEvent).count() == 1
+    worker = make_worker()
+    assert asyncio.run(worker.run_once()) == 0  # nothing here can deliver it, so it stays queued
+    assert worker.stats["pending"] == 1
+
+
+def test_topics_can_be_switched_off_and_must_be_known(db, monkeypatch):
+    crud_outbox.enqueue_event(db, "order.created", {"order_id": "o1"}, enabled_topics=[])
+    monkeypatch.setattr(crud_outbox, "OUTBOX_TOPICS", [])
+    _place_order(db)
+    assert db.query(OutboxEvent).count() == 0
+    with pytest.raises(ValueError):
+        crud_outbox.enqueue_event(db, "order.shipped", {})
+
+
+def test_worker_delivers_and_deletes_events(db, delivered, make_worker):
+    order = _place_order(db)
+    worker = make_worker()
+    assert asyncio.run(worker.run_once()) == 1
+    assert [event.payload["order_id"] for event in delivered] == [order.order_id]
+    assert db.query(OutboxEvent).count() == 0
+    assert worker.stats["pending"] == 0
+    assert b'srx_outbox_events_total{result="delivered",topic="order.created"' in worker.registry.render()
+
+
+def test_failing_handler_is_retried_with_backoff_then_parked(db, monkeypatch, make_worker):
+    def broken(event):
+        raise RuntimeError("smtp down")
+
+    monkeypatch.setitem(crud_outbox.HANDLERS, "order.created", [broken])
+    _place_order(db)
+    worker = make_worker(max_attempts=2, stats_interval=0)
+    asyncio.run(worker.run_once())
+    db.expire_all()
+    event = db.query(OutboxEvent).one()
+    assert (event.attempts, event.failed_at, event.last_error) == (1, None, "RuntimeError: smtp down")
+    assert event.available_at > event.created_at
+    assert asyncio.run(worker.run_once()) == 0  # not due yet
+
+    db.query(OutboxEvent).update({"available_at": event.created_at})
+    db.commit()
+    asyncio.run(worker.run_once())
+    db.expire_all()
+    event = db.query(OutboxEvent).one()
+    assert (event.attempts, event.available_at) == (2, None)
+    assert event.failed_at is not None
+    assert worker.stats == {"pending": 0, "failed": 1, "oldest_age_seconds": 0.0}
+
+    assert crud_outbox.requeue_failed_events(db) == 1
+
+
+def test_queue_stats_are_refreshed_on_an_interval(db, make_worker):
+    worker = make_worker(stats_interval=3600)
+    asyncio.run(worker.run_once())
+    assert worker.stats["pending"] == 0
+    _place_order(db)
+    asyncio.run(worker.run_once())
+    assert worker.stats["pending"] == 0  # not due for another hour
+    worker._next_stats = 0.0
+    asyncio.run(worker.run_once())
+    assert worker.stats["pending"] == 1
+
+
+def test_backoff_grows_and_is_capped():
+    assert 1 <= backoff_delay(1, base=2, cap=100) <= 2
+    assert 8 <= backoff_delay(4, base=2, cap=100) <= 16
+    assert backoff_delay(30, base=2, cap=100) <= 100
+
+
+def test_background_task_drains_the_outbox(db, delivered, make_worker):
+    _place_order(db)
+
+    async def run():
+        worker = make_worker(poll_interval=0.01)
+        worker.start()
+        for _ in range(200):
+            if delivered:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert len(delivered) == 1
+    assert db.query(OutboxEvent).count() == 0
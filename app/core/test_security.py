@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+import jwt
+import pytest
+
+from app.core import security
+
+# app/core/test_security.py
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setattr(security, "SECRET_KEY", "test-secret-key-with-enough-bytes-for-hs256")
+    security.token_cache.clear()
+    yield
+    security.token_cache.clear()
+
+
+def test_verify_access_token_checks_signature_once(monkeypatch):
+    token = security.create_access_token({"user_id": "u1"})
+    calls = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: calls.append(1) or real_decode(*args, **kwargs))
+    assert security.verify_access_token(token)["user_id"] == "u1"
+    assert security.verify_access_token(token)["user_id"] == "u1"
+    assert len(calls) == 1
+
+
+def test_expired_token_is_not_cached():
+    token = security.create_access_token({"user_id": "u1"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(ValueError, match="expired"):
+        security.verify_access_token(token)
+    assert len(security.token_cache) == 0
+
+
+def test_address_routes_require_bearer_header(client):
+    token = security.create_access_token({"user_id": "u1"})
+    address = {"address": "1 Main St", "city": "Pune", "state": "MH", "country": "IN", "postal_code": "411001"}
+    assert client.post("/addresses", json=address).status_code == 401
+    assert client.post("/addresses", json=address, headers={"Authorization": "Bearer junk"}).status_code == 401
+
+    headers = {"Authorization": f"Bearer {token}"}
+    created = client.post("/addresses", json=address, headers=headers)
+    assert created.status_code == 200
+    assert created.json()["user_id"] == "u1"
+    assert [row["city"] for row in client.get("/addresses", headers=headers).json()] == ["Pune"]
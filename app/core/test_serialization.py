@@ -0,0 +1,46 @@
+import hashlib
+
+import orjson
+import pytest
+from fastapi import Response
+
+from app.core.serialization import fast_response, project
+from app.crud import crud_orders, crud_products, crud_users
+from app.schemas import AddressRead, OrderCreate, OrderRead, ProductCreate, ProductRead, UserCreate, UserRead
+
+# app/core/test_serialization.py
+
+
+def _rows(db):
+    user = crud_users.create_user(db, UserCreate(
+        full_name="Fast Path", email="fast@example.com", password="Password123", roles_permissions="user",
+    ), hashed_password=hashlib.sha256(b"Password123").hexdigest())
+    category = crud_products.create_category(db, category_name="Books")
+    product = crud_products.create_product(db, ProductCreate(
+        sku="SKU-1", name="Novel", price="12.50", category_id=category.category_id, count=5,
+        product_metadata={"author": "Ann", "tags": ["a", "b"], "pages": 320},
+    ))
+    order = crud_orders.create_order(db, OrderCreate(
+        user_id=user.user_id, product_id=product.product_id, payment_status="COD",
+        address_id="a1", quantity=2, status="pending",
+    ))
+    return [(user, UserRead), (product, ProductRead), (order, OrderRead)]
+
+
+def test_fast_path_matches_validated_output(db):
+    for row, model in _rows(db):
+        expected = model.model_validate(row, from_attributes=True).model_dump(mode="json")
+        assert orjson.loads(fast_response(row, model, enabled=True).body) == expected
+        assert orjson.loads(fast_response([row], model, enabled=True).body) == [expected]
+        assert fast_response(row, model, enabled=False) is row
+
+
+def test_fast_path_keeps_headers_and_rejects_untrusted_models(db):
+    (user, _), *_ = _rows(db)
+    response = Response()
+    response.headers["X-Next-Cursor"] = "abc"
+    fast = fast_response([user], UserRead, response, enabled=True)
+    assert fast.headers["x-next-cursor"] == "abc"
+    assert fast.headers["content-type"] == "application/json"
+    with pytest.raises(ValueError):
+        project(user, AddressRead)
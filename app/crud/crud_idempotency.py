@@ -0,0 +1,237 @@
+"""
+Idempotency keys for retried POSTs.
+
+The first request with a given ``Idempotency-Key`` claims it by inserting a
+row, runs, and stores its response on that row. Retries with the same key
+get the stored response back without running again. A retry that arrives
+while the first attempt is still running waits for it: on the same worker
+through an in-process event, across workers by polling the row.
+
+The handler runs on its own session inside one database transaction, and
+its commits only flush. The response is stored in that transaction and
+everything commits at once, so a crash can never leave the handler's
+writes committed without the response a retry needs to replay. A crash
+before that commit leaves only the claim, and the request runs again once
+the claim is older than SRX_IDEMPOTENCY_LOCK_TIMEOUT.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+from sqlalchemy import and_, delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import IDEMPOTENCY_LOCK_TIMEOUT, IDEMPOTENCY_TTL, IDEMPOTENCY_WAIT_TIMEOUT
+from app.db.models import IdempotencyKey
+from app.db.session import DBSession, make_async
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# Handler errors that are a stable answer to the request and are replayed;
+# anything else (5xx, crashes) releases the key so the retry runs again
+REPLAYED_ERROR_STATUSES = frozenset({400, 404, 422})
+# How often a worker deletes expired keys, in seconds
+PURGE_INTERVAL = 300.0
+
+# Keys being processed on this worker -> set once their response is stored
+_inflight: dict[tuple[str, str], asyncio.Event] = {}
+_next_purge = 0.0
+
+
+def fingerprint(payload: Any) -> str:
+    """Hash of the request payload, to refuse a key reused for a different request."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def claim_idempotency_key(db: Session, scope: str, key: str, request_fingerprint: str) -> Optional[IdempotencyKey]:
+    """
+    Claim ``key`` for this request and return None, or return the existing
+    row if another request holds or has answered it. An expired row, or a
+    claim older than SRX_IDEMPOTENCY_LOCK_TIMEOUT, is replaced.
+    """
+    now = datetime.utcnow()
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.key == key,
+        or_(
+            IdempotencyKey.expires_at <= now,
+            and_(
+                IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.created_at <= now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT),
+            ),
+        ),
+    ))
+    try:
+        # Core insert: a row from an earlier poll may still sit in the identity map
+        db.execute(insert(IdempotencyKey).values(
+            scope=scope, key=key, fingerprint=request_fingerprint,
+            created_at=now, expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL),
+        ))
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+    record = db.get(IdempotencyKey, (scope, key), populate_existing=True)
+    # Nothing to hold on to between polls
+    db.commit()
+    return record
+
+
+def save_idempotent_response(db: Session, scope: str, key: str, status_code: int, body: str) -> None:
+    """Store the response on the claimed row, in the caller's transaction."""
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        .values(status_code=status_code, response_body=body)
+    )
+
+
+def release_idempotency_key(db: Session, scope: str, key: str) -> None:
+    """Drop an unanswered claim so the next retry runs the request."""
+    db.rollback()
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None),
+    ))
+    db.commit()
+
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+    db.commit()
+    return result.rowcount
+
+
+claim_idempotency_key_async = make_async(claim_idempotency_key)
+save_idempotent_response_async = make_async(save_idempotent_response)
+release_idempotency_key_async = make_async(release_idempotency_key)
+purge_expired_idempotency_keys_async = make_async(purge_expired_idempotency_keys)
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _replay(record: IdempotencyKey) -> Response:
+    return Response(
+        content=record.response_body, status_code=record.status_code,
+        media_type="application/json", headers={"Idempotent-Replayed": "true"},
+    )
+
+
+async def _maybe_purge(db: DBSession) -> None:
+    global _next_purge
+    if time.monotonic() >= _next_purge:
+        _next_purge = time.monotonic() + PURGE_INTERVAL
+        await purge_expired_idempotency_keys_async(db)
+
+
+@asynccontextmanager
+async def _transaction(db: DBSession) -> AsyncIterator[DBSession]:
+    """
+    A session of the same kind as ``db`` on one connection-level transaction,
+    committed when the block exits cleanly and rolled back otherwise. The
+    session's own commit() only flushes; its rollback() rolls back everything.
+    """
+    if isinstance(db, AsyncSession):
+        async with db.bind.connect() as conn:
+            session = AsyncSession(bind=conn, join_transaction_mode="rollback_only", autoflush=False, expire_on_commit=False)
+            try:
+                await conn.begin()
+                yield session
+                await conn.commit()
+            finally:
+                await session.close()
+        return
+    conn = await run_in_threadpool(db.get_bind().connect)
+    session = Session(bind=conn, join_transaction_mode="rollback_only", autoflush=False, expire_on_commit=False)
+    try:
+        await run_in_threadpool(conn.begin)
+        yield session
+        await run_in_threadpool(conn.commit)
+    finally:
+        await run_in_threadpool(session.close)
+        await run_in_threadpool(conn.close)
+
+
+async def run_idempotent(
+    db: DBSession,
+    scope: str,
+    key: Optional[str],
+    payload: Any,
+    handler: Callable[[DBSession], Awaitable[Any]],
+    response_model: Any,
+) -> Any:
+    """
+    Run ``handler`` at most once per ``(scope, key)``, passing it the session
+    to do its work on. Without a key the handler just runs on ``db``. The
+    result is serialized with ``response_model`` and the same bytes are
+    returned to the first caller and every retry.
+    """
+    if key is None:
+        return await handler(db)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+
+    await _maybe_purge(db)
+    request_fingerprint = fingerprint(payload)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+    delay = 0.01
+    while True:
+        record = await claim_idempotency_key_async(db, scope, key, request_fingerprint)
+        if record is None:
+            break
+        if record.fingerprint != request_fingerprint:
+            raise HTTPException(status_code=422, detail=f"{HEADER} was already used for a different request")
+        if record.status_code is not None:
+            return _replay(record)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(
+                status_code=409, detail=f"A request with this {HEADER} is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        event = _inflight.get((scope, key))
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            # Held by another worker: poll with backoff
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+
+    event = _inflight[(scope, key)] = asyncio.Event()
+    try:
+        try:
+            async with _transaction(db) as session:
+                result = await handler(session)
+                adapter = _adapter(response_model)
+                body = adapter.dump_json(adapter.validate_python(result, from_attributes=True)).decode()
+                await save_idempotent_response_async(session, scope, key, 200, body)
+        except HTTPException as exc:
+            # The handler's writes are rolled back; store the answer on its own
+            if exc.status_code in REPLAYED_ERROR_STATUSES:
+                async with _transaction(db) as session:
+                    await save_idempotent_response_async(session, scope, key, exc.status_code, json.dumps({"detail": exc.detail}))
+            else:
+                await release_idempotency_key_async(db, scope, key)
+            raise
+        except BaseException:
+            await asyncio.shield(release_idempotency_key_async(db, scope, key))
+            raise
+        return Response(content=body, media_type="application/json")
+    finally:
+        del _inflight[(scope, key)]
+        event.set()
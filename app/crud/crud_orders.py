@@ -1,34 +1,286 @@
+from datetime import datetime
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterator, Optional
+from sqlalchemy import case, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.models import Order  # <-- Import your SQLAlchemy Order model
-from app.schemas import OrderCreate, OrderUpdate
+from app.db.session import make_async
+from app.db.models import Order, OrderStatus, PaymentStatus, Product  # <-- Import your SQLAlchemy Order model
+from app.schemas import OrderBulkTransition, OrderCreate, OrderTransitionOutcome, OrderUpdate, CartCheckout
 from fastapi import HTTPException
-from app.crud.crud_products import get_product, update_product_stock  # <-- Import the function to check product existence
+from app.crud.crud_products import get_product_row, reserve_product_stock, invalidate_product_cache  # <-- Import the function to check product existence
+from app.crud.pagination import keyset_page
+from app.crud.crud_sales import record_order_sales
+from app.crud.crud_outbox import enqueue_event
+
+# Rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+# Stable sort key for keyset pagination of order listings
+ORDER_PAGE_KEY = (Order.created_at, Order.order_id)
+
+def _enqueue_order_created(db: Session, orders: list) -> None:
+    # Follow-up work (emails, inventory sync, ...) runs later in the outbox worker
+    for order in orders:
+        enqueue_event(db, "order.created", {
+            "order_id": order.order_id,
+            "user_id": order.user_id,
+            "product_id": order.product_id,
+            "quantity": order.quantity,
+            "unit_price": str(order.unit_price) if order.unit_price is not None else None,
+            "status": order.status.value,
+            "created_at": order.created_at.isoformat(),
+        })
+
+# Moves allowed by bulk transitions: current value -> reachable values
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.pending: {OrderStatus.processing, OrderStatus.cancelled},
+    OrderStatus.processing: {OrderStatus.completed, OrderStatus.cancelled},
+}
+PAYMENT_STATUS_TRANSITIONS = {
+    PaymentStatus.pending: {PaymentStatus.completed, PaymentStatus.failed},
+    PaymentStatus.failed: {PaymentStatus.pending},
+    PaymentStatus.COD: {PaymentStatus.completed},
+    PaymentStatus.completed: {PaymentStatus.refunded},
+    PaymentStatus.Pre_paid: {PaymentStatus.refunded},
+}
 
 def create_order(db: Session, order: OrderCreate):
-    #check if items in order exist and available
-    product = get_product(db, product_id=order.product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    if product.count < order.quantity:
+    """
+    Reserve stock and insert the order in one transaction.
+
+    The stock check and decrement are a single conditional UPDATE, so two
+    concurrent checkouts for the last unit cannot both succeed.
+    """
+    unit_price = reserve_product_stock(db, product_id=order.product_id, quantity=order.quantity)
+    if unit_price is None:
+        db.rollback()
+        # Only the failure path pays for the extra lookup to pick the right error
+        if not get_product_row(db, order.product_id):
+            raise HTTPException(status_code=404, detail="Product not found")
         raise HTTPException(status_code=400, detail="Insufficient product stock")
-    stock_update = update_product_stock(db, product_id=order.product_id, quantity=order.quantity, operation="decrease")
-    if not stock_update:
-        raise HTTPException(status_code=400, detail="Failed to update product stock")
     db_order = Order(  # <-- Use SQLAlchemy model, not Pydantic
         user_id=order.user_id,
         product_id=order.product_id,
         payment_status=order.payment_status,
         address_id=order.address_id,
         quantity=order.quantity,
+        unit_price=unit_price,
         status=order.status
     )
     db.add(db_order)
+    db.flush()
+    record_order_sales(db, [db_order])
+    _enqueue_order_created(db, [db_order])
     db.commit()
+    invalidate_product_cache(order.product_id)
     db.refresh(db_order)
     return db_order
 
-def get_orders(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Order).offset(skip).limit(limit).all()
+def checkout_cart(db: Session, cart: CartCheckout) -> list[Order]:
+    """
+    Place one order row per cart line in a single transaction.
+
+    Products are fetched with one IN query and stock for every line is
+    reserved with one set-based conditional UPDATE; if any line is unknown or
+    short on stock the whole cart is rolled back.
+    """
+    quantities: dict[str, int] = {}
+    for item in cart.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    rows = db.query(Product.product_id, Product.count, Product.price).filter(Product.product_id.in_(quantities)).all()
+    stock = {product_id: count for product_id, count, _ in rows}
+    prices = {product_id: price for product_id, _, price in rows}
+    missing = [product_id for product_id in quantities if product_id not in stock]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Products not found: {', '.join(missing)}")
+
+    requested = case(quantities, value=Product.product_id)
+    result = db.execute(
+        update(Product)
+        .where(Product.product_id.in_(quantities), Product.count >= requested)
+        .values(count=Product.count - requested)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(quantities):
+        db.rollback()
+        short = [product_id for product_id, quantity in quantities.items() if stock[product_id] < quantity]
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient product stock: {', '.join(short) or 'stock changed during checkout'}",
+        )
+
+    db_orders = [
+        Order(
+            user_id=cart.user_id,
+            product_id=item.product_id,
+            payment_status=cart.payment_status,
+            address_id=cart.address_id,
+            quantity=item.quantity,
+            unit_price=prices[item.product_id],
+            status=cart.status,
+        )
+        for item in cart.items
+    ]
+    db.add_all(db_orders)
+    db.flush()
+    record_order_sales(db, db_orders)
+    _enqueue_order_created(db, db_orders)
+    order_ids = [db_order.order_id for db_order in db_orders]
+    db.commit()
+    for product_id in quantities:
+        invalidate_product_cache(product_id)
+    # Reload every row (including server defaults) with one query instead of N refreshes
+    loaded = {
+        db_order.order_id: db_order
+        for db_order in db.query(Order).filter(Order.order_id.in_(order_ids)).populate_existing()
+    }
+    return [loaded[order_id] for order_id in order_ids]
+
+def get_orders(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None):
+    query = keyset_page(db.query(Order), ORDER_PAGE_KEY, cursor, limit)
+    if skip:
+        query = query.offset(skip)
+    return query.all()
+
+def _export_statement(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[OrderStatus] = None,
+    payment_status: Optional[PaymentStatus] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    # Core rows rather than ORM objects: nothing accumulates in the identity map
+    stmt = select(*Order.__table__.columns).order_by(*ORDER_PAGE_KEY)
+    if start is not None:
+        stmt = stmt.where(Order.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Order.created_at < end)
+    if status is not None:
+        stmt = stmt.where(Order.status == OrderStatus(status.value))
+    if payment_status is not None:
+        stmt = stmt.where(Order.payment_status == PaymentStatus(payment_status.value))
+    return stmt.execution_options(stream_results=True, yield_per=batch_size)
+
+def stream_orders(db: Session, batch_size: int = EXPORT_BATCH_SIZE, **filters) -> Iterator[list]:
+    """
+    Yield matching orders as lists of row mappings, ``batch_size`` at a time,
+    from a server-side cursor so memory stays flat for any export size.
+    """
+    result = db.execute(_export_statement(batch_size=batch_size, **filters))
+    for partition in result.mappings().partitions():
+        yield partition
+
+async def stream_orders_async(db: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE, **filters) -> AsyncIterator[list]:
+    """
+    Async counterpart of stream_orders backed by AsyncSession.stream.
+    """
+    result = await db.stream(_export_statement(batch_size=batch_size, **filters))
+    async for partition in result.mappings().partitions():
+        yield partition
+
+def _sources(transitions: dict, target) -> list:
+    return [source for source, targets in transitions.items() if target in targets]
+
+def transition_orders(db: Session, transition: OrderBulkTransition) -> dict:
+    """
+    Move orders to ``transition.status`` and/or ``transition.payment_status``
+    with one set-based UPDATE whose WHERE clause only admits allowed
+    transitions, and report an outcome per order. A field that already has
+    its target value counts as a no-op, so only the other field's move is
+    checked; orders that would not change at all are left alone.
+
+    The candidates are read first (locked FOR UPDATE where supported) to tell
+    missing orders from invalid transitions and to move the updated orders
+    between status buckets of the sales rollup in the same transaction.
+    """
+    status = OrderStatus(transition.status.value) if transition.status else None
+    payment_status = PaymentStatus(transition.payment_status.value) if transition.payment_status else None
+    guard, changes = [], []
+    if status is not None:
+        guard.append(Order.status.in_([status, *_sources(ORDER_STATUS_TRANSITIONS, status)]))
+        changes.append(Order.status != status)
+    if payment_status is not None:
+        guard.append(Order.payment_status.in_([payment_status, *_sources(PAYMENT_STATUS_TRANSITIONS, payment_status)]))
+        changes.append(Order.payment_status != payment_status)
+    guard.append(or_(*changes))
+
+    candidates = select(
+        Order.order_id, Order.status, Order.payment_status, Order.created_at,
+        Order.product_id, Order.quantity, Order.unit_price,
+    ).with_for_update()
+    if transition.order_ids is not None:
+        order_ids = list(dict.fromkeys(transition.order_ids))
+        candidates = candidates.where(Order.order_id.in_(order_ids))
+    else:
+        # A filter only picks orders that can move, oldest first; call again for the next batch
+        filters = transition.filter
+        candidates = candidates.where(*guard)
+        if filters.status is not None:
+            candidates = candidates.where(Order.status == OrderStatus(filters.status.value))
+        if filters.payment_status is not None:
+            candidates = candidates.where(Order.payment_status == PaymentStatus(filters.payment_status.value))
+        if filters.created_from is not None:
+            candidates = candidates.where(Order.created_at >= filters.created_from)
+        if filters.created_to is not None:
+            candidates = candidates.where(Order.created_at < filters.created_to)
+        candidates = candidates.order_by(*ORDER_PAGE_KEY).limit(transition.limit)
+    rows = {row.order_id: row for row in db.execute(candidates)}
+    if transition.order_ids is None:
+        order_ids = list(rows)
+
+    def allowed(row) -> bool:
+        return (
+            (status in (None, row.status) or status in ORDER_STATUS_TRANSITIONS.get(row.status, ()))
+            and (payment_status in (None, row.payment_status)
+                 or payment_status in PAYMENT_STATUS_TRANSITIONS.get(row.payment_status, ()))
+            and not (status in (None, row.status) and payment_status in (None, row.payment_status))
+        )
+
+    eligible = [order_id for order_id, row in rows.items() if allowed(row)]
+    updated = set()
+    if eligible:
+        values = {}
+        if status is not None:
+            values["status"] = status
+        if payment_status is not None:
+            values["payment_status"] = payment_status
+        result = db.execute(
+            update(Order)
+            .where(Order.order_id.in_(eligible), *guard)
+            .values(**values)
+            .returning(Order.order_id)
+            .execution_options(synchronize_session=False)
+        )
+        updated = set(result.scalars())
+    # Only orders whose status changed move between rollup buckets
+    previous = [rows[order_id] for order_id in updated if rows[order_id].status != status] if status is not None else []
+    if previous:
+        record_order_sales(db, previous, sign=-1)
+        record_order_sales(db, [SimpleNamespace(**{**row._asdict(), "status": status}) for row in previous])
+    db.commit()
+
+    results = []
+    for order_id in order_ids:
+        row = rows.get(order_id)
+        if row is None:
+            results.append({"order_id": order_id, "outcome": OrderTransitionOutcome.not_found})
+            continue
+        if order_id in updated:
+            outcome = OrderTransitionOutcome.updated
+        elif status in (None, row.status) and payment_status in (None, row.payment_status):
+            outcome = OrderTransitionOutcome.unchanged
+        else:
+            outcome = OrderTransitionOutcome.invalid_transition
+        moved = order_id in updated
+        results.append({
+            "order_id": order_id,
+            "outcome": outcome,
+            "status": (status if moved and status is not None else row.status).value,
+            "payment_status": (payment_status if moved and payment_status is not None else row.payment_status).value,
+        })
+    return {"matched": len(rows), "updated": len(updated), "results": results}
 
 def get_order_by_id(db: Session, order_id: str):
     return db.query(Order).filter(Order.order_id == order_id).first()
@@ -40,8 +292,11 @@ def update_order(db: Session, order_id: str, order_update: OrderUpdate):
 
     if order_update.payment_status is not None:
         db_order.payment_status = order_update.payment_status
-    if order_update.status is not None:
+    if order_update.status is not None and order_update.status.value != db_order.status.value:
+        # Move the order between status buckets of the sales rollup
+        record_order_sales(db, [db_order], sign=-1)
         db_order.status = order_update.status
+        record_order_sales(db, [db_order])
 
     db.commit()
     db.refresh(db_order)
@@ -52,12 +307,26 @@ def delete_order(db: Session, order_id: str):
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
     # Check if the order can be deleted based on its status
+    record_order_sales(db, [db_order], sign=-1)
     db.delete(db_order)
     db.commit()
     return db_order
 
-def get_orders_by_user(db: Session, user_id: str, skip: int = 0, limit: int = 10):
-    db_orders = db.query(Order).filter(Order.user_id == user_id).offset(skip).limit(limit).all()
-    if not db_orders:
+def get_orders_by_user(db: Session, user_id: str, skip: int = 0, limit: int = 10, cursor: Optional[str] = None):
+    query = keyset_page(db.query(Order).filter(Order.user_id == user_id), ORDER_PAGE_KEY, cursor, limit)
+    if skip:
+        query = query.offset(skip)
+    db_orders = query.all()
+    if not db_orders and not cursor:
         raise HTTPException(status_code=404, detail="No orders found for this user")
-    return db_orders
\ No newline at end of file
+    return db_orders
+
+# Async variants for routers running on an AsyncSession (see app.db.session.make_async)
+create_order_async = make_async(create_order)
+checkout_cart_async = make_async(checkout_cart)
+get_orders_async = make_async(get_orders)
+get_order_by_id_async = make_async(get_order_by_id)
+update_order_async = make_async(update_order)
+transition_orders_async = make_async(transition_orders)
+delete_order_async = make_async(delete_order)
+get_orders_by_user_async = make_async(get_orders_by_user)
@@ -0,0 +1,138 @@
+"""
+Transactional outbox.
+
+Write paths call ``enqueue_event`` before they commit, so an event exists
+if and only if the change that caused it does. The outbox worker
+(app.core.outbox) then claims events in batches, runs the handlers
+registered for their topic and deletes them. Delivery is at least once:
+handlers must tolerate seeing an event twice (``event.id`` is stable).
+
+Whether an event is written depends only on SRX_OUTBOX_TOPICS, never on
+which handlers happen to be imported in the writing process, so web
+processes and a separate handler worker can be deployed independently. A
+worker only claims topics it has handlers for and leaves the rest queued.
+Topics are opt-in: none is written until it is listed.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import OUTBOX_TOPICS
+from app.db.models import OutboxEvent
+from app.db.session import make_async
+
+Handler = Callable[[Any], Union[Awaitable[None], None]]
+
+# Every topic the application emits
+TOPICS = ("order.created",)
+
+# topic -> handlers, registered at import time with @outbox_handler
+HANDLERS: dict[str, list[Handler]] = {}
+
+
+def outbox_handler(topic: str) -> Callable[[Handler], Handler]:
+    """Register ``func(event)`` (sync or async) to run for every event on ``topic``."""
+    def register(func: Handler) -> Handler:
+        HANDLERS.setdefault(topic, []).append(func)
+        return func
+    return register
+
+
+def enqueue_event(db: Session, topic: str, payload: dict, enabled_topics: Optional[list[str]] = None) -> None:
+    """
+    Add an event to the caller's transaction, without committing. Topics
+    left out of ``enabled_topics`` (default SRX_OUTBOX_TOPICS, empty unless
+    configured) are skipped: nothing would ever drain them, and a deployment
+    that consumes none pays nothing on the write path.
+    """
+    if topic not in TOPICS:
+        raise ValueError(f"unknown outbox topic {topic!r}")
+    if topic in (OUTBOX_TOPICS if enabled_topics is None else enabled_topics):
+        db.add(OutboxEvent(topic=topic, payload=payload))
+
+
+def claim_events(db: Session, limit: int, lease: float, topics: Optional[list[str]] = None) -> list:
+    """
+    Take up to ``limit`` due events, oldest first, and hide them from other
+    workers for ``lease`` seconds. With ``topics``, only events on those
+    topics are taken. Returns rows of (id, topic, payload, attempts).
+    """
+    now = datetime.utcnow()
+    # Read first: an idle poll never takes the write lock
+    query = select(OutboxEvent.id).where(OutboxEvent.available_at <= now)
+    if topics is not None:
+        query = query.where(OutboxEvent.topic.in_(topics))
+    ids = db.execute(
+        query
+        .order_by(OutboxEvent.available_at, OutboxEvent.id)
+        .limit(limit)
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return []
+    # Re-checking available_at keeps a concurrent claimer from taking the same rows
+    rows = db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(ids), OutboxEvent.available_at <= now)
+        .values(available_at=now + timedelta(seconds=lease), attempts=OutboxEvent.attempts + 1)
+        .returning(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload, OutboxEvent.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return sorted(rows, key=lambda row: row.id)
+
+
+def complete_events(db: Session, ids: list[int]) -> None:
+    if ids:
+        db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+        db.commit()
+
+
+def retry_event(db: Session, event_id: int, error: str, delay: Optional[float]) -> None:
+    """Schedule another attempt in ``delay`` seconds, or park the event as failed when ``delay`` is None."""
+    now = datetime.utcnow()
+    values: dict = {"last_error": error[:2000]}
+    if delay is None:
+        values.update(available_at=None, failed_at=now)
+    else:
+        values["available_at"] = now + timedelta(seconds=delay)
+    db.execute(update(OutboxEvent).where(OutboxEvent.id == event_id).values(**values))
+    db.commit()
+
+
+def outbox_stats(db: Session) -> dict:
+    """
+    Queue depth: pending events, the age of the oldest one, and failed
+    events. Both counts read only ix_outbox_events_failed_at_created_at.
+    """
+    pending, oldest = db.execute(
+        select(func.count(), func.min(OutboxEvent.created_at)).where(OutboxEvent.failed_at.is_(None))
+    ).one()
+    failed = db.scalar(select(func.count()).select_from(OutboxEvent).where(OutboxEvent.failed_at.is_not(None)))
+    db.rollback()
+    return {
+        "pending": pending,
+        "failed": failed,
+        "oldest_age_seconds": max((datetime.utcnow() - oldest).total_seconds(), 0.0) if oldest else 0.0,
+    }
+
+
+def requeue_failed_events(db: Session) -> int:
+    """Give parked events a fresh set of attempts (after fixing their handler)."""
+    result = db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.failed_at.is_not(None))
+        .values(failed_at=None, attempts=0, available_at=datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount
+
+
+# Async variants for the worker (see app.db.session.make_async)
+claim_events_async = make_async(claim_events)
+complete_events_async = make_async(complete_events)
+retry_event_async = make_async(retry_event)
+outbox_stats_async = make_async(outbox_stats)
+requeue_failed_events_async = make_async(requeue_failed_events)
@@ -1,21 +1,108 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.db.session import make_async
 from app.db.models import Product, Category
-from app.schemas import ProductBase, ProductCreate, ProductRead, ProductUpdate
+from app.db.search import products_fts, products_fts_keys, BM25_WEIGHTS
+from app.schemas import ProductBase, ProductCreate, ProductRead, ProductSort, ProductUpdate
 from app.core.security import hash_password, verify_password
 import re
+import uuid
 from fastapi import HTTPException
+from app.crud.pagination import keyset_page
+from app.core.cache import TTLCache
+from app.core.config import (
+    PRODUCT_CACHE_SIZE, PRODUCT_LIST_CACHE_SIZE, PRODUCT_CACHE_TTL, CATEGORY_CACHE_TTL, SEARCH_MAX_CANDIDATES,
+)
 
-def get_categories(db: Session) -> list[dict]:
+# Columns refreshed when a bulk import row matches an existing SKU
+UPSERT_COLUMNS = ("name", "description", "price", "category_id", "count", "product_metadata")
+
+# Read-through caches for hot product lookups and listing pages
+product_cache = TTLCache(maxsize=PRODUCT_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL)
+product_list_cache = TTLCache(maxsize=PRODUCT_LIST_CACHE_SIZE, ttl=PRODUCT_CACHE_TTL)
+_product_version = 0
+
+# Serialized category catalog, rebuilt after create_category/delete_category
+CATEGORY_CATALOG_KEY = "categories"
+category_catalog_cache = TTLCache(maxsize=1, ttl=CATEGORY_CACHE_TTL)
+_category_version = 0
+
+# Stable sort key for keyset pagination of product listings
+PRODUCT_PAGE_KEY = (Product.product_id,)
+
+# Listing sorts: (keyset columns, descending). Each is backed by an index on
+# the same columns, optionally prefixed by category_id (see Product).
+PRODUCT_SORTS = {
+    ProductSort.price: ((Product.price, Product.product_id), False),
+    ProductSort.price_desc: ((Product.price, Product.product_id), True),
+    ProductSort.name: ((Product.name, Product.product_id), False),
+    ProductSort.newest: ((Product.created_at, Product.product_id), True),
+}
+
+def product_sort_key(sort: Optional[ProductSort] = None) -> tuple[tuple, bool]:
+    """Keyset columns and direction for a listing sort (default: product_id)."""
+    if sort is None:
+        return PRODUCT_PAGE_KEY, False
+    return PRODUCT_SORTS[ProductSort(sort)]
+
+@dataclass(frozen=True)
+class CategoryCatalog:
+    """Pre-serialized category list plus its strong ETag."""
+    version: int
+    categories: tuple
+    body: bytes
+    etag: str
+
+def cached_category_catalog() -> Optional[CategoryCatalog]:
     """
-    Retrieve a list of distinct product categories.
+    Return the in-memory catalog without touching the database, if fresh.
     """
-    # categories = db.query(Category.category).distinct().all()
-    # return [category[0] for category in categories]
+    return category_catalog_cache.get(CATEGORY_CATALOG_KEY)
+
+def invalidate_category_catalog() -> None:
+    global _category_version
+    _category_version += 1
+    category_catalog_cache.clear()
+
+def get_category_catalog(db: Session) -> CategoryCatalog:
+    """
+    Build (or reuse) the serialized category catalog. The ETag is a hash of
+    the body, so every worker hands out the same tag for the same catalog.
+    """
+    catalog = cached_category_catalog()
+    if catalog is not None:
+        return catalog
+    version = _category_version
     #returns all categories without duplicates with id
-    categories = db.query(Category).distinct().all()
+    categories = db.query(Category).distinct().order_by(Category.category, Category.category_id).all()
     if not categories:
         raise HTTPException(status_code=404, detail="No categories found")
-    return [{"id": category.category_id, "name": category.category} for category in categories]
+    payload = tuple({"id": category.category_id, "name": category.category} for category in categories)
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    catalog = CategoryCatalog(
+        version=version,
+        categories=payload,
+        body=body,
+        etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+    )
+    # Skip caching if a write bumped the version while we were reading
+    if version == _category_version:
+        category_catalog_cache.set(CATEGORY_CATALOG_KEY, catalog)
+    return catalog
+
+def get_categories(db: Session) -> list[dict]:
+    """
+    Retrieve a list of distinct product categories.
+    """
+    return [dict(category) for category in get_category_catalog(db).categories]
 
 def create_category(db: Session, category_name: str):
     """
@@ -31,6 +118,7 @@ def create_category(db: Session, category_name: str):
     new_category = Category(category=category_name)
     db.add(new_category)
     db.commit()
+    invalidate_category_catalog()
     db.refresh(new_category)
     return new_category
 
@@ -44,12 +132,14 @@ def delete_category(db: Session, category_id: str):
 
     db.delete(category)
     db.commit()
+    invalidate_category_catalog()
     return category
 
 
 
 def create_product(db: Session, product: ProductCreate):
     db_product = Product(
+        sku=product.sku,
         name=product.name,
         description=product.description,
         price=product.price,
@@ -59,42 +149,268 @@ def create_product(db: Session, product: ProductCreate):
     )
     db.add(db_product)
     db.commit()
+    product_list_cache.clear()
     db.refresh(db_product)
     return db_product
 
-def get_product(db: Session, product_id: str) -> ProductRead:
+def upsert_products(db: Session, products: list[ProductCreate]) -> int:
+    """
+    Insert or update a batch of products keyed on ``sku`` and commit once.
+
+    Rows go out as a single executemany, which SQLAlchemy batches into
+    multi-row INSERT .. ON CONFLICT statements. Returns the number of rows
+    written (one per distinct sku). A constraint failure rolls back the
+    whole batch and raises IntegrityError.
+    """
+    if not products:
+        return 0
+    # Last row wins for a SKU repeated within one batch (Postgres rejects
+    # ON CONFLICT touching the same row twice in one statement)
+    latest = {product.sku: product for product in products}
+    dialect = db.get_bind().dialect.name
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    stmt = insert(Product)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.sku],
+        set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS},
+    )
+    try:
+        db.execute(stmt, [
+            {"product_id": str(uuid.uuid4()), **product.model_dump(include={"sku", *UPSERT_COLUMNS})}
+            for product in latest.values()
+        ])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    invalidate_product_cache()
+    return len(latest)
+
+def invalidate_product_cache(product_id: Optional[str] = None) -> None:
+    """
+    Drop cached reads after a committed write. List pages are always dropped
+    since any product change can shift them.
+    """
+    global _product_version
+    _product_version += 1
+    if product_id is None:
+        product_cache.clear()
+    else:
+        product_cache.pop(product_id)
+    product_list_cache.clear()
+
+def product_cache_stats() -> dict:
+    return {"product": product_cache.stats(), "product_list": product_list_cache.stats()}
+
+def get_product_row(db: Session, product_id: str) -> Optional[Product]:
+    """
+    The ORM row for a product, straight from the database, for code that
+    modifies it. Reads that only return data should use get_product.
+    """
     return db.query(Product).filter(Product.product_id == product_id).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 10) -> list[ProductRead]:
-    return db.query(Product).offset(skip).limit(limit).all()
+def get_product(db: Session, product_id: str, use_cache: bool = True) -> Optional[ProductRead]:
+    """
+    Read one product as an immutable ProductRead snapshot, through the cache
+    unless ``use_cache=False`` (for stock-sensitive reads).
+    """
+    if use_cache:
+        cached = product_cache.get(product_id)
+        if cached is not None:
+            return cached
+    version = _product_version
+    db_product = get_product_row(db, product_id)
+    if not db_product:
+        return None
+    snapshot = ProductRead.model_validate(db_product, from_attributes=True)
+    # Skip caching if a write bumped the version while we were reading
+    if use_cache and version == _product_version:
+        product_cache.set(product_id, snapshot)
+    return snapshot
+
+def get_products(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    category_id: Optional[str] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    in_stock: Optional[bool] = None,
+    sort: Optional[ProductSort] = None,
+    use_cache: bool = True,
+) -> list[ProductRead]:
+    """
+    List products, optionally filtered by category, price range and stock,
+    in one of the PRODUCT_SORTS orders. Filters and ordering run in SQL and
+    the cursor is a keyset over the chosen sort's columns.
+    """
+    sort = ProductSort(sort) if sort is not None else None
+    key = (skip, limit, cursor, category_id, min_price, max_price, in_stock, sort)
+    if use_cache:
+        cached = product_list_cache.get(key)
+        if cached is not None:
+            return list(cached)
+    version = _product_version
+    query = db.query(Product)
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if in_stock is True:
+        query = query.filter(Product.count > 0)
+    elif in_stock is False:
+        query = query.filter(Product.count <= 0)
+    columns, descending = product_sort_key(sort)
+    query = keyset_page(query, columns, cursor, limit, descending=descending)
+    if skip:
+        query = query.offset(skip)
+    snapshots = tuple(ProductRead.model_validate(product, from_attributes=True) for product in query.all())
+    if use_cache and version == _product_version:
+        product_list_cache.set(key, snapshots)
+    return list(snapshots)
+
+def _fts5_query(q: str) -> Optional[str]:
+    # Quote every term so user input can never be parsed as FTS5 syntax;
+    # the last term is a prefix match to support search-as-you-type.
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def _search_sqlite(db: Session, match: str, filters: list, limit: int) -> list[Product]:
+    """
+    Rank inside FTS5 and join only the page's hits to products, so a common
+    term does not drag every match through the join. Filters apply while
+    hits are collected, and bm25() costs per row, so at most
+    SEARCH_MAX_CANDIDATES matching products are scored.
+    """
+    fts = literal_column("products_fts")
+    candidates = select(products_fts.c.rowid.label("key"), func.bm25(fts, *BM25_WEIGHTS).label("score")).where(
+        fts.op("MATCH")(match)
+    )
+    if filters:
+        # Unary "+" keeps the planner from probing FTS5 by rowid for each
+        # filtered product (re-running the MATCH every time); the MATCH
+        # scan drives the join instead.
+        candidates = (
+            candidates
+            .join(products_fts_keys, products_fts_keys.c.key == literal_column("+products_fts.rowid"))
+            .join(Product, Product.product_id == products_fts_keys.c.product_id)
+            .where(*filters)
+        )
+    if SEARCH_MAX_CANDIDATES:
+        candidates = candidates.limit(SEARCH_MAX_CANDIDATES)
+    candidates = candidates.subquery()
+    hits = select(candidates).order_by(candidates.c.score, candidates.c.key).limit(limit).subquery()
+    return db.execute(
+        select(Product)
+        .join(products_fts_keys, products_fts_keys.c.product_id == Product.product_id)
+        .join(hits, hits.c.key == products_fts_keys.c.key)
+        .order_by(hits.c.score, hits.c.key)
+    ).scalars().all()
+
+def search_products(
+    db: Session,
+    q: str,
+    category_id: Optional[str] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    limit: int = 20,
+) -> list[Product]:
+    """
+    Ranked full-text search over name, description and indexed metadata keys.
+    SQLite uses FTS5 with bm25(); Postgres uses the search_vector GIN index.
+    """
+    filters = []
+    if category_id is not None:
+        filters.append(Product.category_id == category_id)
+    if min_price is not None:
+        filters.append(Product.price >= min_price)
+    if max_price is not None:
+        filters.append(Product.price <= max_price)
+    if db.get_bind().dialect.name == "postgresql":
+        query = func.websearch_to_tsquery("simple", q)
+        vector = literal_column("products.search_vector")
+        stmt = select(Product).where(vector.op("@@")(query), *filters).order_by(func.ts_rank_cd(vector, query).desc())
+        return db.execute(stmt.limit(limit)).scalars().all()
+    match = _fts5_query(q)
+    if match is None:
+        return []
+    return _search_sqlite(db, match, filters, limit)
 
 def update_product(db: Session, product_id: str, product_update: ProductUpdate) -> ProductRead:
-    db_product = get_product(db, product_id)
+    db_product = get_product_row(db, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     for key, value in product_update.dict().items():
         setattr(db_product, key, value)
     db.commit()
+    invalidate_product_cache(product_id)
     db.refresh(db_product)
     return db_product
 
+def reserve_product_stock(db: Session, product_id: str, quantity: int) -> Optional[Decimal]:
+    """
+    Decrement stock with a single conditional UPDATE, without committing.
+
+    The ``count >= quantity`` guard runs inside the UPDATE, so concurrent
+    checkouts can never oversell. Returns the product's price from the
+    same statement (RETURNING), or None if nothing was reserved. The caller
+    owns the transaction.
+    """
+    return db.execute(
+        update(Product)
+        .where(Product.product_id == product_id, Product.count >= quantity)
+        .values(count=Product.count - quantity)
+        .returning(Product.price)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
 def update_product_stock(db: Session, product_id: str, quantity: int, operation: str) -> ProductRead:
-    db_product = get_product(db, product_id)
-    if not db_product:
-        raise HTTPException(status_code=404, detail="Product not found")
     if operation == "decrease":
-        if db_product.count < quantity:
+        if reserve_product_stock(db, product_id, quantity) is None:
+            db.rollback()
+            if not get_product_row(db, product_id):
+                raise HTTPException(status_code=404, detail="Product not found")
             raise HTTPException(status_code=400, detail="Insufficient stock")
+        db.commit()
+        invalidate_product_cache(product_id)
+        return get_product_row(db, product_id)
+    db_product = get_product_row(db, product_id)
+    if not db_product:
+        raise HTTPException(status_code=404, detail="Product not found")
     if operation == "increase":
-        db_product.count = str(int(db_product.count) + int(quantity))
+        db_product.count = db_product.count + quantity
     db.commit()
+    invalidate_product_cache(product_id)
     db.refresh(db_product)
     return db_product
 
 def delete_product(db: Session, product_id: str) -> ProductRead:
-    db_product = get_product(db, product_id)
+    db_product = get_product_row(db, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     db.delete(db_product)
     db.commit()
-    return db_product
\ No newline at end of file
+    invalidate_product_cache(product_id)
+    return db_product
+
+# Async variants for routers running on an AsyncSession (see app.db.session.make_async)
+get_categories_async = make_async(get_categories)
+get_category_catalog_async = make_async(get_category_catalog)
+create_category_async = make_async(create_category)
+delete_category_async = make_async(delete_category)
+create_product_async = make_async(create_product)
+upsert_products_async = make_async(upsert_products)
+get_product_async = make_async(get_product)
+get_products_async = make_async(get_products)
+search_products_async = make_async(search_products)
+update_product_async = make_async(update_product)
+update_product_stock_async = make_async(update_product_stock)
+reserve_product_stock_async = make_async(reserve_product_stock)
+delete_product_async = make_async(delete_product)
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.db.session import make_async
+from app.db.models import Order, OrderStatus, SalesDaily
+
+def _status(value) -> OrderStatus:
+    # Freshly added rows still hold the API enum until they are refreshed
+    return OrderStatus(getattr(value, "value", value))
+
+def record_order_sales(db: Session, orders: Iterable[Order], sign: int = 1) -> None:
+    """
+    Add (``sign=1``) or remove (``sign=-1``) orders from the daily rollup,
+    without committing. Lines for the same day/product/status are merged and
+    applied with one upsert, so the rollup moves in the caller's transaction.
+    """
+    totals = defaultdict(lambda: [0, 0, Decimal("0")])
+    for order in orders:
+        key = (order.created_at.date(), order.product_id, _status(order.status))
+        bucket = totals[key]
+        bucket[0] += sign
+        bucket[1] += sign * order.quantity
+        bucket[2] += sign * order.quantity * Decimal(order.unit_price or 0)
+    if not totals:
+        return
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(SalesDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SalesDaily.day, SalesDaily.product_id, SalesDaily.status],
+        set_={
+            "order_count": SalesDaily.order_count + stmt.excluded.order_count,
+            "quantity": SalesDaily.quantity + stmt.excluded.quantity,
+            "revenue": SalesDaily.revenue + stmt.excluded.revenue,
+        },
+    )
+    db.execute(stmt, [
+        {"day": day, "product_id": product_id, "status": status,
+         "order_count": count, "quantity": quantity, "revenue": revenue}
+        for (day, product_id, status), (count, quantity, revenue) in totals.items()
+    ])
+
+def rebuild_sales_rollups(db: Session, start: date, end: date) -> int:
+    """
+    Recompute rollup rows for days in ``[start, end)`` from the orders table
+    and commit. Idempotent, so a backfill can be re-run or resumed per range.
+    """
+    day = func.date(Order.created_at)
+    source = (
+        select(
+            day, Order.product_id, Order.status,
+            func.count(), func.sum(Order.quantity),
+            func.sum(Order.quantity * func.coalesce(Order.unit_price, 0)),
+        )
+        .where(Order.created_at >= start, Order.created_at < end)
+        .group_by(day, Order.product_id, Order.status)
+    )
+    db.execute(delete(SalesDaily).where(SalesDaily.day >= start, SalesDaily.day < end))
+    result = db.execute(SalesDaily.__table__.insert().from_select(
+        ["day", "product_id", "status", "order_count", "quantity", "revenue"], source,
+    ))
+    db.commit()
+    return result.rowcount
+
+def get_daily_sales(
+    db: Session,
+    start: date,
+    end: date,
+    product_id: Optional[str] = None,
+    status: Optional[OrderStatus] = None,
+) -> list[dict]:
+    """
+    Per-day totals for ``[start, end)``, optionally for one product and/or status.
+    """
+    stmt = (
+        select(
+            SalesDaily.day,
+            func.sum(SalesDaily.order_count).label("order_count"),
+            func.sum(SalesDaily.quantity).label("quantity"),
+            func.sum(SalesDaily.revenue).label("revenue"),
+        )
+        .where(SalesDaily.day >= start, SalesDaily.day < end)
+        .group_by(SalesDaily.day)
+        .order_by(SalesDaily.day)
+    )
+    if product_id is not None:
+        stmt = stmt.where(SalesDaily.product_id == product_id)
+    if status is not None:
+        stmt = stmt.where(SalesDaily.status == _status(status))
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+def get_product_sales(
+    db: Session,
+    start: date,
+    end: date,
+    status: Optional[OrderStatus] = None,
+    limit: int = 20,
+) -> list[dict]:
+    """
+    Products ranked by revenue over ``[start, end)``.
+    """
+    revenue = func.sum(SalesDaily.revenue).label("revenue")
+    stmt = (
+        select(
+            SalesDaily.product_id,
+            func.sum(SalesDaily.order_count).label("order_count"),
+            func.sum(SalesDaily.quantity).label("quantity"),
+            revenue,
+        )
+        .where(SalesDaily.day >= start, SalesDaily.day < end)
+        .group_by(SalesDaily.product_id)
+        .order_by(revenue.desc(), SalesDaily.product_id)
+        .limit(limit)
+    )
+    if status is not None:
+        stmt = stmt.where(SalesDaily.status == _status(status))
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+# Async variants for routers running on an AsyncSession (see app.db.session.make_async)
+rebuild_sales_rollups_async = make_async(rebuild_sales_rollups)
+get_daily_sales_async = make_async(get_daily_sales)
+get_product_sales_async = make_async(get_product_sales)
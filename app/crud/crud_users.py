@@ -1,28 +1,39 @@
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.db.session import make_async
 from app.db.models import User, Address
 from app.schemas import UserCreate, UserUpdate, AddressCreate, AddressUpdate
 from app.core.security import hash_password, verify_password
 import re
 from fastapi import HTTPException
+from app.crud.pagination import keyset_page
 
+# Stable sort key for keyset pagination of user listings
+USER_PAGE_KEY = (User.user_id,)
 
-def create_user(db: Session, user: UserCreate):
+
+def validate_new_user(user: UserCreate):
     # Validate email format
     email_regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
     if not re.match(email_regex, user.email):
         raise HTTPException(status_code=422, detail="Invalid email format.")
-    # password validation and hashing
+    # password validation
     password_regex = r'^(?=.*[A-Za-z])(?=.*\d).{8,}$'
     if not re.match(password_regex, user.password):
         raise HTTPException(
             status_code=422,
             detail="Password must be at least 8 characters long and contain both letters and numbers."
         )
-    hashed_password = hash_password(user.password)
-    #check if user already exists
-    existing_user = db.query(User).filter(User.email == user.email).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered.")
+
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None):
+    """
+    Create a user. Request handlers pass ``hashed_password`` computed by the
+    hashing pool; otherwise the password is hashed inline.
+    """
+    validate_new_user(user)
+    if hashed_password is None:
+        hashed_password = hash_password(user.password)
     db_user = User(
         full_name=user.full_name,
         email=user.email,
@@ -30,17 +41,26 @@ def create_user(db: Session, user: UserCreate):
         roles_permissions=user.roles_permissions,
     )
     db.add(db_user)
-    db.commit()
+    # The unique index on email is the duplicate check; /register looks the
+    # email up first only to skip hashing, so no second SELECT here.
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered.")
     db.refresh(db_user)
     return db_user
 
-def get_users(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None):
+    query = keyset_page(db.query(User), USER_PAGE_KEY, cursor, limit)
+    if skip:
+        query = query.offset(skip)
+    return query.all()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def update_user(db: Session, user_email: str, user_update: UserUpdate):
+def update_user(db: Session, user_email: str, user_update: UserUpdate, hashed_password: Optional[str] = None):
     db_user = get_user_by_email(db, email=user_email)
     if not db_user:
         return None
@@ -50,7 +70,7 @@ def update_user(db: Session, user_email: str, user_update: UserUpdate):
     if user_update.email:
         db_user.email = user_update.email
     if user_update.password:
-        db_user.hashed_password = hash_password(user_update.password)
+        db_user.hashed_password = hashed_password or hash_password(user_update.password)
 
     db.commit()
     db.refresh(db_user)
@@ -68,6 +88,13 @@ def delete_user(db: Session, user_email: str, user_password: str):
     db.commit()
     return db_user
 
+def update_password_hash(db: Session, user_id: str, hashed_password: str):
+    """Replace a stored hash, e.g. when upgrading a legacy hash at login."""
+    db.query(User).filter(User.user_id == user_id).update(
+        {User.hashed_password: hashed_password}, synchronize_session=False
+    )
+    db.commit()
+
 def create_address(db: Session, address: AddressCreate):
     db_address = Address(
         user_id=address.user_id,
@@ -85,6 +112,9 @@ def create_address(db: Session, address: AddressCreate):
 def get_user_addresses(db: Session, user_id: str):
     return db.query(Address).filter(Address.user_id == user_id).all()
 
+def get_address_by_id(db: Session, address_id: str):
+    return db.query(Address).filter(Address.address_id == address_id).first()
+
 def update_address(db: Session, address_id: int,user_id:str, address_update: AddressUpdate):
     #Ensure address belongs to the user
     db_address = db.query(Address).filter(Address.address_id == address_id, Address.user_id == user_id).first()
@@ -118,4 +148,17 @@ def delete_address(db: Session, address_id: int, user_id: str):
 
     db.delete(db_address)
     db.commit()
-    return db_address
\ No newline at end of file
+    return db_address
+
+# Async variants for routers running on an AsyncSession (see app.db.session.make_async)
+create_user_async = make_async(create_user)
+get_users_async = make_async(get_users)
+get_user_by_email_async = make_async(get_user_by_email)
+update_user_async = make_async(update_user)
+delete_user_async = make_async(delete_user)
+update_password_hash_async = make_async(update_password_hash)
+create_address_async = make_async(create_address)
+get_user_addresses_async = make_async(get_user_addresses)
+get_address_by_id_async = make_async(get_address_by_id)
+update_address_async = make_async(update_address)
+delete_address_async = make_async(delete_address)
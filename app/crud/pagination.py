@@ -0,0 +1,84 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, Numeric, tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Pack the sort-key values of the last row on a page into an opaque token.
+    """
+    payload = [
+        value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, Decimal) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_value(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Numeric):
+        return Decimal(str(value))
+    return value
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    """
+    Unpack a token produced by encode_cursor for the given key columns.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match sort key")
+        return [_decode_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_page(query: Query, columns: Sequence, cursor: Optional[str], limit: int, descending: bool = False) -> Query:
+    """
+    Order ``query`` by ``columns`` and resume strictly after ``cursor``.
+
+    The row-value comparison lets the database seek straight to the cursor
+    position on an index, so page N costs the same as page one. All key
+    columns share one direction so the comparison stays a single range.
+    """
+    if descending:
+        query = query.order_by(*[column.desc() for column in columns])
+    else:
+        query = query.order_by(*columns)
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        keys, bound = tuple_(*columns), tuple_(*values)
+        query = query.filter(keys < bound if descending else keys > bound)
+    return query.limit(limit)
+
+
+def next_cursor(items: Sequence, columns: Sequence, limit: int) -> Optional[str]:
+    """
+    Cursor for the page after ``items``, or None when this was the last page.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, column.key) for column in columns])
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    """
+    Expose the next-page token on list responses without changing their body.
+    """
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,193 @@
+"""
+Streaming bulk import of the product catalog from CSV or NDJSON.
+
+Rows are read one at a time, validated against ``ProductCreate`` and written
+with ``crud_products.upsert_products`` in batches keyed on ``sku``, so memory
+stays bounded by the batch size regardless of file length.
+
+Usage:
+    python -m app.crud.product_import catalog.csv --format csv --batch-size 5000
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+
+from app.crud.crud_products import upsert_products
+from app.db.session import SessionLocal, make_async
+from app.schemas import ProductCreate
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_BATCH_SIZE = 1000
+# Cap on rejected rows echoed back in a report; the count is always exact
+MAX_REPORTED_REJECTS = 1000
+
+
+@dataclass
+class ImportBatch:
+    number: int
+    products: list = field(default_factory=list)
+    lines: list = field(default_factory=list)  # source line of each product
+    rejected: list = field(default_factory=list)
+
+
+@dataclass
+class ImportReport:
+    batches: list = field(default_factory=list)
+    imported: int = 0
+    rejected_count: int = 0
+    rejected: list = field(default_factory=list)
+
+    def record(self, batch: ImportBatch, written: int, seconds: float) -> dict:
+        self.imported += written
+        self.rejected_count += len(batch.rejected)
+        room = MAX_REPORTED_REJECTS - len(self.rejected)
+        if room > 0:
+            self.rejected.extend(batch.rejected[:room])
+        summary = {
+            "batch": batch.number,
+            "imported": written,
+            "rejected": len(batch.rejected),
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(written / seconds) if seconds else None,
+        }
+        self.batches.append(summary)
+        return summary
+
+    def as_dict(self) -> dict:
+        return {
+            "imported": self.imported,
+            "rejected_count": self.rejected_count,
+            "rejected": self.rejected,
+            "batches": self.batches,
+        }
+
+
+def _csv_records(stream: IO[str]) -> Iterator[tuple[int, dict]]:
+    reader = csv.DictReader(stream)
+    for record in reader:
+        row = {key: (value if value != "" else None) for key, value in record.items() if key}
+        if row.get("product_metadata"):
+            try:
+                row["product_metadata"] = json.loads(row["product_metadata"])
+            except ValueError:
+                pass  # left as a string; ProductCreate accepts any metadata value
+        yield reader.line_num, row
+
+
+def _ndjson_records(stream: IO[str]) -> Iterator[tuple[int, Optional[dict]]]:
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def iter_batches(stream: IO[str], format: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[ImportBatch]:
+    """
+    Yield validated batches of at most ``batch_size`` products from ``stream``.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported import format: {format}")
+    records: Iterable = _csv_records(stream) if format == "csv" else _ndjson_records(stream)
+    batch = ImportBatch(number=1)
+    for line_number, row in records:
+        if not isinstance(row, dict):
+            batch.rejected.append({"line": line_number, "errors": ["Malformed record"]})
+            continue
+        try:
+            product = ProductCreate(**row)
+        except (ValidationError, TypeError) as exc:
+            errors = exc.errors() if isinstance(exc, ValidationError) else [{"loc": (), "msg": str(exc)}]
+            batch.rejected.append({
+                "line": line_number,
+                "errors": [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in errors],
+            })
+            continue
+        if not product.sku:
+            batch.rejected.append({"line": line_number, "errors": ["sku: required for bulk import"]})
+            continue
+        batch.products.append(product)
+        batch.lines.append(line_number)
+        if len(batch.products) >= batch_size:
+            yield batch
+            batch = ImportBatch(number=batch.number + 1)
+    if batch.products or batch.rejected:
+        yield batch
+
+
+def write_batch(db, batch: ImportBatch) -> int:
+    """
+    Upsert ``batch`` and return the number of rows written. If the database
+    rejects the batch (an unknown category_id with foreign keys enforced,
+    say), retry its rows one at a time and add the failing ones to
+    ``batch.rejected`` instead of aborting the import.
+    """
+    try:
+        return upsert_products(db, batch.products)
+    except IntegrityError:
+        pass
+    written = 0
+    # Last row wins for a repeated sku, as in upsert_products
+    latest = {product.sku: (line, product) for line, product in zip(batch.lines, batch.products)}
+    for line, product in latest.values():
+        try:
+            written += upsert_products(db, [product])
+        except IntegrityError as exc:
+            batch.rejected.append({"line": line, "errors": [f"database: {exc.orig}"]})
+    batch.rejected.sort(key=lambda reject: reject["line"])
+    return written
+
+
+write_batch_async = make_async(write_batch)
+
+
+def import_products(db, stream: IO[str], format: str, batch_size: int = DEFAULT_BATCH_SIZE, on_batch=None) -> ImportReport:
+    """
+    Synchronous import used by the CLI; the API drives ``iter_batches`` itself.
+    """
+    report = ImportReport()
+    for batch in iter_batches(stream, format, batch_size):
+        started = time.perf_counter()
+        written = write_batch(db, batch)
+        summary = report.record(batch, written, time.perf_counter() - started)
+        if on_batch:
+            on_batch(summary)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import products from CSV or NDJSON.")
+    parser.add_argument("path", help="file to import, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    db = SessionLocal()
+    stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+    try:
+        report = import_products(
+            db, stream, format, args.batch_size,
+            on_batch=lambda summary: print(json.dumps(summary)),
+        )
+    finally:
+        db.close()
+        if stream is not sys.stdin:
+            stream.close()
+    for reject in report.rejected:
+        print(f"line {reject['line']}: {'; '.join(reject['errors'])}", file=sys.stderr)
+    print(f"imported {report.imported} products, rejected {report.rejected_count} rows")
+    return 0 if not report.rejected_count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
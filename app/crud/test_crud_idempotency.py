@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.crud import crud_idempotency, crud_orders, crud_products
+from app.crud.crud_idempotency import run_idempotent
+from app.db.models import IdempotencyKey, Order
+from app.schemas import OrderCreate, OrderRead, ProductCreate
+
+# app/crud/test_crud_idempotency.py
+
+
+def _order_payload(db, count=10):
+    category = crud_products.create_category(db, category_name="Books")
+    product = crud_products.create_product(db, ProductCreate(
+        name="Novel", price="12.50", category_id=category.category_id, count=count,
+    ))
+    return {
+        "user_id": "u1", "product_id": product.product_id, "payment_status": "pending",
+        "address_id": "a1", "quantity": 1, "status": "pending",
+    }
+
+
+def test_retried_order_is_replayed_not_placed_twice(client, db):
+    payload = _order_payload(db)
+    first = client.post("/orders", json=payload, headers={"Idempotency-Key": "k1"})
+    retry = client.post("/orders", json=payload, headers={"Idempotency-Key": "k1"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.content == first.content
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db.query(Order).count() == 1
+
+    assert client.post("/orders", json=payload, headers={"Idempotency-Key": "k2"}).json()["order_id"] != first.json()["order_id"]
+    assert client.post("/orders", json=payload).status_code == 200
+    assert db.query(Order).count() == 3
+
+
+def test_key_reused_for_a_different_request_is_rejected(client, db):
+    payload = _order_payload(db)
+    assert client.post("/orders", json=payload, headers={"Idempotency-Key": "k1"}).status_code == 200
+    response = client.post("/orders", json={**payload, "quantity": 2}, headers={"Idempotency-Key": "k1"})
+    assert response.status_code == 422
+    assert db.query(Order).count() == 1
+
+
+def test_business_errors_are_replayed(client, db):
+    payload = _order_payload(db, count=0)
+    first = client.post("/orders", json=payload, headers={"Idempotency-Key": "k1"})
+    assert first.status_code == 400
+    db.expire_all()
+    crud_products.update_product_stock(db, payload["product_id"], 5, "increase")
+    retry = client.post("/orders", json=payload, headers={"Idempotency-Key": "k1"})
+    assert (retry.status_code, retry.json()) == (400, first.json())
+
+
+def test_register_retry_gets_the_created_user(client):
+    user = {"full_name": "Ana", "email": "ana@example.com", "password": "Password123", "roles_permissions": "user"}
+    first = client.post("/register", json=user, headers={"Idempotency-Key": "signup-1"})
+    retry = client.post("/register", json=user, headers={"Idempotency-Key": "signup-1"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert client.post("/register", json=user).status_code == 400
+
+
+def test_concurrent_duplicates_wait_for_the_first_attempt(async_engine, db):
+    session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    calls = []
+
+    async def handler(session):
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {
+            "order_id": "o1", "user_id": "u1", "product_id": "p1", "payment_status": "pending",
+            "address_id": "a1", "quantity": 1, "status": "pending", "created_at": "2024-01-01T00:00:00",
+        }
+
+    async def attempt():
+        async with session_factory() as session:
+            return await run_idempotent(session, "POST /orders", "k1", {"n": 1}, handler, OrderRead)
+
+    async def run():
+        return await asyncio.gather(*(attempt() for _ in range(5)))
+
+    responses = asyncio.run(run())
+    assert len(calls) == 1
+    assert len({response.body for response in responses}) == 1
+    assert sum("idempotent-replayed" in response.headers for response in responses) == 4
+
+
+def test_failed_attempt_releases_the_key(async_engine, db):
+    session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def crash(session):
+        raise HTTPException(status_code=503, detail="unavailable")
+
+    async def run():
+        async with session_factory() as session:
+            with pytest.raises(HTTPException):
+                await run_idempotent(session, "POST /orders", "k1", {"n": 1}, crash, OrderRead)
+
+    asyncio.run(run())
+    assert db.query(IdempotencyKey).count() == 0
+
+
+@pytest.mark.parametrize("session_kind", ["async", "sync"])
+def test_order_and_stored_response_commit_together(async_engine, db, monkeypatch, session_kind):
+    payload = _order_payload(db)
+    order = OrderCreate(**payload)
+    session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def lost_response(session, scope, key, status_code, body):
+        raise ConnectionError("worker died before the response was stored")
+
+    async def place(session):
+        return await crud_orders.create_order_async(session, order)
+
+    async def attempt():
+        if session_kind == "sync":
+            return await run_idempotent(db, "POST /orders", "k1", payload, place, OrderRead)
+        async with session_factory() as session:
+            return await run_idempotent(session, "POST /orders", "k1", payload, place, OrderRead)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(crud_idempotency, "save_idempotent_response_async", lost_response)
+        with pytest.raises(ConnectionError):
+            asyncio.run(attempt())
+    db.rollback()
+    # The order was not committed without its response, so the retry places it
+    assert db.query(Order).count() == 0
+    first = asyncio.run(attempt())
+    replay = asyncio.run(attempt())
+    assert replay.body == first.body and replay.headers["idempotent-replayed"] == "true"
+    assert db.query(Order).count() == 1
+    assert db.get(IdempotencyKey, ("POST /orders", "k1")).status_code == 200
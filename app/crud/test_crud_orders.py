@@ -0,0 +1,172 @@
+import json
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func
+
+from app.crud import crud_orders, crud_products
+from app.db import models, profiler
+from app.db.models import Order, SalesDaily
+from app.schemas import CartCheckout, OrderCreate, OrderStatus, OrderUpdate, ProductCreate
+
+# app/crud/test_crud_orders.py
+
+
+def _product(db, count=10, category="Books"):
+    category = crud_products.create_category(db, category_name=category)
+    return crud_products.create_product(db, ProductCreate(
+        name="Novel", price="12.50", category_id=category.category_id, count=count,
+    ))
+
+
+def _order(product_id, quantity):
+    return OrderCreate(
+        user_id="u1", product_id=product_id, payment_status="pending",
+        address_id="a1", quantity=quantity, status="pending",
+    )
+
+
+def test_create_order_reserves_stock(db):
+    product = _product(db, count=10)
+    crud_orders.create_order(db, _order(product.product_id, 3))
+    db.expire_all()
+    assert crud_products.get_product(db, product.product_id).count == 7
+
+
+def test_create_order_reads_the_price_from_the_reservation(db):
+    product = _product(db, count=10)
+    with profiler.capture(db.get_bind()) as profile:
+        order = crud_orders.create_order(db, _order(product.product_id, 3))
+    assert order.unit_price == Decimal("12.50")
+    product_queries = {sql: count for sql, count in profile.counts.items() if "products" in sql}
+    assert list(product_queries.values()) == [1] and next(iter(product_queries)).startswith("UPDATE products")
+
+
+def test_create_order_compares_stock_numerically(db):
+    product = _product(db, count=10)
+    crud_orders.create_order(db, _order(product.product_id, 9))
+    db.expire_all()
+    assert crud_products.get_product(db, product.product_id).count == 1
+
+
+def test_create_order_insufficient_stock_leaves_no_trace(db):
+    product = _product(db, count=2)
+    with pytest.raises(HTTPException) as exc:
+        crud_orders.create_order(db, _order(product.product_id, 3))
+    assert exc.value.status_code == 400
+    assert db.query(Order).count() == 0
+    assert crud_products.get_product(db, product.product_id).count == 2
+
+
+def test_create_order_unknown_product(db):
+    with pytest.raises(HTTPException) as exc:
+        crud_orders.create_order(db, _order("missing", 1))
+    assert exc.value.status_code == 404
+
+
+def _cart(*items):
+    return CartCheckout(
+        user_id="u1", address_id="a1", payment_status="pending",
+        items=[{"product_id": product_id, "quantity": quantity} for product_id, quantity in items],
+    )
+
+
+def test_checkout_cart_places_all_lines(db):
+    first, second = _product(db, count=5), _product(db, count=5, category="Music")
+    orders = crud_orders.checkout_cart(db, _cart((first.product_id, 2), (second.product_id, 1), (first.product_id, 1)))
+    assert [order.quantity for order in orders] == [2, 1, 1]
+    assert all(order.created_at for order in orders)
+    db.expire_all()
+    assert crud_products.get_product(db, first.product_id).count == 2
+    assert crud_products.get_product(db, second.product_id).count == 4
+
+
+def test_checkout_cart_is_all_or_nothing(db):
+    first, second = _product(db, count=5), _product(db, count=1, category="Music")
+    with pytest.raises(HTTPException) as exc:
+        crud_orders.checkout_cart(db, _cart((first.product_id, 2), (second.product_id, 2)))
+    assert exc.value.status_code == 400
+    assert second.product_id in exc.value.detail
+    assert db.query(Order).count() == 0
+    assert crud_products.get_product(db, first.product_id).count == 5
+
+
+def test_stream_orders_filters_and_batches(db):
+    product = _product(db, count=10)
+    for quantity in (1, 2, 3):
+        crud_orders.create_order(db, _order(product.product_id, quantity))
+    cancelled = crud_orders.create_order(db, _order(product.product_id, 4))
+    crud_orders.update_order(db, cancelled.order_id, OrderUpdate(status="cancelled"))
+
+    partitions = list(crud_orders.stream_orders(db, batch_size=2, status=OrderStatus.pending))
+    assert [len(rows) for rows in partitions] == [2, 1]
+    assert [row["quantity"] for rows in partitions for row in rows] == [1, 2, 3]
+
+
+def test_export_endpoint_streams_ndjson(client, db):
+    product = _product(db, count=10)
+    crud_orders.create_order(db, _order(product.product_id, 2))
+    response = client.get("/orders/export", params={"format": "ndjson", "payment_status": "pending"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["quantity"] for line in lines] == [2]
+    assert lines[0]["status"] == "pending"
+    csv_response = client.get("/orders/export", params={"format": "csv"})
+    assert csv_response.text.splitlines()[0].startswith("order_id,user_id")
+
+
+def test_bulk_transition_enforces_allowed_moves(client, db, max_queries):
+    product = _product(db, count=10)
+    processing = [crud_orders.create_order(db, _order(product.product_id, 1)) for _ in range(3)]
+    for order in processing:
+        crud_orders.update_order(db, order.order_id, OrderUpdate(status="processing"))
+    pending = crud_orders.create_order(db, _order(product.product_id, 1))
+    ids = [order.order_id for order in processing] + [pending.order_id, "missing"]
+
+    with max_queries(4):
+        response = client.post("/orders/transitions", json={"order_ids": ids, "status": "completed"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["matched"], body["updated"]) == (4, 3)
+    outcomes = {result["order_id"]: (result["outcome"], result.get("status")) for result in body["results"]}
+    assert outcomes == {
+        **{order.order_id: ("updated", "completed") for order in processing},
+        pending.order_id: ("invalid_transition", "pending"),
+        "missing": ("not_found", None),
+    }
+    db.expire_all()
+    assert db.get(Order, pending.order_id).status.value == "pending"
+
+    again = client.post("/orders/transitions", json={"order_ids": ids[:1], "status": "completed"}).json()
+    assert again["results"][0]["outcome"] == "unchanged"
+
+
+def test_bulk_transition_applies_payment_move_when_status_already_matches(client, db):
+    product = _product(db, count=10)
+    order = crud_orders.create_order(db, _order(product.product_id, 1))
+    crud_orders.update_order(db, order.order_id, OrderUpdate(status="processing"))
+
+    response = client.post("/orders/transitions", json={
+        "order_ids": [order.order_id], "status": "processing", "payment_status": "completed",
+    }).json()
+    assert response["updated"] == 1
+    assert response["results"][0] == {
+        "order_id": order.order_id, "outcome": "updated", "status": "processing", "payment_status": "completed",
+    }
+    db.expire_all()
+    assert db.get(Order, order.order_id).payment_status.value == "completed"
+    assert db.query(func.sum(SalesDaily.order_count)).filter(SalesDaily.status == models.OrderStatus.processing).scalar() == 1
+
+
+def test_bulk_transition_by_filter_moves_a_batch(client, db):
+    product = _product(db, count=10)
+    for _ in range(3):
+        crud_orders.create_order(db, _order(product.product_id, 1))
+    request = {"filter": {"status": "pending"}, "status": "processing", "payment_status": "completed", "limit": 2}
+    first = client.post("/orders/transitions", json=request).json()
+    second = client.post("/orders/transitions", json=request).json()
+    assert (first["updated"], second["updated"]) == (2, 1)
+    assert all(result["payment_status"] == "completed" for result in first["results"] + second["results"])
+    assert client.post("/orders/transitions", json=request).json()["matched"] == 0
+    assert client.post("/orders/transitions", json={"filter": {}, "order_ids": ["x"], "status": "completed"}).status_code == 422
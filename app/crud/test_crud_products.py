@@ -0,0 +1,165 @@
+from sqlalchemy import text
+
+from app.crud import crud_products
+from app.schemas import ProductCreate, ProductRead, ProductUpdate
+
+# app/crud/test_crud_products.py
+
+
+def _product(db, count=10):
+    category = crud_products.create_category(db, category_name="Books")
+    return crud_products.create_product(db, ProductCreate(
+        name="Novel", price="12.50", category_id=category.category_id, count=count,
+    ))
+
+
+def test_get_product_serves_repeat_reads_from_cache(db):
+    product = _product(db)
+    first = crud_products.get_product(db, product.product_id)
+    second = crud_products.get_product(db, product.product_id)
+    assert isinstance(first, ProductRead)
+    assert second is first
+    assert crud_products.product_cache.stats()["hits"] >= 1
+
+
+def test_writes_invalidate_cached_reads(db):
+    product = _product(db, count=10)
+    crud_products.get_product(db, product.product_id)
+    crud_products.update_product_stock(db, product.product_id, quantity=4, operation="decrease")
+    assert crud_products.get_product(db, product.product_id).count == 6
+
+    crud_products.update_product(db, product.product_id, ProductUpdate(
+        name="Novel II", price="13", count=6, product_metadata=None, description=None,
+    ))
+    assert crud_products.get_product(db, product.product_id).name == "Novel II"
+    assert [p.name for p in crud_products.get_products(db)] == ["Novel II"]
+
+    crud_products.delete_product(db, product.product_id)
+    assert crud_products.get_product(db, product.product_id) is None
+    assert crud_products.get_products(db) == []
+
+
+def test_bypass_reads_current_row(db):
+    product = _product(db, count=10)
+    crud_products.get_product(db, product.product_id)
+    crud_products.reserve_product_stock(db, product.product_id, 3)
+    db.commit()
+    assert crud_products.get_product(db, product.product_id).count == 10
+    assert crud_products.get_product(db, product.product_id, use_cache=False).count == 7
+
+
+def test_reads_return_snapshots_with_or_without_cache(db):
+    product = _product(db)
+    assert isinstance(crud_products.get_product(db, product.product_id, use_cache=False), ProductRead)
+    assert all(isinstance(p, ProductRead) for p in crud_products.get_products(db, use_cache=False))
+    assert len(crud_products.product_cache) == 0
+
+
+def test_read_racing_a_write_is_not_cached(db, monkeypatch):
+    product = _product(db)
+    read_row = crud_products.get_product_row
+
+    def row_then_concurrent_write(db, product_id):
+        row = read_row(db, product_id)
+        crud_products.invalidate_product_cache(product_id)  # a write commits mid-read
+        return row
+
+    monkeypatch.setattr(crud_products, "get_product_row", row_then_concurrent_write)
+    assert crud_products.get_product(db, product.product_id).count == 10
+    monkeypatch.undo()
+    assert product.product_id not in crud_products.product_cache._data
+
+
+def test_categories_endpoint_revalidates_with_etag(client):
+    client.post("/categories", params={"category_name": "Books"})
+    first = client.get("/categories")
+    assert first.status_code == 200
+    assert [category["name"] for category in first.json()] == ["Books"]
+    etag = first.headers["etag"]
+
+    repeat = client.get("/categories", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert crud_products.category_catalog_cache.stats()["hits"] >= 1
+
+    client.post("/categories", params={"category_name": "Music"})
+    changed = client.get("/categories", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [category["name"] for category in changed.json()] == ["Books", "Music"]
+
+
+def test_search_ranks_and_tracks_writes(db):
+    category = crud_products.create_category(db, category_name="Kitchen")
+    other = crud_products.create_category(db, category_name="Garden")
+
+    def add(name, price, category_id, description=None, metadata=None):
+        return crud_products.create_product(db, ProductCreate(
+            name=name, description=description, price=price, category_id=category_id,
+            count=1, product_metadata=metadata,
+        ))
+
+    kettle = add("Steel Kettle", "40", category.category_id, "Boils water fast")
+    add("Teapot", "25", category.category_id, "Pairs with any kettle")
+    add("Garden Hose", "15", other.category_id, metadata={"brand": "Kettleworks"})
+
+    assert [p.name for p in crud_products.search_products(db, "kettle")][0] == "Steel Kettle"
+    assert {p.name for p in crud_products.search_products(db, "kett")} == {"Steel Kettle", "Teapot", "Garden Hose"}
+    assert [p.name for p in crud_products.search_products(db, "kettle", category_id=other.category_id)] == ["Garden Hose"]
+    assert [p.name for p in crud_products.search_products(db, "kettle", max_price="30", category_id=category.category_id)] == ["Teapot"]
+    assert crud_products.search_products(db, '"unbalanced AND (') == []
+
+    crud_products.update_product(db, kettle.product_id, ProductUpdate(
+        name="Copper Jug", price="40", count=1, description=None, product_metadata=None,
+    ))
+    assert "Copper Jug" not in {p.name for p in crud_products.search_products(db, "kettle")}
+    assert [p.name for p in crud_products.search_products(db, "copper")] == ["Copper Jug"]
+    crud_products.delete_product(db, kettle.product_id)
+    assert crud_products.search_products(db, "copper") == []
+
+
+def test_search_filters_before_capping_candidates(db, monkeypatch):
+    monkeypatch.setattr(crud_products, "SEARCH_MAX_CANDIDATES", 2)
+    kitchen = crud_products.create_category(db, category_name="Kitchen")
+    garden = crud_products.create_category(db, category_name="Garden")
+    for name, category in [("Kettle", kitchen), ("Kettle Lid", kitchen), ("Kettle Stand", kitchen), ("Kettle Grill", garden)]:
+        crud_products.create_product(db, ProductCreate(name=name, price="5", category_id=category.category_id, count=1))
+    assert len(crud_products.search_products(db, "kettle")) == 2
+    assert [p.name for p in crud_products.search_products(db, "kettle", category_id=garden.category_id)] == ["Kettle Grill"]
+    assert [p.name for p in crud_products.search_products(db, "kettle", limit=1)] == ["Kettle"]
+
+
+def test_products_endpoint_filters_and_sorts_across_pages(client):
+    books = client.post("/categories", params={"category_name": "Books"}).json()["category_id"]
+    music = client.post("/categories", params={"category_name": "Music"}).json()["category_id"]
+    for name, price, count, category in [
+        ("Atlas", "30", 5, books), ("Bible", "10", 0, books), ("Comic", "20", 3, books),
+        ("Diary", "25", 7, books), ("Album", "15", 9, music),
+    ]:
+        client.post("/products", json={"name": name, "price": price, "count": count, "category_id": category})
+
+    params = {"category_id": books, "in_stock": True, "sort": "-price", "limit": 2}
+    first = client.get("/products", params=params)
+    assert [product["name"] for product in first.json()] == ["Atlas", "Diary"]
+    second = client.get("/products", params={**params, "cursor": first.headers["x-next-cursor"]})
+    assert [product["name"] for product in second.json()] == ["Comic"]
+    assert "x-next-cursor" not in second.headers
+
+    cheap = client.get("/products", params={"min_price": "12", "max_price": "25", "sort": "price"})
+    assert [product["name"] for product in cheap.json()] == ["Album", "Comic", "Diary"]
+    newest = client.get("/products", params={"sort": "newest", "limit": 1})
+    assert newest.json()[0]["name"] == "Album"
+    assert client.get("/products", params={"sort": "rating"}).status_code == 422
+
+
+def test_search_survives_rowid_renumbering(db):
+    category = crud_products.create_category(db, category_name="Kitchen")
+    products = [
+        crud_products.create_product(db, ProductCreate(name=name, price="5", category_id=category.category_id, count=1))
+        for name in ("Whisk", "Ladle", "Kettle")
+    ]
+    crud_products.delete_product(db, products[0].product_id)
+    # What VACUUM may do to a table without an INTEGER PRIMARY KEY
+    db.execute(text("UPDATE products SET rowid = rowid - 1"))
+    db.commit()
+    assert [(p.product_id, p.name) for p in crud_products.search_products(db, "kettle")] == [(products[2].product_id, "Kettle")]
+    assert [p.name for p in crud_products.search_products(db, "ladle")] == ["Ladle"]
@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.crud import crud_orders, crud_products, crud_sales
+from app.db.models import SalesDaily
+from app.schemas import CartCheckout, OrderBulkTransition, OrderCreate, OrderUpdate, ProductCreate, ProductUpdate
+
+# app/crud/test_crud_sales.py
+
+
+def _product(db, price="12.50"):
+    category = crud_products.create_category(db, category_name="Books")
+    return crud_products.create_product(db, ProductCreate(
+        name="Novel", price=price, category_id=category.category_id, count=100,
+    ))
+
+
+def _order(product_id, quantity):
+    return OrderCreate(
+        user_id="u1", product_id=product_id, payment_status="pending",
+        address_id="a1", quantity=quantity, status="pending",
+    )
+
+
+def _rollup(db):
+    rows = db.query(SalesDaily).filter(SalesDaily.order_count != 0).all()
+    return sorted((row.day, row.product_id, row.status.value, row.order_count, row.quantity, row.revenue) for row in rows)
+
+
+def test_order_writes_keep_rollup_in_step_with_rebuild(db):
+    product = _product(db)
+    first = crud_orders.create_order(db, _order(product.product_id, 2))
+    crud_orders.checkout_cart(db, CartCheckout(
+        user_id="u1", address_id="a1", payment_status="COD",
+        items=[{"product_id": product.product_id, "quantity": 3}, {"product_id": product.product_id, "quantity": 1}],
+    ))
+    # Later price changes do not rewrite revenue already booked
+    crud_products.update_product(db, product.product_id, ProductUpdate(
+        name="Novel", price="99", count=94, description=None, product_metadata=None,
+    ))
+    crud_orders.update_order(db, first.order_id, OrderUpdate(status="completed"))
+    last = crud_orders.create_order(db, _order(product.product_id, 1))
+    crud_orders.delete_order(db, last.order_id)
+
+    today = date.today()
+    daily = crud_sales.get_daily_sales(db, today - timedelta(days=1), today + timedelta(days=1))
+    assert [(row["order_count"], row["quantity"], row["revenue"]) for row in daily] == [(3, 6, Decimal("75.00"))]
+    completed = crud_sales.get_daily_sales(
+        db, today, today + timedelta(days=1), product_id=product.product_id, status="completed",
+    )
+    assert [row["revenue"] for row in completed] == [Decimal("25.00")]
+
+    incremental = _rollup(db)
+    crud_sales.rebuild_sales_rollups(db, today - timedelta(days=1), today + timedelta(days=1))
+    assert _rollup(db) == incremental
+
+
+def test_analytics_endpoints_read_rollup(client):
+    category = client.post("/categories", params={"category_name": "Books"}).json()["category_id"]
+    cheap = client.post("/products", json={"name": "Pen", "price": "2", "count": 50, "category_id": category}).json()
+    dear = client.post("/products", json={"name": "Atlas", "price": "40", "count": 5, "category_id": category}).json()
+    for product, quantity in [(cheap, 10), (dear, 1), (cheap, 5)]:
+        assert client.post("/orders", json=_order(product["product_id"], quantity).model_dump(mode="json")).status_code == 200
+
+    ranked = client.get("/analytics/sales/products").json()
+    assert [(row["product_id"], row["quantity"], Decimal(row["revenue"])) for row in ranked] == [
+        (dear["product_id"], 1, Decimal("40")), (cheap["product_id"], 15, Decimal("30")),
+    ]
+    daily = client.get("/analytics/sales/daily", params={"product_id": cheap["product_id"]}).json()
+    assert [row["order_count"] for row in daily] == [2]
+    assert client.get("/analytics/sales/daily", params={"start": "2024-02-01", "end": "2024-01-01"}).status_code == 400
+
+
+def test_bulk_transition_moves_rollup_buckets(db):
+    product = _product(db)
+    orders = [crud_orders.create_order(db, _order(product.product_id, quantity)) for quantity in (1, 2)]
+    crud_orders.transition_orders(db, OrderBulkTransition(
+        order_ids=[order.order_id for order in orders], status="cancelled",
+    ))
+    today = date.today()
+    cancelled = crud_sales.get_daily_sales(db, today, today + timedelta(days=1), status="cancelled")
+    assert [(row["order_count"], row["quantity"]) for row in cancelled] == [(2, 3)]
+    assert [(row[2], row[3]) for row in _rollup(db)] == [("cancelled", 2)]
+    incremental = _rollup(db)
+    crud_sales.rebuild_sales_rollups(db, today - timedelta(days=1), today + timedelta(days=1))
+    assert _rollup(db) == incremental
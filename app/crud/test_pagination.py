@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.crud import crud_orders
+from app.crud.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from app.db.migrations import timestamp_precision
+from app.db.models import Order, OrderStatus, PaymentStatus
+
+# app/crud/test_pagination.py
+
+
+def _add_orders(db, count, created_at):
+    for i in range(count):
+        db.add(Order(
+            user_id="u1", product_id="p1", address_id="a1", quantity=1,
+            payment_status=PaymentStatus.pending, status=OrderStatus.pending,
+            created_at=created_at,
+        ))
+    db.commit()
+
+
+def test_cursor_round_trip():
+    columns = crud_orders.ORDER_PAGE_KEY
+    stamp = datetime(2024, 5, 1, 12, 30)
+    assert decode_cursor(encode_cursor([stamp, "abc"]), columns) == [stamp, "abc"]
+
+
+def test_invalid_cursor_rejected():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor", crud_orders.ORDER_PAGE_KEY)
+    assert exc.value.status_code == 400
+
+
+def test_orders_keyset_walks_ties_without_gaps(db):
+    _add_orders(db, 7, datetime(2024, 5, 1, 12, 30))
+    seen, cursor = [], None
+    while True:
+        page = crud_orders.get_orders(db, limit=3, cursor=cursor)
+        seen.extend(order.order_id for order in page)
+        if len(page) < 3:
+            break
+        cursor = encode_cursor([page[-1].created_at, page[-1].order_id])
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+
+
+def _walk_orders(db, limit):
+    seen, cursor = [], None
+    while True:
+        page = crud_orders.get_orders(db, limit=limit, cursor=cursor)
+        seen.extend(order.order_id for order in page)
+        if len(page) < limit:
+            return seen
+        cursor = encode_cursor([page[-1].created_at, page[-1].order_id])
+
+
+def _insert_raw_orders(db, count, created_at=None):
+    # Plain SQL, as a bulk load or an older app version would write them
+    columns = "order_id, user_id, product_id, address_id, quantity, payment_status, status"
+    for i in range(count):
+        if created_at is None:
+            db.execute(text(f"INSERT INTO orders ({columns}) VALUES (:id, 'u1', 'p1', 'a1', 1, 'pending', 'pending')"), {"id": f"o{i}"})
+        else:
+            db.execute(text(
+                f"INSERT INTO orders ({columns}, created_at) VALUES (:id, 'u1', 'p1', 'a1', 1, 'pending', 'pending', :at)"
+            ), {"id": f"o{i}", "at": created_at})
+    db.commit()
+
+
+def test_orders_keyset_walks_server_default_timestamps(db):
+    _insert_raw_orders(db, 6)
+    assert len(db.execute(text("SELECT created_at FROM orders")).scalars().first()) == 26
+    assert sorted(_walk_orders(db, limit=2)) == [f"o{i}" for i in range(6)]
+
+
+def test_second_precision_timestamps_are_normalized(db):
+    _insert_raw_orders(db, 6, created_at="2024-05-01 12:30:00")
+    assert len(_walk_orders(db, limit=2)) < 6  # text comparison skips the short form
+
+    assert timestamp_precision.upgrade(db.get_bind(), batch_size=4) == 6
+    assert set(db.execute(text("SELECT created_at FROM orders")).scalars()) == {"2024-05-01 12:30:00.000000"}
+    assert sorted(_walk_orders(db, limit=2)) == [f"o{i}" for i in range(6)]
+    assert timestamp_precision.upgrade(db.get_bind()) == 0
+
+
+def test_products_endpoint_exposes_next_cursor(client):
+    category = client.post("/categories", params={"category_name": "Games"}).json()
+    for i in range(5):
+        client.post("/products", json={
+            "name": f"Game {i}", "price": 10, "category_id": category["category_id"], "count": 5,
+        })
+    seen, params = [], {"limit": 2}
+    while True:
+        response = client.get("/products", params=params)
+        seen.extend(product["product_id"] for product in response.json())
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params = {"limit": 2, "cursor": response.headers[NEXT_CURSOR_HEADER]}
+    assert len(set(seen)) == 5
@@ -0,0 +1,71 @@
+import io
+
+from sqlalchemy import text
+
+from app.crud import crud_products, product_import
+from app.db.models import Product
+
+# app/crud/test_product_import.py
+
+CSV_HEADER = "sku,name,price,category_id,count,product_metadata\n"
+
+
+def test_iter_batches_splits_and_rejects():
+    stream = io.StringIO(
+        CSV_HEADER
+        + "A1,Pen,1.50,c1,10,\n"
+        + "A2,Ink,not-a-price,c1,5,\n"
+        + ",Pad,2,c1,1,\n"
+        + "A3,Nib,0.25,c1,100,\"{\"\"tip\"\": \"\"fine\"\"}\"\n"
+    )
+    batches = list(product_import.iter_batches(stream, "csv", batch_size=1))
+    products = [product for batch in batches for product in batch.products]
+    rejected = [reject["line"] for batch in batches for reject in batch.rejected]
+    assert [product.sku for product in products] == ["A1", "A3"]
+    assert products[1].product_metadata == {"tip": "fine"}
+    assert rejected == [3, 4]
+
+
+def test_import_upserts_on_sku(db):
+    first = io.StringIO('{"sku": "A1", "name": "Pen", "price": 1.5, "category_id": "c1", "count": 10}\n')
+    product_import.import_products(db, first, "ndjson")
+    again = io.StringIO(
+        '{"sku": "A1", "name": "Pen v2", "price": 2, "category_id": "c1", "count": 4}\n'
+        '{"sku": "A2", "name": "Ink", "price": 3, "category_id": "c1", "count": 1}\n'
+    )
+    report = product_import.import_products(db, again, "ndjson", batch_size=1)
+    assert report.imported == 2
+    assert len(report.batches) == 2
+    products = {product.sku: product for product in db.query(Product).all()}
+    assert products["A1"].name == "Pen v2" and products["A1"].count == 4
+    assert len(products) == 2
+
+
+def test_import_counts_distinct_rows_and_rejects_database_failures(db):
+    db.execute(text("PRAGMA foreign_keys = ON"))
+    category = crud_products.create_category(db, category_name="Stationery")
+    stream = io.StringIO(
+        CSV_HEADER
+        + f"A1,Pen,1.50,{category.category_id},10,\n"
+        + f"A1,Pen v2,1.75,{category.category_id},10,\n"
+        + "A2,Ink,2,no-such-category,5,\n"
+        + f"A3,Pad,3,{category.category_id},1,\n"
+    )
+    report = product_import.import_products(db, stream, "csv", batch_size=10)
+    assert (report.imported, report.rejected_count) == (2, 1)
+    assert report.rejected[0]["line"] == 4
+    assert report.rejected[0]["errors"][0].startswith("database: FOREIGN KEY")
+    assert {product.sku: product.name for product in db.query(Product).all()} == {"A1": "Pen v2", "A3": "Pad"}
+
+
+def test_import_endpoint_reports_batches(client):
+    body = CSV_HEADER + "A1,Pen,1.50,c1,10,\nA2,Ink,-1,c1,5,\n"
+    response = client.post(
+        "/products/import", params={"format": "csv"},
+        files={"file": ("catalog.csv", body, "text/csv")},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 1
+    assert report["rejected_count"] == 1
+    assert report["rejected"][0]["line"] == 3
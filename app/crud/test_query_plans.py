@@ -0,0 +1,162 @@
+import hashlib
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.crud import crud_idempotency, crud_orders, crud_outbox, crud_products, crud_sales, crud_users
+from app.crud.pagination import encode_cursor
+from app.schemas import (
+    AddressCreate, AddressUpdate, CartCheckout, OrderBulkTransition, OrderCreate, OrderStatus, OrderUpdate,
+    PaymentStatus, ProductCreate, ProductSort, ProductUpdate, UserCreate, UserUpdate,
+)
+
+# app/crud/test_query_plans.py
+#
+# Runs every CRUD function against SQLite, captures each statement it issues
+# and fails if EXPLAIN QUERY PLAN shows a full table scan or a sort that an
+# index should have provided.
+
+# (SQL regex, plan regex) pairs for plans that are intended
+ALLOWED_PLANS = [
+    # The category catalog is loaded in full and cached (GET /categories)
+    (r"^SELECT DISTINCT categories\.", r"SCAN categories"),
+    # Relevance ranking sorts the (already index-matched, capped) hits and
+    # joins the page of them it keeps
+    (r"bm25\(products_fts", r"USE TEMP B-TREE FOR ORDER BY|^SCAN anon_\d+$"),
+    # Top products are ranked by an aggregate over the (small) rollup range
+    (r"FROM sales_daily .*GROUP BY sales_daily\.product_id", r"USE TEMP B-TREE FOR ORDER BY"),
+]
+
+BAD_PLAN = re.compile(r"^SCAN (\w+)$|USE TEMP B-TREE FOR ORDER BY")
+
+
+@pytest.fixture
+def statements(db):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((statement, parameters[0] if executemany else parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def _exercise_crud(db):
+    legacy = hashlib.sha256(b"Password123").hexdigest()
+    user = crud_users.create_user(db, UserCreate(
+        full_name="Plan User", email="plan@example.com", password="Password123", roles_permissions="user",
+    ), hashed_password=legacy)
+    crud_users.get_users(db, limit=5)
+    crud_users.get_users(db, limit=5, cursor=encode_cursor([user.user_id]))
+    crud_users.get_user_by_email(db, "plan@example.com")
+    crud_users.update_password_hash(db, user.user_id, legacy)
+    address = crud_users.create_address(db, AddressCreate(
+        user_id=user.user_id, address="1 Main St", city="Pune", state="MH", country="IN", postal_code="411001",
+    ))
+    crud_users.get_user_addresses(db, user.user_id)
+    crud_users.get_address_by_id(db, address.address_id)
+    crud_users.update_address(db, address.address_id, user.user_id, AddressUpdate(city="Mumbai"))
+
+    category = crud_products.create_category(db, "Books")
+    crud_products.get_categories(db)
+    product = crud_products.create_product(db, ProductCreate(
+        sku="SKU-1", name="Novel", price="12.50", category_id=category.category_id, count=100,
+    ))
+    crud_products.upsert_products(db, [ProductCreate(
+        sku="SKU-2", name="Poems", price="8", category_id=category.category_id, count=50,
+    )])
+    crud_products.get_product(db, product.product_id, use_cache=False)
+    crud_products.get_products(db, limit=5, use_cache=False)
+    crud_products.search_products(db, "novel", category_id=category.category_id, max_price="20")
+    crud_products.get_products(db, limit=5, cursor=encode_cursor([product.product_id]), use_cache=False)
+    for sort in ProductSort:
+        columns, _ = crud_products.product_sort_key(sort)
+        cursor = encode_cursor([getattr(product, column.key) for column in columns])
+        for category_id in (None, category.category_id):
+            crud_products.get_products(db, limit=5, category_id=category_id, sort=sort, use_cache=False)
+            crud_products.get_products(
+                db, limit=5, cursor=cursor, category_id=category_id, min_price="1", in_stock=True,
+                sort=sort, use_cache=False,
+            )
+    crud_products.get_products(db, limit=5, category_id=category.category_id, use_cache=False)
+    crud_products.update_product(db, product.product_id, ProductUpdate(
+        name="Novel", price="13", count=100, description=None, product_metadata=None,
+    ))
+    crud_products.update_product_stock(db, product.product_id, 1, "increase")
+    crud_products.update_product_stock(db, product.product_id, 1, "decrease")
+
+    order = crud_orders.create_order(db, OrderCreate(
+        user_id=user.user_id, product_id=product.product_id, payment_status="pending",
+        address_id=address.address_id, quantity=1, status="pending",
+    ))
+    crud_orders.checkout_cart(db, CartCheckout(
+        user_id=user.user_id, address_id=address.address_id, payment_status="COD",
+        items=[{"product_id": product.product_id, "quantity": 1}],
+    ))
+    now = datetime.utcnow()
+    cursor = encode_cursor([order.created_at, order.order_id])
+    crud_orders.get_orders(db, limit=5)
+    crud_orders.get_orders(db, limit=5, cursor=cursor)
+    crud_orders.get_orders_by_user(db, user.user_id, limit=5)
+    crud_orders.get_orders_by_user(db, user.user_id, limit=5, cursor=cursor)
+    crud_orders.get_order_by_id(db, order.order_id)
+    crud_orders.update_order(db, order.order_id, OrderUpdate(status="processing"))
+    crud_orders.transition_orders(db, OrderBulkTransition(order_ids=[order.order_id, "missing"], payment_status="completed"))
+    crud_orders.transition_orders(db, OrderBulkTransition(
+        filter={"status": "processing", "created_from": now - timedelta(days=1)}, status="completed", limit=1,
+    ))
+    list(crud_orders.stream_orders(db, start=now - timedelta(days=1), end=now + timedelta(days=1)))
+    list(crud_orders.stream_orders(db, status=OrderStatus.processing, payment_status=PaymentStatus.pending))
+    today = now.date()
+    crud_sales.get_daily_sales(db, today, today + timedelta(days=1))
+    crud_sales.get_daily_sales(db, today, today + timedelta(days=1), product_id=product.product_id, status="pending")
+    crud_sales.get_product_sales(db, today, today + timedelta(days=1), status="pending")
+    crud_orders.delete_order(db, order.order_id)
+    crud_idempotency.claim_idempotency_key(db, "POST /orders", "plan-key", "f")
+    crud_idempotency.claim_idempotency_key(db, "POST /orders", "plan-key", "f")
+    crud_idempotency.save_idempotent_response(db, "POST /orders", "plan-key", 200, "{}")
+    db.commit()
+    crud_idempotency.release_idempotency_key(db, "POST /orders", "plan-key")
+    crud_idempotency.purge_expired_idempotency_keys(db)
+    crud_outbox.enqueue_event(db, "order.created", {"order_id": order.order_id}, enabled_topics=crud_outbox.TOPICS)
+    db.commit()
+    events = crud_outbox.claim_events(db, 10, lease=60)
+    crud_outbox.retry_event(db, events[0].id, "error", delay=None)
+    crud_outbox.requeue_failed_events(db)
+    crud_outbox.outbox_stats(db)
+    crud_outbox.complete_events(db, [event.id for event in events])
+
+    crud_users.delete_address(db, address.address_id, user.user_id)
+    crud_products.delete_product(db, product.product_id)
+    crud_products.delete_category(db, category.category_id)
+    crud_users.update_user(db, "plan@example.com", UserUpdate(full_name="Renamed"))
+    crud_users.delete_user(db, "plan@example.com", "Password123")
+
+
+def _plan(db, statement, parameters):
+    connection = db.connection()
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def test_crud_queries_use_indexes(db, statements, monkeypatch):
+    monkeypatch.setitem(crud_outbox.HANDLERS, "order.created", [lambda event: None])
+    _exercise_crud(db)
+    assert statements
+
+    regressions = []
+    for statement, parameters in statements:
+        sql = " ".join(statement.split())
+        allowed = [plan for pattern, plan in ALLOWED_PLANS if re.search(pattern, sql)]
+        bad = [
+            detail for detail in _plan(db, statement, parameters)
+            if BAD_PLAN.search(detail) and not any(re.search(plan, detail) for plan in allowed)
+        ]
+        if bad:
+            regressions.append(f"{sql}\n    -> {'; '.join(bad)}")
+    assert not regressions, "Queries without a usable index:\n" + "\n".join(regressions)
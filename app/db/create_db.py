@@ -2,15 +2,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from sqlalchemy import create_engine
 from app.db.models import Base
-
-# Use SQLite for local development (creates srx_local.db in your project root)
-DATABASE_URL = "sqlite:///srx_local.db"
-
-engine = create_engine(DATABASE_URL, echo=True)
+from app.db.session import engine  # same SRX_DATABASE_URL and pool/pragma settings as the app
+import app.db.search  # registers the full-text index DDL on the products table
 
 # This will create tables if they do not exist, and will NOT drop existing data
 Base.metadata.create_all(engine)
 
-print("Database and tables created (if not already present).")
\ No newline at end of file
+print(f"Database and tables created (if not already present) at {engine.url.render_as_string(hide_password=True)}.")
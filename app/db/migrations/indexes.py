@@ -0,0 +1,64 @@
+"""
+Create the secondary indexes declared in app/db/models.py on an existing
+database. Indexes that already exist are skipped, so this is safe to re-run
+after any model change that adds an index.
+
+On Postgres indexes are built with CREATE INDEX CONCURRENTLY so writes keep
+flowing while they build.
+
+Usage:
+    python -m app.db.migrations.indexes
+"""
+import argparse
+import sys
+
+from sqlalchemy import Index, create_engine, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from app.core.config import DATABASE_URL
+from app.db.models import Base
+
+
+def missing_indexes(engine: Engine) -> list[Index]:
+    inspector = inspect(engine)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in sorted(table.indexes, key=lambda index: index.name) if index.name not in existing)
+    return missing
+
+
+def upgrade(engine: Engine) -> list[str]:
+    created = []
+    for index in missing_indexes(engine):
+        if engine.dialect.name == "postgresql":
+            concurrent = Index(
+                index.name, *index.expressions, unique=index.unique, postgresql_concurrently=True,
+            )
+            # CONCURRENTLY cannot run inside a transaction block
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(CreateIndex(concurrent, if_not_exists=True))
+            concurrent.table.indexes.discard(concurrent)
+        else:
+            with engine.begin() as conn:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+        created.append(index.name)
+        print(f"{index.table.name}: created {index.name}")
+    if not created:
+        print("all indexes present")
+    return created
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args(argv)
+    upgrade(create_engine(args.database_url))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
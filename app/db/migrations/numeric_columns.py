@@ -0,0 +1,251 @@
+"""
+Online migration of products.price / products.count / orders.quantity from
+String(20) to Numeric/Integer.
+
+Runs as expand -> backfill -> contract so the tables are never rewritten
+under a long lock:
+
+* expand:   add nullable shadow columns (``<column>_new``) and triggers that
+            keep them in sync with writes made while the migration runs.
+* backfill: convert existing rows in small primary-key ordered batches, one
+            transaction per batch. Only rows whose shadow column is still NULL
+            are picked up, so the step can be interrupted and re-run.
+* contract: drop the triggers and the old columns, then rename the shadow
+            columns into place. Refuses to run while unconverted rows remain.
+            On Postgres the columns become NOT NULL again; SQLite cannot add
+            that constraint without rebuilding the table, so there they stay
+            nullable and only the application (nullable=False on the models)
+            keeps NULLs out.
+
+Usage:
+    python -m app.db.migrations.numeric_columns all --batch-size 5000
+"""
+import argparse
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import create_engine, inspect, text, bindparam, Integer, Numeric
+from sqlalchemy.engine import Engine
+
+from app.core.config import DATABASE_URL
+
+
+def _to_decimal(value: str) -> Decimal:
+    return Decimal(value).quantize(Decimal("0.01"))
+
+
+def _to_int(value: str) -> int:
+    number = Decimal(value)
+    if number != number.to_integral_value():
+        raise ValueError(f"{value!r} is not a whole number")
+    return int(number)
+
+
+# (table, primary key, column, new SQL type, python converter, bind type)
+COLUMNS = [
+    ("products", "product_id", "price", "NUMERIC(12, 2)", _to_decimal, Numeric(12, 2)),
+    ("products", "product_id", "count", "INTEGER", _to_int, Integer()),
+    ("orders", "order_id", "quantity", "INTEGER", _to_int, Integer()),
+]
+TABLES = {"products": "product_id", "orders": "order_id"}
+
+
+def _shadow(column: str) -> str:
+    return f"{column}_new"
+
+
+def _columns(engine: Engine, table: str) -> set:
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def _table_columns(table: str) -> list:
+    return [spec for spec in COLUMNS if spec[0] == table]
+
+
+def _convert(converter, value):
+    if value is None:
+        return None
+    try:
+        return converter(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _needs_migration(engine: Engine, table: str, column: str) -> bool:
+    for info in inspect(engine).get_columns(table):
+        if info["name"] == column:
+            return info["type"].python_type is str
+    return False
+
+
+def expand(engine: Engine) -> None:
+    for table, pk in TABLES.items():
+        specs = [spec for spec in _table_columns(table) if _needs_migration(engine, table, spec[2])]
+        if not specs:
+            print(f"{table}: already numeric, nothing to expand")
+            continue
+        existing = _columns(engine, table)
+        with engine.begin() as conn:
+            for _, _, column, sql_type, _, _ in specs:
+                if _shadow(column) not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {_shadow(column)} {sql_type}"))
+            _create_sync_triggers(conn, engine.dialect.name, table, pk, specs)
+        print(f"{table}: shadow columns ready: {', '.join(_shadow(spec[2]) for spec in specs)}")
+
+
+def _sqlite_cast(value: str, sql_type: str) -> str:
+    # A valid JSON number is a clean numeric literal; anything else stays NULL.
+    # Nested CASEs because json_type() raises on text that is not JSON.
+    converted = f"CAST({value} AS {sql_type})"
+    if sql_type == "INTEGER":
+        converted = f"CASE WHEN CAST({value} AS REAL) = CAST({value} AS INTEGER) THEN {converted} END"
+    return (
+        f"CASE WHEN json_valid({value}) THEN "
+        f"CASE WHEN json_type({value}) IN ('integer', 'real') THEN {converted} END END"
+    )
+
+
+def _pg_cast(value: str, sql_type: str) -> str:
+    converted = f"({value})::{sql_type}"
+    if sql_type == "INTEGER":
+        # A plain ::INTEGER cast rounds '4.5' to 5
+        converted = f"CASE WHEN ({value})::numeric = trunc(({value})::numeric) THEN {converted} END"
+    return f"CASE WHEN {value} ~ '^[+-]?([0-9]+[.]?[0-9]*|[.][0-9]+)$' THEN {converted} END"
+
+
+def _create_sync_triggers(conn, dialect: str, table: str, pk: str, specs: list) -> None:
+    """
+    Mirror writes made by the running application into the shadow columns.
+
+    Values the backfill converters would reject (not a plain number, or a
+    fraction for an integer column) leave the shadow column NULL, so the
+    backfill reports them and contract refuses to run, rather than storing
+    whatever a database cast makes of them ('n/a' -> 0, '4.5' -> 4).
+    """
+    if dialect == "postgresql":
+        assignments = " ".join(
+            f"NEW.{_shadow(column)} := {_pg_cast(f'trim(NEW.{column})', sql_type)};"
+            for _, _, column, sql_type, _, _ in specs
+        )
+        conn.execute(text(
+            f"CREATE OR REPLACE FUNCTION srx_sync_{table}_numeric() RETURNS trigger AS $$ "
+            f"BEGIN {assignments} RETURN NEW; END $$ LANGUAGE plpgsql"
+        ))
+        conn.execute(text(f"DROP TRIGGER IF EXISTS srx_sync_{table}_numeric ON {table}"))
+        conn.execute(text(
+            f"CREATE TRIGGER srx_sync_{table}_numeric BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION srx_sync_{table}_numeric()"
+        ))
+        return
+    assignments = ", ".join(
+        f"{_shadow(column)} = {_sqlite_cast(f'trim(NEW.{column})', sql_type)}" for _, _, column, sql_type, _, _ in specs
+    )
+    watched = ", ".join(column for _, _, column, _, _, _ in specs)
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS srx_sync_{table}_numeric_insert AFTER INSERT ON {table} "
+        f"BEGIN UPDATE {table} SET {assignments} WHERE {pk} = NEW.{pk}; END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS srx_sync_{table}_numeric_update AFTER UPDATE OF {watched} ON {table} "
+        f"BEGIN UPDATE {table} SET {assignments} WHERE {pk} = NEW.{pk}; END"
+    ))
+
+
+def _drop_sync_triggers(conn, dialect: str, table: str) -> None:
+    if dialect == "postgresql":
+        conn.execute(text(f"DROP TRIGGER IF EXISTS srx_sync_{table}_numeric ON {table}"))
+        conn.execute(text(f"DROP FUNCTION IF EXISTS srx_sync_{table}_numeric()"))
+        return
+    conn.execute(text(f"DROP TRIGGER IF EXISTS srx_sync_{table}_numeric_insert"))
+    conn.execute(text(f"DROP TRIGGER IF EXISTS srx_sync_{table}_numeric_update"))
+
+
+def backfill(engine: Engine, batch_size: int = 5000, pause: float = 0.0) -> dict:
+    """
+    Convert rows in primary-key order, committing after every batch.
+
+    Returns the primary keys whose values could not be converted; they are
+    left NULL so ``contract`` refuses to drop the source column.
+    """
+    rejected = {}
+    for table, pk in TABLES.items():
+        specs = [spec for spec in _table_columns(table) if _shadow(spec[2]) in _columns(engine, table)]
+        if not specs:
+            continue
+        pending = " OR ".join(f"{_shadow(spec[2])} IS NULL" for spec in specs)
+        select_columns = ", ".join(spec[2] for spec in specs)
+        update = text(
+            f"UPDATE {table} SET "
+            + ", ".join(f"{_shadow(spec[2])} = :{spec[2]}" for spec in specs)
+            + f" WHERE {pk} = :pk"
+        ).bindparams(*[bindparam(spec[2], type_=spec[5]) for spec in specs])
+        last_key, converted, started = "", 0, time.perf_counter()
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(text(
+                    f"SELECT {pk}, {select_columns} FROM {table} "
+                    f"WHERE {pk} > :last_key AND ({pending}) ORDER BY {pk} LIMIT :batch_size"
+                ), {"last_key": last_key, "batch_size": batch_size}).all()
+                if not rows:
+                    break
+                params = []
+                for row in rows:
+                    values = {"pk": row[0]}
+                    for index, spec in enumerate(specs, start=1):
+                        values[spec[2]] = _convert(spec[4], row[index])
+                        if values[spec[2]] is None:
+                            rejected.setdefault(table, []).append(row[0])
+                    params.append(values)
+                conn.execute(update, params)
+            last_key = rows[-1][0]
+            converted += len(rows)
+            print(f"{table}: {converted} rows converted ({converted / (time.perf_counter() - started):.0f} rows/s)")
+            if pause:
+                time.sleep(pause)
+    return rejected
+
+
+def contract(engine: Engine) -> None:
+    for table, pk in TABLES.items():
+        specs = [spec for spec in _table_columns(table) if _shadow(spec[2]) in _columns(engine, table)]
+        if not specs:
+            continue
+        with engine.begin() as conn:
+            pending = " OR ".join(f"{_shadow(spec[2])} IS NULL" for spec in specs)
+            remaining = conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE {pending}")).scalar()
+            if remaining:
+                raise RuntimeError(f"{table}: {remaining} rows not converted yet; run backfill and fix rejected rows")
+            _drop_sync_triggers(conn, engine.dialect.name, table)
+            for _, _, column, _, _, _ in specs:
+                conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+                conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {_shadow(column)} TO {column}"))
+                if engine.dialect.name == "postgresql":
+                    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+        print(f"{table}: swapped in {', '.join(spec[2] for spec in specs)}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("step", choices=["expand", "backfill", "contract", "all"])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    if args.step in ("expand", "all"):
+        expand(engine)
+    if args.step in ("backfill", "all"):
+        rejected = backfill(engine, batch_size=args.batch_size, pause=args.pause)
+        for table, keys in rejected.items():
+            print(f"{table}: {len(keys)} rows could not be converted: {', '.join(keys[:20])}")
+        if rejected:
+            return 1
+    if args.step in ("contract", "all"):
+        contract(engine)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
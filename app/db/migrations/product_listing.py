@@ -0,0 +1,67 @@
+"""
+Prepare products for filtered and sorted listings.
+
+Adds ``products.created_at`` as a nullable column (no table rewrite; SQLite
+cannot add a column with a non-constant default), backfills it in rowid
+batches and drops the old single-column ``ix_products_category_id`` index,
+which the composite listing indexes supersede. Run ``indexes`` afterwards
+to build the composite indexes.
+
+Usage:
+    python -m app.db.migrations.product_listing --batch-size 5000
+    python -m app.db.migrations.indexes
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import DATABASE_URL
+
+OLD_INDEX = "ix_products_category_id"
+
+
+def upgrade(engine: Engine, batch_size: int = 5000) -> int:
+    columns = {column["name"] for column in inspect(engine).get_columns("products")}
+    if "created_at" not in columns:
+        column_type = "TIMESTAMP" if engine.dialect.name == "postgresql" else "DATETIME"
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE products ADD COLUMN created_at {column_type}"))
+
+    filled = 0
+    while True:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                rows = conn.execute(text(
+                    "UPDATE products SET created_at = now() WHERE ctid IN ("
+                    "SELECT ctid FROM products WHERE created_at IS NULL LIMIT :limit)"
+                ), {"limit": batch_size}).rowcount
+            else:
+                rows = conn.execute(text(
+                    # Microsecond text like the application writes; CURRENT_TIMESTAMP's
+                    # shorter form sorts out of step with keyset cursors
+                    "UPDATE products SET created_at = strftime('%Y-%m-%d %H:%M:%f000', 'now') WHERE rowid IN ("
+                    "SELECT rowid FROM products WHERE created_at IS NULL LIMIT :limit)"
+                ), {"limit": batch_size}).rowcount
+        filled += rows
+        if rows < batch_size:
+            break
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {OLD_INDEX}"))
+    print(f"products: created_at ready ({filled} rows backfilled)")
+    return filled
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+    upgrade(create_engine(args.database_url), batch_size=args.batch_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Create the full-text product index (see app/db/search.py) on an existing
+database and backfill it.
+
+SQLite: creates the FTS5 table, its key table and triggers, then indexes
+existing rows in rowid batches, one transaction per batch. Re-running is
+safe. An index from an earlier layout, keyed directly on the products
+rowid (which VACUUM may renumber), is dropped and rebuilt.
+Postgres: adds the generated search_vector column and its GIN index. Adding
+a stored generated column rewrites the table, so run it in a quiet window.
+
+Usage:
+    python -m app.db.migrations.product_search --batch-size 10000
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import DATABASE_URL
+from app.db import search
+
+
+def upgrade(engine: Engine, batch_size: int = 10000) -> None:
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for statement in search.postgresql_ddl():
+                conn.execute(text(statement))
+        print("products: search_vector column and GIN index ready")
+        return
+
+    tables = set(inspect(engine).get_table_names())
+    if "products_fts" in tables and "products_fts_keys" not in tables:
+        with engine.begin() as conn:
+            for trigger in search.SQLITE_TRIGGERS:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            conn.execute(text("DROP TABLE products_fts"))
+        print("products_fts: dropped rowid-keyed index")
+
+    with engine.begin() as conn:
+        for statement in search.sqlite_ddl():
+            conn.execute(text(statement))
+        max_rowid = conn.execute(text("SELECT coalesce(max(rowid), 0) FROM products")).scalar()
+    start = 0
+    while start < max_rowid:
+        end = start + batch_size
+        with engine.begin() as conn:
+            for statement in search.sqlite_rebuild_sql():
+                conn.execute(text(statement), {"start": start, "end": end})
+        print(f"products_fts: indexed rowid {start + 1}..{min(end, max_rowid)}")
+        start = end
+    print("products_fts: ready")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args(argv)
+    upgrade(create_engine(args.database_url), batch_size=args.batch_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""
+Add the external ``products.sku`` key used by bulk catalog imports.
+
+Adds a nullable column (no table rewrite) and a unique index on it.
+
+Usage:
+    python -m app.db.migrations.product_sku
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import DATABASE_URL
+
+INDEX_NAME = "ix_products_sku"
+
+
+def upgrade(engine: Engine) -> None:
+    columns = {column["name"] for column in inspect(engine).get_columns("products")}
+    with engine.begin() as conn:
+        if "sku" not in columns:
+            conn.execute(text("ALTER TABLE products ADD COLUMN sku VARCHAR(64)"))
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME} ON products (sku)"))
+    print("products: sku column and unique index ready")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args(argv)
+    upgrade(create_engine(args.database_url))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
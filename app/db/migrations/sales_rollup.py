@@ -0,0 +1,107 @@
+"""
+Create and backfill the daily sales rollup (see app/crud/crud_sales.py).
+
+Adds ``orders.unit_price`` and fills it from the current product price for
+orders placed before the column existed (orders of deleted products are
+listed and left NULL), creates ``sales_daily`` and its
+index, then rebuilds rollup rows from the orders table a few days per
+transaction. Each range is recomputed from scratch, so the job can be
+re-run or resumed with ``--start``. Deploy the application first so new
+orders are counted incrementally; a day rebuilt while orders for it are
+still arriving may miss those writes, so re-run the current day afterwards.
+
+Usage:
+    python -m app.db.migrations.sales_rollup --days-per-batch 7
+    python -m app.db.migrations.sales_rollup --start 2024-01-01 --end 2024-02-01
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import DATABASE_URL
+from app.crud.crud_sales import rebuild_sales_rollups
+from app.db.models import Order, SalesDaily
+
+
+def expand(engine: Engine) -> None:
+    columns = {column["name"] for column in inspect(engine).get_columns("orders")}
+    if "unit_price" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE orders ADD COLUMN unit_price NUMERIC(12, 2)"))
+    SalesDaily.__table__.create(engine, checkfirst=True)
+    print("orders.unit_price and sales_daily ready")
+
+
+def backfill_unit_prices(engine: Engine, batch_size: int = 5000) -> list[str]:
+    """
+    Copy the current product price onto orders without one, walking the
+    primary key so every order is visited once.
+
+    Returns the orders whose product no longer exists; they keep a NULL
+    unit_price and count no revenue.
+    """
+    last_key, filled, unpriced = "", 0, []
+    while True:
+        with engine.begin() as conn:
+            keys = conn.execute(text(
+                "SELECT order_id FROM orders WHERE order_id > :last_key AND unit_price IS NULL "
+                "ORDER BY order_id LIMIT :limit"
+            ), {"last_key": last_key, "limit": batch_size}).scalars().all()
+            if not keys:
+                break
+            batch = {"first": keys[0], "last": keys[-1]}
+            filled += conn.execute(text(
+                "UPDATE orders SET unit_price = ("
+                "SELECT price FROM products WHERE products.product_id = orders.product_id) "
+                "WHERE order_id >= :first AND order_id <= :last AND unit_price IS NULL "
+                "AND EXISTS (SELECT 1 FROM products WHERE products.product_id = orders.product_id)"
+            ), batch).rowcount
+            unpriced += conn.execute(text(
+                "SELECT order_id FROM orders WHERE order_id >= :first AND order_id <= :last "
+                "AND unit_price IS NULL ORDER BY order_id"
+            ), batch).scalars().all()
+        last_key = keys[-1]
+    print(f"orders: unit_price backfilled on {filled} rows")
+    if unpriced:
+        print(f"orders: {len(unpriced)} rows reference deleted products and were left without a unit_price")
+    return unpriced
+
+
+def rebuild(engine: Engine, start: Optional[date] = None, end: Optional[date] = None, days_per_batch: int = 7) -> None:
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        first, last = db.execute(select(func.min(Order.created_at), func.max(Order.created_at))).one()
+        if first is None:
+            print("sales_daily: no orders to roll up")
+            return
+        start = start or first.date()
+        end = end or last.date() + timedelta(days=1)
+        while start < end:
+            stop = min(start + timedelta(days=days_per_batch), end)
+            rows = rebuild_sales_rollups(db, start, stop)
+            print(f"sales_daily: {start}..{stop - timedelta(days=1)} -> {rows} rows")
+            start = stop
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--start", type=date.fromisoformat, help="first day to rebuild (default: first order)")
+    parser.add_argument("--end", type=date.fromisoformat, help="day after the last to rebuild (default: after last order)")
+    parser.add_argument("--days-per-batch", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=5000, help="orders per unit_price backfill batch")
+    args = parser.parse_args(argv)
+    engine = create_engine(args.database_url)
+    expand(engine)
+    backfill_unit_prices(engine, batch_size=args.batch_size)
+    rebuild(engine, start=args.start, end=args.end, days_per_batch=args.days_per_batch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
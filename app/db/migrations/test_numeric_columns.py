@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+import pytest
+
+from sqlalchemy import create_engine, text
+
+from app.db.migrations import numeric_columns
+
+# app/db/migrations/test_numeric_columns.py
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE products (product_id VARCHAR(36) PRIMARY KEY, price VARCHAR(20) NOT NULL, count VARCHAR(20) NOT NULL)",
+    "CREATE TABLE orders (order_id VARCHAR(36) PRIMARY KEY, quantity VARCHAR(20) NOT NULL)",
+    "INSERT INTO products VALUES ('p1', '12.5', '10'), ('p2', 'n/a', '3')",
+    "INSERT INTO orders VALUES ('o1', '2'), ('o2', '4.0')",
+]
+
+
+def _legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+    return engine
+
+
+def test_backfill_is_batched_and_resumable(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    numeric_columns.expand(engine)
+    rejected = numeric_columns.backfill(engine, batch_size=1)
+    assert rejected == {"products": ["p2"]}
+
+    # Writes made by the old application while migrating reach the shadow columns
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE products SET price = '7', count = '8' WHERE product_id = 'p2'"))
+    assert numeric_columns.backfill(engine, batch_size=1) == {}
+
+    numeric_columns.contract(engine)
+    with engine.connect() as conn:
+        products = conn.execute(text("SELECT product_id, price, count FROM products ORDER BY product_id")).all()
+        orders = conn.execute(text("SELECT order_id, quantity FROM orders ORDER BY order_id")).all()
+    assert [(pk, Decimal(str(price)), count) for pk, price, count in products] == [
+        ("p1", Decimal("12.5"), 10), ("p2", Decimal("7"), 8),
+    ]
+    assert orders == [("o1", 2), ("o2", 4)]
+
+
+def test_contract_refuses_unconverted_rows(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    numeric_columns.expand(engine)
+    numeric_columns.backfill(engine)
+    with pytest.raises(RuntimeError, match="products"):
+        numeric_columns.contract(engine)
+
+
+def test_sync_triggers_only_copy_clean_numbers(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    numeric_columns.expand(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO products (product_id, price, count) VALUES ('p3', 'oops', '4.5'), ('p4', ' 9.99 ', '6.0')"))
+        conn.execute(text("INSERT INTO orders (order_id, quantity) VALUES ('o3', '2x')"))
+        products = dict(conn.execute(text(
+            "SELECT product_id, price_new || '/' || coalesce(count_new, 'NULL') FROM products WHERE product_id IN ('p3', 'p4')"
+        )).all())
+        order = conn.execute(text("SELECT quantity_new FROM orders WHERE order_id = 'o3'")).scalar()
+    assert products == {"p3": None, "p4": "9.99/6"}
+    assert order is None
+
+    rejected = numeric_columns.backfill(engine)
+    assert {table: set(keys) for table, keys in rejected.items()} == {"products": {"p2", "p3"}, "orders": {"o3"}}
@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, text
+
+from app.crud import crud_products
+from app.crud.pagination import encode_cursor
+from app.db.migrations import indexes, product_listing
+from app.db.models import Category, Product
+
+# app/db/migrations/test_product_listing.py
+
+
+def _products_without_created_at(db, db_path, count):
+    db.add(Category(category_id="c1", category="Books"))
+    db.add_all(Product(product_id=f"p{i}", name=f"Book {i}", price=10, category_id="c1", count=1) for i in range(count))
+    db.commit()
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.begin() as conn:
+        for index in ("ix_products_category_created_at", "ix_products_created_at"):
+            conn.execute(text(f"DROP INDEX {index}"))
+        conn.execute(text("ALTER TABLE products DROP COLUMN created_at"))
+    return engine
+
+
+def test_backfilled_rows_page_by_newest(db, db_path):
+    engine = _products_without_created_at(db, db_path, 5)
+    assert product_listing.upgrade(engine, batch_size=2) == 5
+    indexes.upgrade(engine)
+    engine.dispose()
+
+    seen, cursor = [], None
+    while len(seen) <= 5:
+        page = crud_products.get_products(db, limit=2, cursor=cursor, sort="newest", use_cache=False)
+        seen.extend(product.product_id for product in page)
+        if len(page) < 2:
+            break
+        cursor = encode_cursor([page[-1].created_at, page[-1].product_id])
+    assert sorted(seen) == [f"p{i}" for i in range(5)]
@@ -0,0 +1,28 @@
+from decimal import Decimal
+
+from sqlalchemy import create_engine, text
+
+from app.db.migrations import sales_rollup
+
+# app/db/migrations/test_sales_rollup.py
+
+
+def test_backfill_reports_orders_of_deleted_products(db, db_path):
+    db.execute(text("INSERT INTO products (product_id, name, price, category_id, count) VALUES ('p1', 'Novel', 12.5, 'c1', 1)"))
+    for index in range(7):
+        # Five orders point at a product that has since been deleted
+        product_id = "p1" if index in (2, 5) else "gone"
+        db.execute(text(
+            "INSERT INTO orders (order_id, user_id, product_id, address_id, quantity, status, payment_status, created_at) "
+            "VALUES (:order_id, 'u1', :product_id, 'a1', 1, 'pending', 'pending', '2024-01-01 00:00:00.000000')"
+        ), {"order_id": f"o{index}", "product_id": product_id})
+    db.commit()
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    assert sales_rollup.backfill_unit_prices(engine, batch_size=2) == ["o0", "o1", "o3", "o4", "o6"]
+    with engine.connect() as conn:
+        prices = dict(conn.execute(text("SELECT order_id, unit_price FROM orders WHERE unit_price IS NOT NULL")).all())
+    assert {order_id: Decimal(str(price)) for order_id, price in prices.items()} == {"o2": Decimal("12.5"), "o5": Decimal("12.5")}
+    # Re-running only revisits the orders it could not price
+    assert sales_rollup.backfill_unit_prices(engine, batch_size=2) == ["o0", "o1", "o3", "o4", "o6"]
+    engine.dispose()
@@ -0,0 +1,70 @@
+"""
+Rewrite second-precision timestamps on SQLite in microsecond format.
+
+Rows that got their ``created_at`` from SQLite's CURRENT_TIMESTAMP server
+default are stored as 'YYYY-MM-DD HH:MM:SS', while SQLAlchemy writes
+'YYYY-MM-DD HH:MM:SS.ffffff'. SQLite compares the two as text, so the
+shorter form sorts before every value of the same second and keyset
+cursors skip or repeat those rows. This pads them to the long form, one
+rowid range per transaction; already-normalized rows are left alone, so
+the job can be re-run at any time. Postgres stores real timestamps and
+needs nothing.
+
+Usage:
+    python -m app.db.migrations.timestamp_precision --batch-size 5000
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import DATABASE_URL
+
+# (table, column) pairs used in keyset pagination keys
+COLUMNS = (
+    ("orders", "created_at"),
+    ("products", "created_at"),
+)
+
+
+def normalize(engine: Engine, table: str, column: str, batch_size: int = 5000) -> int:
+    with engine.connect() as conn:
+        last = conn.execute(text(f"SELECT max(rowid) FROM {table}")).scalar() or 0
+    fixed = 0
+    for start in range(0, last, batch_size):
+        with engine.begin() as conn:
+            fixed += conn.execute(text(
+                f"UPDATE {table} SET {column} = replace(substr({column}, 1, 19), 'T', ' ') || '.' "
+                f"|| substr(substr({column}, 21) || '000000', 1, 6) "
+                f"WHERE rowid > :start AND rowid <= :end AND length({column}) <> 26"
+            ), {"start": start, "end": start + batch_size}).rowcount
+    return fixed
+
+
+def upgrade(engine: Engine, batch_size: int = 5000) -> int:
+    if engine.dialect.name != "sqlite":
+        print("timestamps: nothing to do outside SQLite")
+        return 0
+    inspector = inspect(engine)
+    fixed = 0
+    for table, column in COLUMNS:
+        if not inspector.has_table(table) or column not in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        rows = normalize(engine, table, column, batch_size)
+        print(f"{table}.{column}: {rows} rows normalized")
+        fixed += rows
+    return fixed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+    upgrade(create_engine(args.database_url), batch_size=args.batch_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
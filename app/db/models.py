@@ -1,7 +1,10 @@
-from sqlalchemy import Column, String, Text, DateTime, JSON, func, ForeignKey
+from sqlalchemy import Column, String, Text, Date, DateTime, JSON, Integer, Numeric, func, ForeignKey, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
+from datetime import datetime
 import enum
 from sqlalchemy import Enum
 
@@ -24,6 +27,27 @@ class PaymentStatus(enum.Enum):
 # Define the base class for SQLAlchemy models
 Base = declarative_base()
 
+
+class utcnow(FunctionElement):
+    """
+    Server-side timestamp default. SQLite's CURRENT_TIMESTAMP has no
+    fractional part, and that text sorts before the microsecond values
+    SQLAlchemy writes for the same second, which breaks keyset cursors.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw):
+    # Same 'YYYY-MM-DD HH:MM:SS.ffffff' layout as SQLAlchemy's DateTime on SQLite
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
 class User(Base):
     __tablename__ = 'users'
 
@@ -44,21 +68,45 @@ class Address(Base):
     country = Column(String(100), nullable=False)
     postal_code = Column(String(20), nullable=False)
 
+    __table_args__ = (
+        Index("ix_addresses_user_id", "user_id"),
+    )
+
 class Category(Base):
     __tablename__ = 'categories'
     category_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     category = Column(String(100), nullable=False)
 
+    __table_args__ = (
+        Index("ix_categories_category", "category"),
+    )
+
 class Product(Base):
     __tablename__ = 'products'
 
     product_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    sku = Column(String(64), nullable=True)  # External catalog key used by bulk imports (unique index below)
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
-    price = Column(String(20), nullable=False)
+    price = Column(Numeric(12, 2), nullable=False)
     category_id = Column(String(100), ForeignKey('categories.category_id'), nullable=False)
     product_metadata = Column(JSON, nullable=True)  # For additional product information
-    count = Column(String(20), nullable=False)
+    count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=utcnow(), nullable=False)
+
+    # One index per listing sort, with and without a category prefix, each
+    # ending in product_id so keyset pagination is a single range scan.
+    # count is deliberately not indexed: stock updates touch no index.
+    __table_args__ = (
+        Index("ix_products_sku", "sku", unique=True),
+        Index("ix_products_category_product_id", "category_id", "product_id"),
+        Index("ix_products_category_price", "category_id", "price", "product_id"),
+        Index("ix_products_category_name", "category_id", "name", "product_id"),
+        Index("ix_products_category_created_at", "category_id", "created_at", "product_id"),
+        Index("ix_products_price", "price", "product_id"),
+        Index("ix_products_name", "name", "product_id"),
+        Index("ix_products_created_at", "created_at", "product_id"),
+    )
 
 class Order(Base):
     __tablename__ = 'orders'
@@ -68,7 +116,86 @@ class Order(Base):
     product_id = Column(String(36), ForeignKey('products.product_id'), nullable=False)
     payment_status = Column(Enum(PaymentStatus), nullable=False)
     address_id = Column(String(36), ForeignKey('addresses.address_id'), nullable=False)
-    quantity = Column(String(20), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    # Product price when the order was placed, so sales rollups stay exact
+    # after later price changes (NULL on rows predating the column).
+    unit_price = Column(Numeric(12, 2), nullable=True)
     status = Column(Enum(OrderStatus), nullable=False)
-    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    # Set client-side as well so the stored value round-trips exactly through
+    # keyset pagination cursors; rows from older schemas are normalized by
+    # app.db.migrations.timestamp_precision.
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=utcnow(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Match the keyset pagination key so listings are index range scans
+        Index("ix_orders_created_at_order_id", "created_at", "order_id"),
+        Index("ix_orders_user_id_created_at", "user_id", "created_at", "order_id"),
+        Index("ix_orders_product_id", "product_id"),
+    )
+
+
+class SalesDaily(Base):
+    """
+    Orders rolled up per UTC day x product x status. Kept in step with the
+    orders table inside the same transaction as each order write (see
+    app.crud.crud_sales); rebuild with app.db.migrations.sales_rollup.
+    """
+    __tablename__ = 'sales_daily'
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(String(36), primary_key=True)
+    status = Column(Enum(OrderStatus), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_sales_daily_product_id_day", "product_id", "day", "status"),
+    )
+
+
+class IdempotencyKey(Base):
+    """
+    First response to a POST sent with an ``Idempotency-Key`` header, replayed
+    to retries of the same request (see app.crud.crud_idempotency). A row with
+    no status_code is a claim held by a request that is still running.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    scope = Column(String(64), primary_key=True)  # "POST /orders": keys are per endpoint
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request payload
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+
+class OutboxEvent(Base):
+    """
+    Follow-up work recorded in the same transaction as the change that
+    caused it, and delivered afterwards by the outbox worker (app.core.outbox).
+    Delivered events are deleted; available_at is NULL once an event has
+    used up its attempts (failed_at set).
+    """
+    __tablename__ = 'outbox_events'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    topic = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+    failed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_events_available_at", "available_at", "id"),
+        # Covers the queue-depth aggregate (count and oldest created_at of pending events)
+        Index("ix_outbox_events_failed_at_created_at", "failed_at", "created_at"),
+    )
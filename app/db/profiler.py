@@ -0,0 +1,171 @@
+"""
+SQL profiler built on SQLAlchemy engine events.
+
+Every statement executed while a request is in flight is attributed to that
+request's RequestProfile (found through a ContextVar, which follows work
+into the threadpool and SQLAlchemy's async greenlets). The profile counts
+statements and time, and flags the same SQL text running
+SQL_REPEAT_THRESHOLD or more times in one request, the usual sign of an N+1
+loop. Statements slower than SQL_SLOW_QUERY_MS are logged with their
+parameters and query plan, whether or not a request is active.
+
+SQLProfilerMiddleware adds the numbers as X-DB-* response headers (debug
+mode); ``capture`` profiles everything on an engine for tests and scripts.
+"""
+import logging
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import SQL_SLOW_QUERY_MS, SQL_REPEAT_THRESHOLD, SQL_EXPLAIN_SLOW_QUERIES
+
+logger = logging.getLogger("srx.sql")
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+REPEATED_QUERIES_HEADER = "X-DB-Repeated-Queries"
+
+
+class RequestProfile:
+    """Database work attributed to one request (or one ``capture`` block)."""
+    __slots__ = ("label", "db_time", "statements", "counts")
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.db_time = 0.0
+        self.statements = 0
+        self.counts: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.db_time += elapsed
+        self.statements += 1
+        self.counts[statement] += 1
+        if self.counts[statement] == SQL_REPEAT_THRESHOLD:
+            logger.warning(
+                "possible N+1 in %s: same statement executed %d times: %s",
+                self.label or "request", SQL_REPEAT_THRESHOLD, " ".join(statement.split()),
+            )
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD) -> dict[str, int]:
+        return {statement: count for statement, count in self.counts.items() if count >= threshold}
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("srx_request_profile", default=None)
+
+# Active ``capture`` blocks per engine
+_captures: "weakref.WeakKeyDictionary[Engine, list[RequestProfile]]" = weakref.WeakKeyDictionary()
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "; ".join(str(row[-1]) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _log_slow(conn, statement, parameters, executemany, elapsed) -> None:
+    plan = None
+    if SQL_EXPLAIN_SLOW_QUERIES and not executemany and statement.lstrip()[:6].upper() in ("SELECT", "UPDATE", "DELETE"):
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as exc:  # never let diagnostics break the request
+            plan = f"unavailable ({exc})"
+    if executemany and parameters:
+        # Bulk inserts can carry thousands of rows; the first one is enough to identify them
+        parameters = f"{parameters[0]!r} (+{len(parameters) - 1} more)"
+    profile = current_profile.get()
+    logger.warning(
+        "slow query %.1f ms in %s: %s | params=%s | plan=%s",
+        elapsed * 1000, profile.label if profile else "background", " ".join(statement.split()),
+        parameters, plan,
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Stored on the per-execution context, so a failed statement leaves nothing behind
+    context.srx_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.srx_started
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    for captured in _captures.get(conn.engine, ()):
+        if captured is not profile:
+            captured.record(statement, elapsed)
+    if SQL_SLOW_QUERY_MS and elapsed * 1000 >= SQL_SLOW_QUERY_MS:
+        _log_slow(conn, statement, parameters, executemany, elapsed)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Profile statements on ``engine`` (use ``.sync_engine`` for an AsyncEngine)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def capture(*engines: Engine, label: str = "capture") -> Iterator[RequestProfile]:
+    """
+    Profile every statement run on ``engines`` inside the block, from any
+    thread or task (e.g. an app driven by TestClient).
+    """
+    profile = RequestProfile(label)
+    for engine in engines:
+        instrument_engine(engine)
+        _captures.setdefault(engine, []).append(profile)
+    try:
+        yield profile
+    finally:
+        for engine in engines:
+            _captures[engine].remove(profile)
+
+
+@contextmanager
+def request_profile(label: str) -> Iterator[RequestProfile]:
+    """Reuse the active profile (e.g. from an outer middleware) or start one."""
+    profile = current_profile.get()
+    if profile is not None:
+        yield profile
+        return
+    profile = RequestProfile(label)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+
+
+class SQLProfilerMiddleware:
+    """Expose per-request statement count, SQL time and repeated statements as headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_profile(f"{scope['method']} {scope['path']}") as profile:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers += [
+                        (QUERY_COUNT_HEADER.lower().encode(), str(profile.statements).encode()),
+                        (QUERY_TIME_HEADER.lower().encode(), f"{profile.db_time * 1000:.2f}".encode()),
+                        (REPEATED_QUERIES_HEADER.lower().encode(), str(len(profile.repeated())).encode()),
+                    ]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
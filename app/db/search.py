@@ -0,0 +1,108 @@
+"""
+Full-text index over products.
+
+SQLite: an FTS5 table ``products_fts`` kept in step by triggers so every
+write path (ORM, bulk upserts, raw SQL) updates the index incrementally.
+products has a text primary key, so its implicit rowid may be renumbered by
+VACUUM and cannot identify index entries. ``products_fts_keys`` assigns each
+product_id a permanent integer key instead (an INTEGER PRIMARY KEY, which
+VACUUM preserves), used as the FTS rowid.
+
+Postgres: a stored generated ``search_vector`` tsvector column with a GIN
+index, maintained by the database on every insert/update.
+
+Both index name, description and the product_metadata keys listed in
+SRX_SEARCH_METADATA_KEYS.
+"""
+import re
+
+from sqlalchemy import DDL, Column, Integer, MetaData, Table, Text, event
+
+from app.core.config import SEARCH_METADATA_KEYS
+from app.db.models import Product
+
+# Lightweight handles for queries; kept out of Base.metadata so create_all
+# never tries to create them as ordinary tables (sqlite_ddl does).
+_search_metadata = MetaData()
+products_fts = Table(
+    "products_fts", _search_metadata,
+    Column("rowid", Integer, primary_key=True),
+    Column("name", Text),
+    Column("description", Text),
+    Column("metadata", Text),
+)
+products_fts_keys = Table(
+    "products_fts_keys", _search_metadata,
+    Column("key", Integer, primary_key=True),
+    Column("product_id", Text, unique=True),
+)
+
+# bm25() weights for name, description, metadata
+BM25_WEIGHTS = (10.0, 4.0, 2.0)
+
+_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def _metadata_keys() -> list[str]:
+    keys = [key for key in SEARCH_METADATA_KEYS if _KEY_PATTERN.match(key)]
+    return keys or ["brand"]
+
+
+def _sqlite_metadata(row: str) -> str:
+    parts = [f"coalesce(json_extract({row}.product_metadata, '$.{key}'), '')" for key in _metadata_keys()]
+    return " || ' ' || ".join(parts)
+
+
+SQLITE_TRIGGERS = ("products_fts_insert", "products_fts_update", "products_fts_delete")
+
+
+def _sqlite_key(row: str) -> str:
+    return f"(SELECT key FROM products_fts_keys WHERE product_id = {row}.product_id)"
+
+
+def sqlite_ddl() -> list[str]:
+    values = f"{_sqlite_key('new')}, new.name, new.description, {_sqlite_metadata('new')}"
+    index_new = f"INSERT INTO products_fts (rowid, name, description, metadata) VALUES ({values});"
+    return [
+        "CREATE TABLE IF NOT EXISTS products_fts_keys (key INTEGER PRIMARY KEY, product_id TEXT NOT NULL UNIQUE)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "name, description, metadata, tokenize = 'unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+        "INSERT OR IGNORE INTO products_fts_keys (product_id) VALUES (new.product_id); "
+        f"{index_new} END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_update "
+        "AFTER UPDATE OF name, description, product_metadata ON products BEGIN "
+        f"DELETE FROM products_fts WHERE rowid = {_sqlite_key('old')}; "
+        f"{index_new} END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+        f"DELETE FROM products_fts WHERE rowid = {_sqlite_key('old')}; "
+        "DELETE FROM products_fts_keys WHERE product_id = old.product_id; END",
+    ]
+
+
+def sqlite_rebuild_sql() -> list[str]:
+    """Index products in the ``(:start, :end]`` rowid range; used for backfills."""
+    in_range = "products.rowid > :start AND products.rowid <= :end"
+    return [
+        f"INSERT OR IGNORE INTO products_fts_keys (product_id) SELECT product_id FROM products WHERE {in_range}",
+        "INSERT OR REPLACE INTO products_fts (rowid, name, description, metadata) "
+        f"SELECT products_fts_keys.key, name, description, {_sqlite_metadata('products')} FROM products "
+        f"JOIN products_fts_keys ON products_fts_keys.product_id = products.product_id WHERE {in_range}",
+    ]
+
+
+def postgresql_ddl() -> list[str]:
+    metadata = " || ' ' || ".join(f"coalesce(product_metadata->>'{key}', '')" for key in _metadata_keys())
+    return [
+        "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+        f"setweight(to_tsvector('simple', {metadata}), 'C')) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+    ]
+
+
+for _statement in sqlite_ddl():
+    event.listen(Product.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in postgresql_ddl():
+    event.listen(Product.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
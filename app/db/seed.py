@@ -0,0 +1,391 @@
+"""
+Generate a large, deterministic synthetic dataset for benchmarks and plan tests.
+
+Creates categories, products, users (all sharing one password), addresses
+and orders linked by foreign key. Order volume is skewed: products and
+users are drawn from Zipf-like distributions, so a few hot products and
+heavy users carry most of the orders, as in production. The sales rollup
+is rebuilt at the end.
+
+Every row is a pure function of ``(seed, table, index)``: ids are derived
+from the index, and random values come from one RNG per fixed block of
+SEED_BLOCK rows, so the same seed produces the same rows whatever the
+batch size, even across a resume with a different one. Batches are
+bulk-inserted one transaction each, with progress recorded in the same
+transaction, so an interrupted run resumes where it stopped when started
+again with the same plan.
+
+On SQLite rows go straight to the driver's executemany with cheap
+per-column conversions, and secondary indexes are dropped while a table
+loads and rebuilt once at the end. The full-text index triggers are
+dropped the same way while products load, and the index is rebuilt in
+rowid batches afterwards. Other databases use Core bulk inserts.
+
+Usage:
+    python -m app.db.seed --scale 1000000 --database-url sqlite:///./bench.db
+    python -m app.db.seed --users 50000 --products 20000 --orders 2000000 --seed 7 --database-url sqlite:///./bench.db
+
+The target database is required explicitly: loading drops and rebuilds the
+tables' secondary indexes and the search triggers, which must never happen
+to the app's database by accident.
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import Column, DateTime, Enum, Integer, MetaData, String, Table, Text, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.hashing import bcrypt_hash
+from app.crud.crud_sales import rebuild_sales_rollups
+from app.db.models import Address, Base, Category, Order, OrderStatus, PaymentStatus, Product, User, UserRole
+from app.db.session import create_db_engine
+from app.db import search  # also registers the full-text index DDL on the products table
+
+SEED_PASSWORD = "Password123"
+DEFAULT_BATCH_SIZE = 20000
+# Rows per RNG stream; batch sizes that are a multiple of it generate no row twice
+SEED_BLOCK = 1000
+ADDRESSES_PER_USER = 2
+# Zipf exponents: higher means more concentrated on the hottest rows
+PRODUCT_SKEW = 1.1
+USER_SKEW = 0.8
+
+# Resume bookkeeping; kept out of Base.metadata so it is never part of the app schema
+seed_progress = Table(
+    "seed_progress", MetaData(),
+    Column("name", String(64), primary_key=True),
+    Column("done", Integer, nullable=False),
+    Column("plan", Text, nullable=False),
+)
+
+# Id prefix per table: ids are uuid-shaped, unique per (table, seed, index)
+_ID_KINDS = {"categories": 1, "products": 2, "users": 3, "addresses": 4, "orders": 5}
+
+_STATUSES = [OrderStatus.completed, OrderStatus.processing, OrderStatus.pending, OrderStatus.cancelled]
+_STATUS_WEIGHTS = [70, 10, 12, 8]
+_PAYMENTS = [PaymentStatus.completed, PaymentStatus.COD, PaymentStatus.Pre_paid, PaymentStatus.pending, PaymentStatus.refunded]
+_PAYMENT_WEIGHTS = [45, 25, 20, 7, 3]
+_CITIES = [("Pune", "MH"), ("Mumbai", "MH"), ("Bengaluru", "KA"), ("Delhi", "DL"), ("Chennai", "TN"), ("Hyderabad", "TG")]
+
+
+@dataclass
+class SeedPlan:
+    categories: int
+    products: int
+    users: int
+    orders: int
+    seed: int = 0
+    days: int = 365
+    end: str = ""  # ISO date orders lead up to; "" = the resumed run's, else tomorrow
+
+    @classmethod
+    def for_scale(cls, scale: int, seed: int = 0, days: int = 365, end: Optional[date] = None) -> "SeedPlan":
+        """``scale`` users and products, five orders per user."""
+        return cls(
+            categories=max(scale // 100, 5), products=max(scale, 10), users=max(scale, 10), orders=scale * 5,
+            seed=seed, days=days, end=end.isoformat() if end else "",
+        )
+
+
+def _id_prefix(kind: str, plan: SeedPlan) -> str:
+    return f"{_ID_KINDS[kind]:08x}-{(plan.seed >> 16) & 0xffff:04x}-{plan.seed & 0xffff:04x}-8000-"
+
+
+def entity_id(kind: str, plan: SeedPlan, index: int) -> str:
+    return f"{_id_prefix(kind, plan)}{index:012x}"
+
+
+def product_price(plan: SeedPlan, index: int) -> Decimal:
+    # Deterministic without storing prices: orders need them for unit_price
+    return Decimal((index * 2654435761 + plan.seed * 40503) % 49900 + 100) / 100
+
+
+def user_email(plan: SeedPlan, index: int) -> str:
+    return f"user{index}@example.com" if plan.seed == 0 else f"user{index}+s{plan.seed}@example.com"
+
+
+def _zipf_cumulative(n: int, skew: float) -> list[float]:
+    return list(itertools.accumulate(1.0 / (rank + 1) ** skew for rank in range(n)))
+
+
+def _rng(plan: SeedPlan, table: str, block: int) -> random.Random:
+    return random.Random(f"{plan.seed}:{table}:{block}")
+
+
+def _categories(plan: SeedPlan, start: int, stop: int, block: int, context: dict) -> Iterator[tuple]:
+    prefix = _id_prefix("categories", plan)
+    for i in range(start, stop):
+        yield (f"{prefix}{i:012x}", f"Category {i}")
+
+
+def _products(plan: SeedPlan, start: int, stop: int, block: int, context: dict) -> Iterator[tuple]:
+    rng = _rng(plan, "products", block)
+    prefix, category_prefix = _id_prefix("products", plan), _id_prefix("categories", plan)
+    end, span, random_ = context["end"], plan.days * 86400.0, rng.random
+    for i in range(start, stop):
+        category = int(random_() * plan.categories)
+        yield (
+            f"{prefix}{i:012x}", f"SKU-{plan.seed}-{i:09d}", f"Product {i}",
+            f"Synthetic product {i} in category {category}", product_price(plan, i),
+            f"{category_prefix}{category:012x}",
+            {"brand": f"Brand {int(random_() * 500)}", "tags": [f"tag{int(random_() * 100)}", f"tag{int(random_() * 100)}"]},
+            1000 + int(random_() * 99000), end - timedelta(seconds=random_() * span),
+        )
+
+
+def _users(plan: SeedPlan, start: int, stop: int, block: int, context: dict) -> Iterator[tuple]:
+    prefix, password_hash = _id_prefix("users", plan), context["password_hash"]
+    for i in range(start, stop):
+        yield (f"{prefix}{i:012x}", f"User {i}", user_email(plan, i), password_hash, UserRole.user)
+
+
+def _addresses(plan: SeedPlan, start: int, stop: int, block: int, context: dict) -> Iterator[tuple]:
+    rng = _rng(plan, "addresses", block)
+    prefix, user_prefix = _id_prefix("addresses", plan), _id_prefix("users", plan)
+    random_ = rng.random
+    for i in range(start, stop):
+        city, state = _CITIES[int(random_() * len(_CITIES))]
+        yield (
+            f"{prefix}{i:012x}", f"{user_prefix}{i // ADDRESSES_PER_USER:012x}",
+            f"{1 + int(random_() * 999)} Street {int(random_() * 5000)}", city, state, "IN",
+            str(110000 + int(random_() * 746000)),
+        )
+
+
+def _orders(plan: SeedPlan, start: int, stop: int, block: int, context: dict) -> Iterator[tuple]:
+    # The hot loop: columns are drawn per block and ids built from cached prefixes
+    rng = _rng(plan, "orders", block)
+    count = stop - start
+    users = rng.choices(context["user_population"], cum_weights=context["user_weights"], k=count)
+    products = rng.choices(context["product_population"], cum_weights=context["product_weights"], k=count)
+    statuses = rng.choices(_STATUSES, _STATUS_WEIGHTS, k=count)
+    payments = rng.choices(_PAYMENTS, _PAYMENT_WEIGHTS, k=count)
+    quantities = rng.choices((1, 2, 3), (3, 2, 1), k=count)
+    prefix, user_prefix, product_prefix, address_prefix = (
+        _id_prefix(kind, plan) for kind in ("orders", "users", "products", "addresses")
+    )
+    prices, end, span = context["prices"], context["end"], plan.days * 86400.0
+    random_ = rng.random
+    for offset, i in enumerate(range(start, stop)):
+        user, product = users[offset], products[offset]
+        created_at = end - timedelta(seconds=random_() * span)
+        address = user * ADDRESSES_PER_USER + int(random_() * ADDRESSES_PER_USER)
+        yield (
+            f"{prefix}{i:012x}", f"{user_prefix}{user:012x}", f"{product_prefix}{product:012x}",
+            payments[offset], f"{address_prefix}{address:012x}", quantities[offset], prices[product],
+            statuses[offset], created_at, created_at,
+        )
+
+
+# (table, columns in generated order, row count, generator); parents before children
+def _steps(plan: SeedPlan) -> list[tuple[Table, tuple[str, ...], int, Callable]]:
+    return [
+        (Category.__table__, ("category_id", "category"), plan.categories, _categories),
+        (Product.__table__, ("product_id", "sku", "name", "description", "price", "category_id",
+                             "product_metadata", "count", "created_at"), plan.products, _products),
+        (User.__table__, ("user_id", "full_name", "email", "hashed_password", "roles_permissions"), plan.users, _users),
+        (Address.__table__, ("address_id", "user_id", "address", "city", "state", "country", "postal_code"),
+         plan.users * ADDRESSES_PER_USER, _addresses),
+        (Order.__table__, ("order_id", "user_id", "product_id", "payment_status", "address_id", "quantity",
+                           "unit_price", "status", "created_at", "updated_at"), plan.orders, _orders),
+    ]
+
+
+def _rows(generate: Callable, plan: SeedPlan, start: int, stop: int, context: dict) -> Iterator[tuple]:
+    """Rows ``start..stop-1``, cut from the whole SEED_BLOCK blocks they fall in."""
+    for block in range(start // SEED_BLOCK, (stop - 1) // SEED_BLOCK + 1):
+        first = block * SEED_BLOCK
+        rows = generate(plan, first, first + SEED_BLOCK, block, context)
+        yield from itertools.islice(rows, max(start - first, 0), min(stop - first, SEED_BLOCK))
+
+
+def _sqlite_processor(column_type, dialect) -> Optional[Callable]:
+    # Same stored values as the dialect's bind processors, minus their per-value overhead
+    if isinstance(column_type, DateTime):
+        return lambda value: value.isoformat(" ", "microseconds")
+    if isinstance(column_type, Enum):
+        return {member: member.name for member in column_type.enum_class}.__getitem__
+    return column_type.dialect_impl(dialect).bind_processor(dialect)
+
+
+def _writer(engine: Engine, table: Table, columns: tuple[str, ...]) -> Callable:
+    """Return ``write(conn, rows)`` for tuples in ``columns`` order."""
+    if engine.dialect.name != "sqlite":
+        stmt = insert(table)
+        return lambda conn, rows: conn.execute(stmt, [dict(zip(columns, row)) for row in rows])
+    processors = [_sqlite_processor(table.c[name].type, engine.dialect) for name in columns]
+    converters = [(position, processor) for position, processor in enumerate(processors) if processor is not None]
+    sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    def write(conn, rows):
+        if converters:
+            converted = []
+            for row in rows:
+                row = list(row)
+                for position, processor in converters:
+                    row[position] = processor(row[position])
+                converted.append(tuple(row))
+            rows = converted
+        conn.exec_driver_sql(sql, rows)
+
+    return write
+
+
+def _load_progress(engine: Engine, plan: SeedPlan) -> dict[str, int]:
+    """Rows already written per table for ``plan.seed``; fills in ``plan.end`` when unset."""
+    seed_progress.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        rows = conn.execute(select(seed_progress)).all()
+    progress = {}
+    for name, done, stored_plan in rows:
+        stored = json.loads(stored_plan)
+        if stored.get("seed") == plan.seed:
+            plan.end = plan.end or stored["end"]
+            if stored != asdict(plan):
+                raise SystemExit(f"seed {plan.seed} was started with a different plan {stored}; use the same arguments to resume")
+            progress[name.split(":")[0]] = done
+    plan.end = plan.end or (date.today() + timedelta(days=1)).isoformat()
+    return progress
+
+
+def _search_triggers(engine: Engine) -> bool:
+    """Whether the SQLite triggers keeping the full-text index current are all installed."""
+    names = ", ".join(f"'{trigger}'" for trigger in search.SQLITE_TRIGGERS)
+    with engine.connect() as conn:
+        installed = conn.execute(text(f"SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({names})"))
+        return installed.scalar() == len(search.SQLITE_TRIGGERS)
+
+
+def _drop_search_triggers(engine: Engine) -> None:
+    with engine.begin() as conn:
+        for trigger in search.SQLITE_TRIGGERS:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+
+
+def _rebuild_search_index(engine: Engine, batch_size: int) -> None:
+    """Index every product in rowid batches, then restore the triggers that keep it current."""
+    with engine.connect() as conn:
+        last = conn.execute(text("SELECT coalesce(max(rowid), 0) FROM products")).scalar()
+    for start in range(0, last, batch_size):
+        with engine.begin() as conn:
+            for statement in search.sqlite_rebuild_sql():
+                conn.execute(text(statement), {"start": start, "end": start + batch_size})
+    with engine.begin() as conn:
+        for statement in search.sqlite_ddl():
+            conn.execute(text(statement))
+
+
+def seed(
+    engine: Engine,
+    plan: SeedPlan,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    password_hash: Optional[str] = None,
+    on_batch: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Create the schema if needed and insert ``plan``'s rows, skipping batches
+    already recorded in ``seed_progress``. Returns ids a workload can use.
+    """
+    Base.metadata.create_all(engine)
+    progress = _load_progress(engine, plan)
+    context = {
+        "end": datetime.combine(date.fromisoformat(plan.end), datetime.min.time()),
+        "password_hash": password_hash or bcrypt_hash(SEED_PASSWORD),
+    }
+    if plan.orders and progress.get("orders", 0) < plan.orders:
+        context.update(
+            user_population=range(plan.users), user_weights=_zipf_cumulative(plan.users, USER_SKEW),
+            product_population=range(plan.products), product_weights=_zipf_cumulative(plan.products, PRODUCT_SKEW),
+            prices=[product_price(plan, i) for i in range(plan.products)],
+        )
+    plan_json = json.dumps(asdict(plan), sort_keys=True)
+    inserted = 0
+    search_indexed = engine.dialect.name != "sqlite" or _search_triggers(engine)
+    for table, columns, total, generate in _steps(plan):
+        name = f"{table.name}:{plan.seed}"
+        write = _writer(engine, table, columns)
+        done = progress.get(table.name, 0)
+        if done < total:
+            # Building secondary indexes once at the end is far cheaper than
+            # maintaining them row by row
+            for index in table.indexes:
+                index.drop(engine, checkfirst=True)
+            if table is Product.__table__ and search_indexed and engine.dialect.name == "sqlite":
+                _drop_search_triggers(engine)
+                search_indexed = False
+        while done < total:
+            stop = min(done + batch_size, total)
+            started = time.perf_counter()
+            rows = list(_rows(generate, plan, done, stop, context))
+            with engine.begin() as conn:
+                write(conn, rows)
+                conn.execute(seed_progress.delete().where(seed_progress.c.name == name))
+                conn.execute(seed_progress.insert().values(name=name, done=stop, plan=plan_json))
+            inserted += stop - done
+            if on_batch:
+                on_batch({"table": table.name, "done": stop, "total": total, "rows_per_s": round((stop - done) / (time.perf_counter() - started))})
+            done = stop
+        # checkfirst: a run interrupted right after its last batch left them dropped
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+        # Also after a run interrupted while its triggers were dropped
+        if table is Product.__table__ and not search_indexed:
+            _rebuild_search_index(engine, batch_size)
+            search_indexed = True
+
+    if inserted:
+        end = context["end"].date()
+        with sessionmaker(bind=engine)() as db:
+            rebuild_sales_rollups(db, end - timedelta(days=plan.days + 1), end + timedelta(days=1))
+    return sample_ids(plan)
+
+
+def sample_ids(plan: SeedPlan, limit: int = 10000) -> dict:
+    """Ids of the seeded rows (capped at ``limit`` each), without querying the database."""
+    users = range(min(plan.users, limit))
+    return {
+        "category_ids": [entity_id("categories", plan, i) for i in range(min(plan.categories, limit))],
+        "product_ids": [entity_id("products", plan, i) for i in range(min(plan.products, limit))],
+        "users": [
+            (entity_id("users", plan, i), user_email(plan, i), entity_id("addresses", plan, i * ADDRESSES_PER_USER))
+            for i in users
+        ],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", required=True, help="database to fill; its indexes are dropped while loading")
+    parser.add_argument("--scale", type=int, default=1000, help="users and products; orders are 5x (overridable below)")
+    parser.add_argument("--categories", type=int)
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--orders", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=365, help="spread orders over this many days")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="orders lead up to this day (default: today)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    plan = SeedPlan.for_scale(args.scale, seed=args.seed, days=args.days, end=args.end_date)
+    for field in ("categories", "products", "users", "orders"):
+        if getattr(args, field) is not None:
+            setattr(plan, field, getattr(args, field))
+    engine = create_db_engine(args.database_url)
+    started = time.perf_counter()
+    seed(engine, plan, batch_size=args.batch_size, on_batch=lambda summary: print(json.dumps(summary)))
+    print(f"seeded {plan} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,200 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Generator
+from typing import Optional, List, Generator, AsyncGenerator, Callable, Union
+from functools import wraps
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
-DATABASE_URL = "sqlite:///./srx_local.db"
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from app.core.config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, USE_ASYNC_DB,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING, DB_POOL_RECYCLE,
+    DB_STATEMENT_TIMEOUT_MS, DB_ECHO,
+    SHED_WINDOW, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE,
+)
+from app.db.profiler import instrument_engine
 Base = declarative_base()
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+def sqlite_pragmas() -> list[str]:
+    return [
+        f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+    ]
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+def engine_options(url: str) -> dict:
+    """
+    Pool and driver keyword arguments for ``create_engine`` / ``create_async_engine``.
+
+    In-memory SQLite keeps SQLAlchemy's single-connection pool, so the pool
+    sizing options only apply to file and server databases.
+    """
+    url = make_url(url)
+    options: dict = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    connect_args: dict = {}
+    if url.get_backend_name() == "sqlite":
+        if url.get_driver_name() == "pysqlite":
+            connect_args["check_same_thread"] = False
+        if url.database in (None, "", ":memory:"):
+            return {**options, "connect_args": connect_args}
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if url.get_backend_name() == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+        if url.get_driver_name() == "asyncpg":
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    options["connect_args"] = connect_args
+    return options
+
+class PoolWaitMonitor:
+    """
+    Time spent waiting for a pooled connection, averaged over the last
+    ``window`` seconds (opening a new connection counts as waiting). Fed by
+    the Timed* pool classes below; read by admission control.
+    """
+
+    def __init__(self, window: float = SHED_WINDOW, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._samples: deque = deque()
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self):
+        started = self._clock()
+        try:
+            yield
+        finally:
+            now = self._clock()
+            with self._lock:
+                self._samples.append((now, now - started))
+                self._total += now - started
+                self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        while self._samples and self._samples[0][0] < now - self.window:
+            self._total -= self._samples.popleft()[1]
+
+    def average(self) -> float:
+        with self._lock:
+            self._expire(self._clock())
+            return self._total / len(self._samples) if self._samples else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._total = 0.0
+
+
+pool_wait = PoolWaitMonitor()
+
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        with pool_wait.checkout():
+            return super()._do_get()
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        with pool_wait.checkout():
+            return super()._do_get()
+
+
+def create_db_engine(url: str = DATABASE_URL, **overrides) -> Engine:
+    """Sync engine configured from SRX_DB_* settings, with SQLite pragmas and the SQL profiler."""
+    options = engine_options(url)
+    if "pool_size" in options:
+        options["poolclass"] = TimedQueuePool
+    engine = create_engine(url, **{**options, **overrides})
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine)
+    return engine
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL, **overrides) -> AsyncEngine:
+    """Async counterpart of create_db_engine."""
+    options = engine_options(url)
+    if "pool_size" in options:
+        options["poolclass"] = TimedAsyncAdaptedQueuePool
+    engine = create_async_engine(url, **{**options, **overrides})
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine(ASYNC_DATABASE_URL)
+# expire_on_commit=False so ORM objects returned from CRUD can still be
+# serialized after the session has committed, without an implicit lazy load.
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+DBSession = Union[Session, AsyncSession]
+
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_session() -> AsyncGenerator[DBSession, None]:
+    """
+    Router dependency: yields an AsyncSession when SRX_USE_ASYNC_DB is on,
+    otherwise a regular Session that CRUD will drive from the threadpool.
+    """
+    if USE_ASYNC_DB:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+def make_async(func: Callable) -> Callable:
+    """
+    Build the async variant of a sync CRUD function.
+
+    On an AsyncSession the function body runs through ``run_sync``, so every
+    statement is awaited on the event loop by the async driver. On a plain
+    Session it falls back to Starlette's threadpool.
+    """
+    @wraps(func)
+    async def wrapper(db: DBSession, *args, **kwargs):
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(lambda sync_db: func(sync_db, *args, **kwargs))
+        return await run_in_threadpool(func, db, *args, **kwargs)
+    wrapper.__name__ = f"{func.__name__}_async"
+    wrapper.__qualname__ = wrapper.__name__
+    return wrapper
@@ -0,0 +1,52 @@
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.crud import crud_products
+from app.db import profiler
+from app.main import app
+
+# app/db/test_profiler.py
+
+USER = {"full_name": "Pat", "email": "pat@example.com", "password": "Password123", "roles_permissions": "user"}
+
+
+def test_register_looks_up_the_email_once(client, max_queries, monkeypatch):
+    monkeypatch.setattr("app.core.hashing.password_hasher.rounds", 4)
+    with max_queries(3) as profile:
+        assert client.post("/register", json=USER).status_code == 200
+    assert [sql for sql in profile.counts if "WHERE users.email" in sql] and not profile.repeated(2)
+
+    assert client.post("/register", json=USER).status_code == 400
+
+
+def test_repeated_statements_are_flagged(db, caplog, monkeypatch):
+    monkeypatch.setattr(profiler, "SQL_REPEAT_THRESHOLD", 3)
+    crud_products.create_category(db, category_name="Books")
+    with caplog.at_level(logging.WARNING, logger="srx.sql"):
+        with profiler.request_profile("GET /loop") as profile:
+            for _ in range(4):
+                crud_products.get_category_catalog(db)
+                crud_products.invalidate_category_catalog()
+    assert profile.statements == 4
+    assert list(profile.repeated(3).values()) == [4]
+    assert [record.message for record in caplog.records if "N+1" in record.message][0].startswith(
+        "possible N+1 in GET /loop: same statement executed 3 times"
+    )
+
+
+def test_slow_queries_are_logged_with_plan(db, caplog, monkeypatch):
+    monkeypatch.setattr(profiler, "SQL_SLOW_QUERY_MS", 1e-6)
+    crud_products.create_category(db, category_name="Books")
+    with caplog.at_level(logging.WARNING, logger="srx.sql"):
+        crud_products.get_category_catalog(db)
+    slow = [record.message for record in caplog.records if record.message.startswith("slow query")]
+    assert any("FROM categories" in message and "plan=SCAN categories" in message for message in slow)
+
+
+def test_debug_headers_report_statements(client):
+    with TestClient(profiler.SQLProfilerMiddleware(app)) as debug_client:
+        response = debug_client.post("/categories", params={"category_name": "Books"})
+    assert int(response.headers[profiler.QUERY_COUNT_HEADER]) >= 2
+    assert float(response.headers[profiler.QUERY_TIME_HEADER]) > 0
+    assert response.headers[profiler.REPEATED_QUERIES_HEADER] == "0"
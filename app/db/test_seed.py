@@ -0,0 +1,104 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import crud_products
+from app.db import seed as seeding
+from app.db.models import Address, Order, Product, SalesDaily, User
+from app.db.session import create_db_engine
+from app.schemas import ProductUpdate
+
+# app/db/test_seed.py
+
+PLAN = dict(categories=3, products=40, users=25, orders=300, seed=7, end=date(2024, 6, 1).isoformat())
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _engine(tmp_path, name):
+    return create_db_engine(f"sqlite:///{tmp_path / name}")
+
+
+def _dump(engine):
+    with engine.connect() as conn:
+        return {
+            model.__tablename__: conn.execute(select(model.__table__).order_by(*model.__table__.primary_key)).all()
+            for model in (Product, User, Address, Order, SalesDaily)
+        }
+
+
+def test_seed_is_deterministic_and_consistent(tmp_path):
+    first, second = _engine(tmp_path, "a.db"), _engine(tmp_path, "b.db")
+    ids = seeding.seed(first, seeding.SeedPlan(**PLAN), batch_size=64, password_hash="x")
+    seeding.seed(second, seeding.SeedPlan(**PLAN), batch_size=1500, password_hash="x")
+    assert _dump(first) == _dump(second)
+
+    with first.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+        assert conn.scalar(select(func.count()).select_from(Order)) == PLAN["orders"]
+        # Zipf skew: the hottest product carries far more than a uniform share
+        hottest = conn.execute(
+            select(func.count()).select_from(Order).group_by(Order.product_id).order_by(func.count().desc())
+        ).scalars().first()
+        assert hottest > 3 * PLAN["orders"] / PLAN["products"]
+        # The rollup was rebuilt from the seeded orders
+        assert conn.scalar(select(func.sum(SalesDaily.order_count))) == PLAN["orders"]
+        user_id, email, address_id = ids["users"][0]
+        assert conn.scalar(select(Address.user_id).where(Address.address_id == address_id)) == user_id
+        assert conn.scalar(select(User.email).where(User.user_id == user_id)) == email
+    assert {index["name"] for index in inspect(first).get_indexes("orders")} >= {
+        index.name for index in Order.__table__.indexes
+    }
+
+
+def test_interrupted_seed_resumes_where_it_stopped(tmp_path):
+    engine, reference = _engine(tmp_path, "resume.db"), _engine(tmp_path, "reference.db")
+
+    def interrupt(summary):
+        if summary["table"] == "orders" and summary["done"] >= 128:
+            raise Interrupted
+
+    with pytest.raises(Interrupted):
+        seeding.seed(engine, seeding.SeedPlan(**PLAN), batch_size=64, password_hash="x", on_batch=interrupt)
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Order)) == 128
+
+    batches = []
+    # Resuming with another batch size still continues the same data
+    seeding.seed(engine, seeding.SeedPlan(**PLAN), batch_size=50, password_hash="x", on_batch=batches.append)
+    assert {batch["table"] for batch in batches} == {"orders"}
+    seeding.seed(reference, seeding.SeedPlan(**PLAN), batch_size=64, password_hash="x")
+    assert _dump(engine) == _dump(reference)
+
+    with pytest.raises(SystemExit):
+        seeding.seed(engine, seeding.SeedPlan(**{**PLAN, "orders": 500}), password_hash="x")
+
+
+def test_search_index_is_rebuilt_after_loading_products(tmp_path):
+    engine = _engine(tmp_path, "search.db")
+
+    def interrupt(summary):
+        if summary["table"] == "products" and summary["done"] >= 16:
+            raise Interrupted
+
+    # Stopped while the search triggers were dropped; the resumed run still indexes every product
+    with pytest.raises(Interrupted):
+        seeding.seed(engine, seeding.SeedPlan(**PLAN), batch_size=16, password_hash="x", on_batch=interrupt)
+    seeding.seed(engine, seeding.SeedPlan(**PLAN), batch_size=16, password_hash="x")
+    with sessionmaker(bind=engine)() as db:
+        assert db.scalar(text("SELECT count(*) FROM products_fts")) == PLAN["products"]
+        assert [p.name for p in crud_products.search_products(db, "Product 7")][0] == "Product 7"
+        crud_products.update_product(db, seeding.entity_id("products", seeding.SeedPlan(**PLAN), 7), ProductUpdate(
+            name="Copper Kettle", price="5", count=1, description=None, product_metadata=None,
+        ))
+        assert [p.name for p in crud_products.search_products(db, "kettle")] == ["Copper Kettle"]
+
+
+def test_cli_requires_an_explicit_database(capsys):
+    with pytest.raises(SystemExit):
+        seeding.main(["--scale", "10"])
+    assert "--database-url" in capsys.readouterr().err
@@ -0,0 +1,60 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.crud import crud_products
+from app.db.session import create_async_db_engine, create_db_engine, make_async
+
+# app/db/test_session.py
+
+
+def test_make_async_names_variant():
+    assert crud_products.get_product_async.__name__ == "get_product_async"
+
+
+def test_make_async_runs_on_sync_session(db):
+    categories = asyncio.run(crud_products.create_category_async(db, category_name="Books"))
+    assert categories.category == "Books"
+
+
+def test_make_async_runs_on_async_session(db_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        async with session_factory() as session:
+            created = await crud_products.create_category_async(session, category_name="Toys")
+            listed = await crud_products.get_categories_async(session)
+        await engine.dispose()
+        return created, listed
+
+    created, listed = asyncio.run(run())
+    assert listed == [{"id": created.category_id, "name": "Toys"}]
+
+
+def test_products_router_uses_async_session(client):
+    category = client.post("/categories", params={"category_name": "Games"}).json()
+    response = client.post("/products", json={
+        "name": "Chess", "price": 10, "category_id": category["category_id"], "count": 5,
+    })
+    assert response.status_code == 200
+    product_id = response.json()["product_id"]
+    assert client.get(f"/products/{product_id}").json()["name"] == "Chess"
+
+
+def test_engines_apply_sqlite_pragmas(db_path):
+    engine = create_db_engine(f"sqlite:///{db_path}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    assert engine.pool.size() == 10
+    engine.dispose()
+
+    async def run():
+        async_engine = create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with async_engine.connect() as conn:
+            busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        await async_engine.dispose()
+        return busy_timeout
+
+    assert asyncio.run(run()) == 5000
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from typing import List, Optional
+from app.schemas import DailySalesRead, OrderStatus, ProductSalesRead
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+router = APIRouter()
+from app.db.session import get_session, DBSession
+from app.crud import crud_sales
+
+# Widest range a single analytics request may cover
+MAX_RANGE_DAYS = 366
+
+def _range(start: Optional[date], end: Optional[date]) -> tuple[date, date]:
+    end = end or date.today() + timedelta(days=1)
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_RANGE_DAYS} days")
+    return start, end
+
+@router.get("/analytics/sales/daily", response_model=List[DailySalesRead])
+async def get_daily_sales(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    product_id: Optional[str] = None,
+    status: Optional[OrderStatus] = None,
+    db: DBSession = Depends(get_session),
+):
+    """
+    Order count, quantity and revenue per day in ``[start, end)`` (default:
+    the last 30 days), optionally for one product and/or order status.
+    Read from the pre-aggregated sales rollup, not the orders table.
+    """
+    start, end = _range(start, end)
+    return await crud_sales.get_daily_sales_async(db, start=start, end=end, product_id=product_id, status=status)
+
+@router.get("/analytics/sales/products", response_model=List[ProductSalesRead])
+async def get_product_sales(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    status: Optional[OrderStatus] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: DBSession = Depends(get_session),
+):
+    """
+    Top products by revenue in ``[start, end)`` (default: the last 30 days).
+    """
+    start, end = _range(start, end)
+    return await crud_sales.get_product_sales_async(db, start=start, end=end, status=status, limit=limit)
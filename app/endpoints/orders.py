@@ -1,64 +1,155 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List  
-from app.schemas import OrderBase, OrderCreate, OrderRead, OrderUpdate
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from app.schemas import OrderBase, OrderBulkTransition, OrderBulkTransitionRead, OrderCreate, OrderRead, OrderUpdate, CartCheckout, OrderStatus, PaymentStatus
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool
 from app.core.security import create_access_token, decode_access_token, token_expired
 
 router = APIRouter()
-from app.db.session import get_db
+from app.db.session import get_session, DBSession
 from app.crud import crud_orders
-from sqlalchemy.orm import Session
+from app.crud.crud_idempotency import run_idempotent
+from app.crud.pagination import next_cursor, set_next_cursor
+from app.core.serialization import fast_response
 
 @router.post("/orders", response_model=OrderRead)
-def create_order(order: OrderCreate, db: Session = Depends(get_db)):
+async def create_order(order: OrderCreate, db: DBSession = Depends(get_session), idempotency_key: Optional[str] = Header(None)):
     """
     Create a new order.
+    With an Idempotency-Key header, a retry gets the first response back
+    instead of placing a second order.
     """
-    return crud_orders.create_order(db=db, order=order)
+    return await run_idempotent(
+        db, "POST /orders", idempotency_key, order.model_dump(mode="json"),
+        lambda session: crud_orders.create_order_async(db=session, order=order), OrderRead,
+    )
+
+@router.post("/orders/checkout", response_model=List[OrderRead])
+async def checkout_cart(cart: CartCheckout, db: DBSession = Depends(get_session), idempotency_key: Optional[str] = Header(None)):
+    """
+    Check out a multi-item cart as one transaction; fails as a whole if any line fails.
+    Accepts an Idempotency-Key header like POST /orders.
+    """
+    return await run_idempotent(
+        db, "POST /orders/checkout", idempotency_key, cart.model_dump(mode="json"),
+        lambda session: crud_orders.checkout_cart_async(db=session, cart=cart), List[OrderRead],
+    )
+
+@router.post("/orders/transitions", response_model=OrderBulkTransitionRead)
+async def transition_orders(transition: OrderBulkTransition, db: DBSession = Depends(get_session)):
+    """
+    Move many orders to a new status and/or payment status at once, by
+    ``order_ids`` or by ``filter``. Applied with one set-based UPDATE that
+    only admits allowed transitions (pending -> processing -> completed,
+    pending/processing -> cancelled; see crud_orders for payment statuses);
+    each order gets an outcome: updated, unchanged, invalid_transition or
+    not_found. Filter mode moves up to ``limit`` orders per call.
+    """
+    return await crud_orders.transition_orders_async(db, transition)
 
 @router.get("/orders", response_model=List[OrderRead])
-def get_orders(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def get_orders(response: Response, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: DBSession = Depends(get_session)):
+    """
+    Retrieve a list of orders with keyset pagination.
+    Pass the X-Next-Cursor header of one page as ``cursor`` to fetch the next.
+    """
+    orders = await crud_orders.get_orders_async(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, next_cursor(orders, crud_orders.ORDER_PAGE_KEY, limit))
+    return fast_response(orders, OrderRead, response)
+
+EXPORT_COLUMNS = ["order_id", "user_id", "product_id", "address_id", "quantity", "status", "payment_status", "created_at", "updated_at"]
+
+def _export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def _encode_export(partitions, format: str):
+    """Turn each partition of order rows into one chunk of NDJSON or CSV."""
+    if format == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\n"
+    async for rows in partitions:
+        buffer = io.StringIO()
+        if format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerows([_export_value(row[column]) for column in EXPORT_COLUMNS] for row in rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps({column: _export_value(row[column]) for column in EXPORT_COLUMNS}))
+                buffer.write("\n")
+        yield buffer.getvalue()
+
+@router.get("/orders/export")
+async def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[OrderStatus] = None,
+    payment_status: Optional[PaymentStatus] = None,
+    db: DBSession = Depends(get_session),
+):
     """
-    Retrieve a list of orders with pagination.
+    Stream orders as NDJSON or CSV, optionally filtered by created_at range,
+    status and payment_status. Rows come off a server-side cursor in batches,
+    so memory use does not grow with the size of the export.
     """
-    orders = crud_orders.get_orders(db, skip=skip, limit=limit)
-    return orders
+    filters = {"start": start, "end": end, "status": status, "payment_status": payment_status}
+    if isinstance(db, AsyncSession):
+        partitions = crud_orders.stream_orders_async(db, **filters)
+    else:
+        partitions = iterate_in_threadpool(crud_orders.stream_orders(db, **filters))
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _encode_export(partitions, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
 
 @router.get("/orders/{order_id}", response_model=OrderRead)
-def get_order(order_id: str, db: Session = Depends(get_db)):
+async def get_order(order_id: str, db: DBSession = Depends(get_session)):
     """
     Retrieve a single order by its ID.
     """
-    order = crud_orders.get_order_by_id(db, order_id=order_id)
+    order = await crud_orders.get_order_by_id_async(db, order_id=order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 @router.patch("/orders/{order_id}", response_model=OrderRead)
-def update_order(order_id: str, order_update: OrderUpdate, db: Session = Depends(get_db)):
+async def update_order(order_id: str, order_update: OrderUpdate, db: DBSession = Depends(get_session)):
     """
     Update order details.
     """
-    updated_order = crud_orders.update_order(db=db, order_id=order_id, order_update=order_update)
+    updated_order = await crud_orders.update_order_async(db=db, order_id=order_id, order_update=order_update)
     if not updated_order:
         raise HTTPException(status_code=404, detail="Order not found")
     return updated_order
 
 @router.delete("/orders/{order_id}", response_model=OrderRead)
-def delete_order(order_id: str, db: Session = Depends(get_db)):
+async def delete_order(order_id: str, db: DBSession = Depends(get_session)):
     """
     Delete an order by its ID.
     """
-    deleted_order = crud_orders.delete_order(db=db, order_id=order_id)
+    deleted_order = await crud_orders.delete_order_async(db=db, order_id=order_id)
     if not deleted_order:
         raise HTTPException(status_code=404, detail="Order not found")
     return deleted_order
 
 @router.get("/orders/user/{user_id}", response_model=List[OrderRead])
-def get_orders_by_user(user_id: str, db: Session = Depends(get_db)):
+async def get_orders_by_user(user_id: str, response: Response, limit: int = 10, cursor: Optional[str] = None, db: DBSession = Depends(get_session)):
     """
-    Retrieve orders for a specific user with pagination.
+    Retrieve orders for a specific user with keyset pagination.
     """
-    orders = crud_orders.get_orders_by_user(db, user_id=user_id)
-    return orders
+    orders = await crud_orders.get_orders_by_user_async(db, user_id=user_id, limit=limit, cursor=cursor)
+    set_next_cursor(response, next_cursor(orders, crud_orders.ORDER_PAGE_KEY, limit))
+    return fast_response(orders, OrderRead, response)
 
@@ -1,77 +1,161 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List  
-from app.schemas import ProductUpdate, ProductCreate, ProductRead, CategoryRead
-from fastapi import APIRouter, Depends, HTTPException
+from app.schemas import ProductUpdate, ProductCreate, ProductRead, ProductSort, CategoryRead
+import io
+import time
+from decimal import Decimal
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Query
+from starlette.concurrency import run_in_threadpool
 from app.core.security import create_access_token, decode_access_token, token_expired
 
 router = APIRouter()
-from app.db.session import get_db
-from app.crud import crud_products
-from sqlalchemy.orm import Session
+from app.db.session import get_session, DBSession
+from app.crud import crud_products, product_import
+from app.crud.pagination import next_cursor, set_next_cursor
+from app.core.serialization import fast_response
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
 @router.get("/categories", response_model=List[dict])
-def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, db: DBSession = Depends(get_session)):
     """
     Retrieve a list of distinct product categories.
-    """
-    categories = crud_products.get_categories(db)
-    return categories
+    Served from a pre-serialized in-memory copy with a strong ETag;
+    a matching If-None-Match gets 304 without touching the database.
+    """
+    catalog = crud_products.cached_category_catalog() or await crud_products.get_category_catalog_async(db)
+    headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), catalog.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
 
 @router.post("/categories", response_model=CategoryRead)
-def create_category(category_name: str, db: Session = Depends(get_db)):
+async def create_category(category_name: str, db: DBSession = Depends(get_session)):
     """
     Create a new product category.
     """
-    return crud_products.create_category(db=db, category_name=category_name)
+    return await crud_products.create_category_async(db=db, category_name=category_name)
 
 @router.delete("/categories/{category_id}", response_model=CategoryRead)
-def delete_category(category_id: str, db: Session = Depends(get_db)):
+async def delete_category(category_id: str, db: DBSession = Depends(get_session)):
     """
     Delete a product category.
     """
-    return crud_products.delete_category(db=db, category_id=category_id)
+    return await crud_products.delete_category_async(db=db, category_id=category_id)
 
 @router.get("/products", response_model=List[ProductRead])
-def get_products(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """
-    Retrieve a list of products with pagination.
-    """
-    products = crud_products.get_products(db, skip=skip, limit=limit)
-    return products
+async def get_products(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    category_id: Optional[str] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    sort: Optional[ProductSort] = None,
+    db: DBSession = Depends(get_session),
+):
+    """
+    Retrieve a list of products with keyset pagination.
+    Filter by category, price range and stock; sort by price, -price, name or newest.
+    Pass the X-Next-Cursor header of one page as ``cursor`` (with the same
+    filters and sort) to fetch the next.
+    """
+    products = await crud_products.get_products_async(
+        db, skip=skip, limit=limit, cursor=cursor, category_id=category_id,
+        min_price=min_price, max_price=max_price, in_stock=in_stock, sort=sort,
+    )
+    columns, _ = crud_products.product_sort_key(sort)
+    set_next_cursor(response, next_cursor(products, columns, limit))
+    return fast_response(products, ProductRead, response)
 
 @router.post("/products", response_model=ProductRead)
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+async def create_product(product: ProductCreate, db: DBSession = Depends(get_session)):
     """
     Create a new product.
     """
-    return crud_products.create_product(db=db, product=product)
+    return await crud_products.create_product_async(db=db, product=product)
+
+@router.post("/products/import", response_model=dict)
+async def import_products(
+    file: UploadFile = File(...),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(product_import.DEFAULT_BATCH_SIZE, ge=1, le=50000),
+    db: DBSession = Depends(get_session),
+):
+    """
+    Bulk import products from a CSV or NDJSON upload, upserting on sku.
+    The upload is read incrementally; parsing runs in the threadpool and each
+    batch is written with one bulk statement and one commit.
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    batches = product_import.iter_batches(stream, format, batch_size)
+    report = product_import.ImportReport()
+    while True:
+        batch = await run_in_threadpool(next, batches, None)
+        if batch is None:
+            break
+        started = time.perf_counter()
+        written = await product_import.write_batch_async(db, batch)
+        report.record(batch, written, time.perf_counter() - started)
+    return report.as_dict()
+
+@router.get("/products/search", response_model=List[ProductRead])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    category_id: Optional[str] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: DBSession = Depends(get_session),
+):
+    """
+    Full-text search over product name, description and selected metadata,
+    best matches first, optionally filtered by category and price range.
+    """
+    products = await crud_products.search_products_async(
+        db, q=q, category_id=category_id, min_price=min_price, max_price=max_price, limit=limit,
+    )
+    return fast_response(products, ProductRead)
+
+@router.get("/products/cache/stats", response_model=dict)
+async def get_product_cache_stats():
+    """
+    Hit/miss/eviction counters for this worker's product read cache.
+    """
+    return crud_products.product_cache_stats()
 
 @router.get("/products/{product_id}", response_model=ProductRead)
-def get_product(product_id: str, db: Session = Depends(get_db)):
+async def get_product(product_id: str, db: DBSession = Depends(get_session)):
     """
     Retrieve a single product by its ID.
     """
-    product = crud_products.get_product(db, product_id=product_id)
+    product = await crud_products.get_product_async(db, product_id=product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return fast_response(product, ProductRead)
 
 @router.patch("/products/{product_id}", response_model=ProductRead)
-def update_product(product_id: str, product_update: ProductUpdate, db: Session = Depends(get_db)):
+async def update_product(product_id: str, product_update: ProductUpdate, db: DBSession = Depends(get_session)):
     """
     Update product details.
     """
-    updated_product = crud_products.update_product(db=db, product_id=product_id, product_update=product_update)
+    updated_product = await crud_products.update_product_async(db=db, product_id=product_id, product_update=product_update)
     if not updated_product:
         raise HTTPException(status_code=404, detail="Product not found")
     return updated_product
 
 @router.delete("/products/{product_id}", response_model=ProductRead)
-def delete_product(product_id: str, db: Session = Depends(get_db)):
+async def delete_product(product_id: str, db: DBSession = Depends(get_session)):
     """
     Delete a product by its ID.
     """
-    deleted_product = crud_products.delete_product(db=db, product_id=product_id)
+    deleted_product = await crud_products.delete_product_async(db=db, product_id=product_id)
     if not deleted_product:
         raise HTTPException(status_code=404, detail="Product not found")
     return deleted_product
\ No newline at end of file
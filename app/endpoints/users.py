@@ -1,32 +1,44 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List  
 from app.schemas import UserRead, AddressRead, UserCreate, UserUpdate,LoginUser, AddressCreate, AddressBase, AddressUpdate
-from fastapi import APIRouter, Depends, HTTPException
-from app.core.security import create_access_token, decode_access_token, token_expired
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from app.core.security import create_access_token, decode_access_token, token_expired, get_current_user_id
+from app.core.hashing import password_hasher
 
 router = APIRouter()
-from app.db.session import get_db
+from app.db.session import get_session, DBSession
 from app.crud import crud_users
-from sqlalchemy.orm import Session
+from app.crud.crud_idempotency import run_idempotent
+from app.crud.pagination import next_cursor, set_next_cursor
+from app.core.serialization import fast_response
 
 @router.get("/users", response_model=List[UserRead])
-def get_users(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def get_users(response: Response, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, db: DBSession = Depends(get_session)):
     """
-    Retrieve a list of users with pagination.
+    Retrieve a list of users with keyset pagination.
+    Pass the X-Next-Cursor header of one page as ``cursor`` to fetch the next.
     """
-    users = crud_users.get_users(db, skip=skip, limit=limit)
-    return users
+    users = await crud_users.get_users_async(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, next_cursor(users, crud_users.USER_PAGE_KEY, limit))
+    return fast_response(users, UserRead, response)
 
 @router.post("/register", response_model=UserRead)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: DBSession = Depends(get_session), idempotency_key: Optional[str] = Header(None)):
     """
     Create a new user.
+    With an Idempotency-Key header, a retry gets the first response back.
     """
-    existing_user = crud_users.get_user_by_email(db, email=user.email)
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    return crud_users.create_user(db=db, user=user)
+    async def register(session: DBSession):
+        crud_users.validate_new_user(user)
+        existing_user = await crud_users.get_user_by_email_async(session, email=user.email)
+        if existing_user:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        hashed_password = await password_hasher.hash(user.password)
+        return await crud_users.create_user_async(db=session, user=user, hashed_password=hashed_password)
+
+    # The password stays out of the stored request fingerprint
+    payload = user.model_dump(mode="json", exclude={"password"})
+    return await run_idempotent(db, "POST /register", idempotency_key, payload, register, UserRead)
 
 class UserLoginResponse(BaseModel):
     access_token: str = Field(..., description="JWT access token")
@@ -34,67 +46,64 @@ class UserLoginResponse(BaseModel):
     user_email: str = Field(..., description="Email of the logged-in user")
 
 @router.post("/login", response_model=UserLoginResponse)
-def login_user(user: LoginUser, db: Session = Depends(get_db)):
+async def login_user(user: LoginUser, db: DBSession = Depends(get_session)):
     """
     Login a user and return user details.
     """
-    db_user = crud_users.get_user_by_email(db, email=user.email)
-    if not db_user or not crud_users.verify_password(user.password, db_user.hashed_password):
+    db_user = await crud_users.get_user_by_email_async(db, email=user.email)
+    if not db_user:
+        raise HTTPException(status_code=400, detail="Invalid email or password")
+    valid, new_hash = await password_hasher.verify(user.password, db_user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid email or password")
+    if new_hash:
+        # Transparent upgrade of legacy SHA-256 (or outdated cost) hashes
+        await crud_users.update_password_hash_async(db, user_id=db_user.user_id, hashed_password=new_hash)
     # Generate access token 
     access_token = create_access_token(data={"email": db_user.email, "user_id": db_user.user_id})
     user_email = db_user.email
     return UserLoginResponse(access_token=access_token, token_type="bearer", user_email=user_email)
 
 @router.patch("/users/{user_id}", response_model=UserRead)
-def update_user(user: LoginUser, user_update: UserUpdate, db: Session = Depends(get_db)):
+async def update_user(user: LoginUser, user_update: UserUpdate, db: DBSession = Depends(get_session)):
     """
     Update user details.
     """
-    db_user = crud_users.get_user_by_email(db, email=user.email)
+    db_user = await crud_users.get_user_by_email_async(db, email=user.email)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    updated_user = crud_users.update_user(db=db, user_email=user.email, user_update=user_update)
+    hashed_password = await password_hasher.hash(user_update.password) if user_update.password else None
+    updated_user = await crud_users.update_user_async(db=db, user_email=user.email, user_update=user_update, hashed_password=hashed_password)
     return updated_user
 
 @router.delete("/delete/{email}", response_model=UserRead)
-def delete_user(email: str, db: Session = Depends(get_db)):
+async def delete_user(email: str, db: DBSession = Depends(get_session)):
     """
     Delete a user by email.
     """
-    db_user = crud_users.get_user_by_email(db, email=email)
+    db_user = await crud_users.get_user_by_email_async(db, email=email)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    crud_users.delete_user(db=db, user_email=email)
+    await crud_users.delete_user_async(db=db, user_email=email)
     return db_user
 
 @router.get("/addresses", response_model=List[AddressRead])
-def get_user_addresses(access_token: str, db: Session = Depends(get_db)):
+async def get_user_addresses(db: DBSession = Depends(get_session), user_id: str = Depends(get_current_user_id)):
     """
-    Get all addresses for a specific user.
+    Get all addresses for the authenticated user (Bearer token).
     """
-    expired = token_expired(access_token)
-    if expired:
-        raise HTTPException(status_code=401, detail="Access token has expired")
-    user_id = decode_access_token(access_token).get("user_id")
-    addresses = crud_users.get_user_addresses(db, user_id=user_id)
+    addresses = await crud_users.get_user_addresses_async(db, user_id=user_id)
     if not addresses:
         raise HTTPException(status_code=404, detail="Addresses not found")
     return addresses
 
 @router.post("/addresses", response_model=AddressRead)
-def create_address(address: AddressBase, access_token: str, db: Session = Depends(get_db)):
+async def create_address(address: AddressBase, db: DBSession = Depends(get_session), user_id: str = Depends(get_current_user_id)):
     """
     Create a new address for the user.
     """
-    expired = token_expired(access_token)
-    if expired:
-        raise HTTPException(status_code=401, detail="Access token has expired")
-    user_id = decode_access_token(access_token).get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid access token")
     address = AddressCreate(
         address=address.address,
         city=address.city,
@@ -103,39 +112,25 @@ def create_address(address: AddressBase, access_token: str, db: Session = Depend
         postal_code=address.postal_code,
         user_id=user_id
     )
-    return crud_users.create_address(db=db, address=address)
+    return await crud_users.create_address_async(db=db, address=address)
 
 @router.patch("/addresses/{address_id}", response_model=AddressRead)
-def update_address(address_id: str, address_update: AddressUpdate, access_token: str, db: Session = Depends(get_db)):
+async def update_address(address_id: str, address_update: AddressUpdate, db: DBSession = Depends(get_session), user_id: str = Depends(get_current_user_id)):
     """
     Update an existing address.
     """
-    expired = token_expired(access_token)
-    if expired:
-        raise HTTPException(status_code=401, detail="Access token has expired") 
-    user_id = decode_access_token(access_token).get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid access token")
-
-    updated_address = crud_users.update_address(db=db, address_id=address_id,user_id=user_id, address_update=address_update)
+    updated_address = await crud_users.update_address_async(db=db, address_id=address_id,user_id=user_id, address_update=address_update)
     if not updated_address:
         raise HTTPException(status_code=404, detail="Address not found")
     
     return updated_address
 
 @router.delete("/addresses/{address_id}", response_model=AddressRead)
-def delete_address(address_id: str, access_token: str, db: Session = Depends(get_db)):
+async def delete_address(address_id: str, db: DBSession = Depends(get_session), user_id: str = Depends(get_current_user_id)):
     """
     Delete an address by ID.
     """
-    expired = token_expired(access_token)
-    if expired:
-        raise HTTPException(status_code=401, detail="Access token has expired")
-    user_id = decode_access_token(access_token).get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid access token")
-
-    deleted_address = crud_users.delete_address(db=db, address_id=address_id, user_id=user_id)
+    deleted_address = await crud_users.delete_address_async(db=db, address_id=address_id, user_id=user_id)
     if isinstance(deleted_address, HTTPException):
         raise deleted_address
     if not deleted_address:
@@ -144,15 +139,11 @@ def delete_address(address_id: str, access_token: str, db: Session = Depends(get
     return deleted_address
 
 @router.get("/addresses/{address_id}", response_model=AddressRead)
-def get_address_by_id(address_id: str, access_token: str, db: Session = Depends(get_db)):
+async def get_address_by_id(address_id: str, db: DBSession = Depends(get_session), user_id: str = Depends(get_current_user_id)):
     """
     Get an address by its ID.
     """
-    user_id = decode_access_token(access_token).get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid access token")
-
-    address = crud_users.get_address_by_id(db=db, address_id=address_id)
+    address = await crud_users.get_address_by_id_async(db=db, address_id=address_id)
     if not address:
         raise HTTPException(status_code=404, detail="Address not found")
     
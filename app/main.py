@@ -1,17 +1,48 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.schemas import UserRead, AddressRead
-from app.endpoints import users,products, orders
-from app.db.session import get_db
-app = FastAPI()
+from app.endpoints import users,products, orders, analytics
+from app.db.session import get_db, get_session
+from app.crud.pagination import NEXT_CURSOR_HEADER
+from app.core.hashing import password_hasher
+from app.core.config import FAST_JSON, METRICS_ENABLED, OUTBOX_ENABLED, SQL_PROFILE_HEADERS
+from app.core import admission, metrics, outbox
+from app.db import profiler
+from app.core.serialization import FastJSONResponse
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if OUTBOX_ENABLED:
+        # Same sessions as the routers, including test overrides of get_session
+        outbox.worker.start(asynccontextmanager(app.dependency_overrides.get(get_session, get_session)))
+    yield
+    await outbox.worker.stop()
+    password_hasher.shutdown()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse if FAST_JSON else JSONResponse)
+
+# Inside CORS so 429/503 responses still carry CORS headers
+app.add_middleware(admission.AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, profiler.QUERY_COUNT_HEADER, profiler.QUERY_TIME_HEADER, profiler.REPEATED_QUERIES_HEADER],
 )
+if SQL_PROFILE_HEADERS:
+    app.add_middleware(profiler.SQLProfilerMiddleware)
+if METRICS_ENABLED:
+    # Outermost, so latency includes every other middleware
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the SRX API!"}
@@ -40,4 +71,6 @@ app.include_router(users.router)
 
 app.include_router(products.router)
 
-app.include_router(orders.router)
\ No newline at end of file
+app.include_router(orders.router)
+
+app.include_router(analytics.router)
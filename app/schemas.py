@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, Any
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Optional, Any, List
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
 
 class OrderStatus(str, Enum):
     pending = "pending"
@@ -78,25 +79,33 @@ class CategoryRead(CategoryBase):
         orm_mode = True
 
 class ProductBase(BaseModel):
+    sku: Optional[str] = Field(None, max_length=64)
     name: str
     description: Optional[str] = None
-    price: str
+    price: Decimal = Field(..., ge=0, max_digits=12, decimal_places=2)
     category_id: str
     product_metadata: Optional[Any] = None
-    count: str
+    count: int = Field(..., ge=0)
 
 class ProductCreate(ProductBase):
     pass
 
 class ProductRead(ProductBase):
     product_id: str
+    created_at: Optional[datetime] = None
+
+class ProductSort(str, Enum):
+    price = "price"
+    price_desc = "-price"
+    name = "name"
+    newest = "newest"
 
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
-    price: Optional[str] = None
+    price: Optional[Decimal] = Field(None, ge=0, max_digits=12, decimal_places=2)
     product_metadata: Optional[Any] = None
-    count: Optional[str] = None
+    count: Optional[int] = Field(None, ge=0)
 
     class Config:
         orm_mode = True
@@ -106,14 +115,26 @@ class OrderBase(BaseModel):
     product_id: str
     payment_status: PaymentStatus
     address_id: str
-    quantity: str
+    quantity: int = Field(..., gt=0)
     status: OrderStatus
 
 class OrderCreate(OrderBase):
     pass
 
+class CartItem(BaseModel):
+    product_id: str
+    quantity: int = Field(..., gt=0)
+
+class CartCheckout(BaseModel):
+    user_id: str
+    address_id: str
+    payment_status: PaymentStatus
+    status: OrderStatus = OrderStatus.pending
+    items: List[CartItem] = Field(..., min_length=1)
+
 class OrderRead(OrderBase):
     order_id: str
+    unit_price: Optional[Decimal] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -122,4 +143,55 @@ class OrderUpdate(BaseModel):
     status: Optional[OrderStatus] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class OrderTransitionFilter(BaseModel):
+    status: Optional[OrderStatus] = None
+    payment_status: Optional[PaymentStatus] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+class OrderBulkTransition(BaseModel):
+    """Target status and/or payment status for a list of orders or a filter (one of the two)."""
+    order_ids: Optional[List[str]] = Field(None, min_length=1, max_length=1000)
+    filter: Optional[OrderTransitionFilter] = None
+    limit: int = Field(1000, gt=0, le=1000)  # orders moved per call in filter mode
+    status: Optional[OrderStatus] = None
+    payment_status: Optional[PaymentStatus] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.order_ids is None) == (self.filter is None):
+            raise ValueError("Pass exactly one of order_ids or filter")
+        if self.status is None and self.payment_status is None:
+            raise ValueError("Pass a target status and/or payment_status")
+        return self
+
+class OrderTransitionOutcome(str, Enum):
+    updated = "updated"
+    unchanged = "unchanged"  # already in the target state
+    invalid_transition = "invalid_transition"
+    not_found = "not_found"
+
+class OrderTransitionResult(BaseModel):
+    order_id: str
+    outcome: OrderTransitionOutcome
+    status: Optional[OrderStatus] = None  # after the call
+    payment_status: Optional[PaymentStatus] = None
+
+class OrderBulkTransitionRead(BaseModel):
+    matched: int
+    updated: int
+    results: List[OrderTransitionResult]
+
+class DailySalesRead(BaseModel):
+    day: date
+    order_count: int
+    quantity: int
+    revenue: Decimal
+
+class ProductSalesRead(BaseModel):
+    product_id: str
+    order_count: int
+    quantity: int
+    revenue: Decimal